@@ -1,22 +1,30 @@
 # -*- coding: utf-8 -*-
 import os
 import re
-import json
 import time
+import asyncio
 import shutil
-import urllib.request
 import urllib.parse
 from urllib.parse import urlparse, urlunparse
-from uuid import uuid4
 from subprocess import Popen, DEVNULL
 
 from aiohttp import web
 from server import PromptServer
 
+from .aria2_client import client as _aria2, Aria2RPCError, ARIA2_SECRET
+from .progress import broadcaster as _progress, normalize_aria2_status, STATUS_KEYS, FINAL_STATES
+from .download_scheduler import scheduler as _scheduler, aria2_job
+from .url_probe import probe as _probe, invalidate as _invalidate_probe
+from .model_index import index as _index, link_into
+from .integrity import verify as _verify, quarantine, find_by_sha256, is_sha256, wants_verify
+from .aria2_session import jobs as _jobs, session_args
+from .host_profiles import profiles as _hosts
+from .job_store import store as _store
+from .path_index import index as _paths
+from . import range_downloader as _http
+
 # ========= Config =========
-ARIA2_SECRET = os.environ.get("COMFY_ARIA2_SECRET", "comfyui_aria2_secret")
 HF_TOKEN = os.environ.get("HF_READ_TOKEN", "")
-ARIA2_RPC_URL = os.environ.get("COMFY_ARIA2_RPC", "http://127.0.0.1:6800/jsonrpc")
 ARIA2_BIN = shutil.which("aria2c") or "aria2c"
 RPC_START_ARGS = [
     ARIA2_BIN,
@@ -31,37 +39,108 @@ RPC_START_ARGS = [
 #     RPC_START_ARGS.append(f'--header=Authorization: Bearer {HF_TOKEN}')
 
 # ========= RPC helper =========
-def _aria2_rpc(method, params=None):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": str(uuid4()),
-        "method": f"aria2.{method}",
-        "params": [f"token:{ARIA2_SECRET}"] + (params or []),
-    }
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        ARIA2_RPC_URL, data=data, headers={"Content-Type": "application/json"}
-    )
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+async def _aria2_rpc(method, params=None, timeout=None, retries=None):
+    """Non-blocking aria2 call over the pooled session; returns the raw JSON-RPC response."""
+    return await _aria2.call_raw(method, params, timeout=timeout, retries=retries)
 
-def _ensure_aria2_daemon():
+_limits_applied = False
+_restored = False
+_restore_lock = asyncio.Lock()
+
+async def _ensure_aria2_daemon():
+    global _limits_applied
     try:
-        _aria2_rpc("getVersion")
-        return
+        await _aria2_rpc("getVersion", timeout=1.0, retries=0)
     except Exception:
-        pass
+        await _start_aria2_daemon()
+    _progress.wake()  # no-op unless the listener gave up on an absent daemon
+    if not _limits_applied:
+        try:
+            await _scheduler.apply_aria2_limits()
+            _limits_applied = True
+        except Exception:
+            pass
+    if not _restored:
+        try:
+            await _restore_session()
+        except Exception:
+            pass  # retried on the next call; never blocks new downloads
+
+async def _start_aria2_daemon():
     if not shutil.which(ARIA2_BIN):
         raise RuntimeError("aria2c not found in PATH. Please install aria2c.")
-    Popen(RPC_START_ARGS, stdout=DEVNULL, stderr=DEVNULL)
+    global _restored, _limits_applied
+    Popen(RPC_START_ARGS + session_args(), stdout=DEVNULL, stderr=DEVNULL)
+    _restored = _limits_applied = False
     t0 = time.time()
     while time.time() - t0 < 3.0:
         try:
-            _aria2_rpc("getVersion")
+            await _aria2_rpc("getVersion", timeout=0.5, retries=0)
             return
         except Exception:
-            time.sleep(0.15)
-    _aria2_rpc("getVersion")  # raise if still not up
+            await asyncio.sleep(0.15)
+    await _aria2_rpc("getVersion", retries=0)  # raise if still not up
+
+async def _restore_session():
+    """
+    Re-attach persisted jobs after a ComfyUI or daemon restart: downloads the
+    daemon still knows (or reloaded from its session file) are adopted, lost
+    ones are re-added under the same gid and resume from their .aria2 file.
+    """
+    global _restored
+    async with _restore_lock:
+        if _restored:
+            return
+        records = [r for r in _jobs.all() if _scheduler.get(r["gid"]) is None]
+        if not records:
+            _restored = True
+            return
+        results = await _aria2.multicall(
+            [("tellStatus", [r["gid"], ["gid", "status"]]) for r in records])
+
+        running, queued, lost = [], [], []
+        for r, st in zip(records, results):
+            if isinstance(st, Exception):
+                lost.append(r)
+            elif st.get("status") == "active":
+                running.append(r)
+            elif st.get("status") in ("waiting", "paused"):
+                queued.append(r)
+            else:
+                # finished while we were away: let the next push settle it
+                if r.get("origin"):
+                    _origins[r["gid"]] = dict(r["origin"])
+                _progress.track(r["gid"])
+                _jobs.drop_gid(r["gid"])
+
+        if lost:
+            readd = await _aria2.multicall([
+                ("addUri", [r["uris"], dict(r["opts"], gid=r["gid"], pause="true")]) for r in lost
+            ])
+            for r, res in zip(lost, readd):
+                if isinstance(res, Exception):
+                    _jobs.drop_gid(r["gid"])  # e.g. dest gone; nothing to resume
+                else:
+                    queued.append(r)
+        waiting = [r["gid"] for r in queued if r not in lost]
+        if waiting:
+            await _aria2.multicall([("pause", [g]) for g in waiting])  # the scheduler decides
+
+        for r in running + queued:
+            gid = r["gid"]
+            if r.get("origin"):
+                _origins[gid] = dict(r["origin"])
+            _progress.track(gid)
+            job = aria2_job(gid, priority=r["priority"], label=r["label"], dest=r["dest"])
+            await _scheduler.submit(job, running=r in running)
+        _restored = True
+        asyncio.ensure_future(_save_session())
+
+async def _save_session():
+    try:
+        await _aria2_rpc("saveSession", retries=0)
+    except Exception:
+        pass
 
 # ========= Filename helpers =========
 _SANITIZE_RE = re.compile(r'[\\/:*?"<>|\x00-\x1F]')
@@ -125,22 +204,7 @@ def _extract_query_filename(u: str) -> str | None:
 def _auth_header():
     return {"Authorization": f"Bearer {HF_TOKEN}"} if HF_TOKEN else {}
     
-def _head_follow(url: str, max_redirects: int = 5, token: str | None = None):
-    """HEAD first; if disallowed, try GET without reading body."""
-    opener = urllib.request.build_opener()
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # HEAD
-    req = urllib.request.Request(url, method="HEAD", headers=headers)
-    try:
-        return opener.open(req, timeout=10)
-    except urllib.error.HTTPError as e:
-        if e.code in (403, 405):
-            # fallback GET (still needs auth if private)
-            req_get = urllib.request.Request(url, method="GET", headers=headers)
-            return opener.open(req_get, timeout=10)
-        raise
-
-def _smart_guess_filename(url: str, token: str | None = None) -> tuple[str | None, bool]:
+async def _smart_guess_filename(url: str, token: str | None = None) -> tuple[str | None, bool]:
     """
     Returns (name, confident).
     confident=True only when derived from Content-Disposition or explicit query filename.
@@ -150,15 +214,12 @@ def _smart_guess_filename(url: str, token: str | None = None) -> tuple[str | Non
     if qn:
         return (qn, True)
 
-    # 2) HEAD/GET headers
-    try:
-        resp = _head_follow(url, token=token)
-        cd = resp.headers.get("Content-Disposition") or resp.headers.get("content-disposition")
-        n = _parse_cd_filename(cd) if cd else None
-        if n:
-            return (n, True)
-    except Exception:
-        pass
+    # 2) HEAD/GET headers (async, pooled, cached per URL)
+    info = await _probe(url, token=token)
+    cd = info.get("content_disposition")
+    n = _parse_cd_filename(cd) if cd else None
+    if n:
+        return (n, True)
 
     # 3) URL path (not confident; let aria2 decide if possible)
     try:
@@ -170,47 +231,239 @@ def _smart_guess_filename(url: str, token: str | None = None) -> tuple[str | Non
         pass
     return (None, False)
 
-def _eta(total_len, done_len, speed):
+# ========= Model index / verification =========
+_origins: dict[str, dict] = {}    # gid -> {url, etag, sha256, verify}, used on completion
+_verifying: dict[str, dict] = {}  # gid -> {"result": None | verify() result}
+
+def _link_existing(src: str | None, dest_dir: str, name: str | None = None) -> dict | None:
+    """Hardlink/reflink an indexed file into dest_dir; returns the /aria2/start reply."""
+    if not src:
+        return None
+    dst = os.path.join(dest_dir, name or os.path.basename(src))
     try:
-        total = int(total_len); done = int(done_len); spd = max(int(speed), 1)
-        remain = max(total - done, 0)
-        return remain // spd
-    except Exception:
+        how = link_into(src, dst)
+    except OSError:
+        how = None
+    if not how:
         return None
+    return {
+        "gid": "",
+        "status": "complete",
+        "dest_dir": dest_dir,
+        "filepath": dst,
+        "filename": os.path.basename(dst),
+        "linked": how,
+        "source": src,
+    }
+
+async def _verify_download(gid: str, path: str, origin: dict, slot: dict):
+    try:
+        res = await _verify(path)
+    except Exception as e:
+        res = {"ok": False, "path": path, "error": f"verify failed: {e}"}
+    if res["ok"]:
+        _index.record(path, url=origin["url"], etag=origin["etag"], sha256=res["sha256"])
+    else:
+        res["path"] = quarantine(path)
+    slot["result"] = res
+    _progress.track(gid)  # push the verdict on the next tick
+
+def _on_aria2_item(item: dict):
+    global _restored
+    gid = item.get("gid")
+    if item.get("status") in FINAL_STATES and _jobs.job_id_for(gid):
+        if item.get("lost"):
+            # the daemon forgot a persisted job (restarted without us): bring it back
+            _restored = False
+            asyncio.ensure_future(_ensure_aria2_daemon())
+        else:
+            _jobs.drop_gid(gid)
+    slot = _verifying.get(gid)
+    if slot is not None and item.get("status") == "complete":
+        res = slot["result"]
+        if res is None:
+            item["status"] = "verifying"
+        elif res["ok"]:
+            item["sha256"] = res["sha256"]
+        else:
+            item["status"] = "error"
+            item["error"] = res["error"]
+            item["filepath"] = res["path"]
+        return
+    if item.get("status") == "complete" and item.get("filepath"):
+        origin = _origins.pop(gid, None)
+        if not origin:
+            return
+        if origin.pop("verify") and not origin["sha256"]:
+            # no hash given to aria2 up front: hash it now, off the loop
+            slot = _verifying[gid] = {"result": None}
+            while len(_verifying) > 256:
+                _verifying.pop(next(iter(_verifying)))
+            asyncio.ensure_future(_verify_download(gid, item["filepath"], origin, slot))
+            item["status"] = "verifying"
+        else:
+            # aria2 already checked "checksum" when we had one
+            _index.record(item["filepath"], **origin)
+    elif item.get("status") in FINAL_STATES:
+        origin = _origins.pop(gid, None)
+        if origin and item.get("status") == "error":
+            _invalidate_probe(origin["url"])  # e.g. 403 from an expired signed URL: re-probe on retry
+
+_progress.add_listener(_on_aria2_item)
+
+def _record_item(item: dict):
+    """Mirror every pushed aria2/built-in status into the job store (buffered)."""
+    _store.update(item.get("gid") or "", state=item.get("status"), total=item.get("totalLength"),
+                  done=item.get("completedLength"), speed=item.get("downloadSpeed"),
+                  filepath=item.get("filepath"), error=item.get("error"))
+
+_progress.add_listener(_record_item)
+
+# ========= Status batching =========
+# Concurrent callers inside the same short window share one tellStatus result,
+# and every cache miss in a request is resolved with a single system.multicall.
+STATUS_CACHE_TTL = 0.25
+STATUS_BATCH_MAX = 500
+_status_cache: dict[str, tuple[float, dict]] = {}  # gid -> (t, tellStatus dict)
+_status_inflight: dict[str, asyncio.Future] = {}   # gid -> future(dict | Exception)
+
+def _prune_status_cache(now: float):
+    if len(_status_cache) < 256:
+        return
+    for g in [g for g, (t, _) in _status_cache.items() if now - t >= STATUS_CACHE_TTL]:
+        _status_cache.pop(g, None)
+
+async def _tell_status_many(gids: list[str]) -> dict:
+    """gid -> tellStatus dict, or the Exception raised for that gid."""
+    now = time.monotonic()
+    out, waiting, fetch = {}, {}, []
+    for g in dict.fromkeys(gids):
+        dl = _http.get(g)
+        if dl is not None:
+            out[g] = dl.tell()
+            continue
+        hit = _status_cache.get(g)
+        if hit and now - hit[0] < STATUS_CACHE_TTL:
+            out[g] = hit[1]
+        elif g in _status_inflight:
+            waiting[g] = _status_inflight[g]
+        else:
+            fetch.append(g)
+
+    if fetch:
+        loop = asyncio.get_running_loop()
+        futs = {g: loop.create_future() for g in fetch}
+        _status_inflight.update(futs)
+        try:
+            results = await _aria2.multicall([("tellStatus", [g, STATUS_KEYS]) for g in fetch])
+        except Exception as e:
+            results = [e] * len(fetch)
+        finally:
+            for g in fetch:
+                _status_inflight.pop(g, None)
+        t = time.monotonic()
+        _prune_status_cache(t)
+        for g, r in zip(fetch, results):
+            if not isinstance(r, Exception):
+                _status_cache[g] = (t, r)
+            # results (not exceptions) so unawaited futures don't warn
+            futs[g].set_result(r)
+            out[g] = r
+
+    for g, fut in waiting.items():
+        out[g] = await fut
+    return out
 
 # ========= API =========
-@PromptServer.instance.routes.post("/aria2/start")
-async def aria2_start(request):
-    body = await request.json()
-    url = (body.get("url") or "").strip()
-    dest_dir = _safe_expand(body.get("dest_dir") or os.getcwd())
-    token = (body.get("token") or "").strip()
-    
+async def start_aria2_download(url: str, dest_dir: str, token: str = "", priority: int = 0,
+                               user_sha: str | None = None, verify: bool = False,
+                               out: str | None = None) -> tuple[dict, int]:
+    """
+    Shared by /aria2/start and bulk manifests. Returns (reply, http_status);
+    a reply without a gid but with status "complete" was satisfied from disk.
+    """
+    url = (url or "").strip()
+    dest_dir = _safe_expand(dest_dir or os.getcwd())
+    user_sha = (user_sha or "").strip().lower() or None
+    verify = verify or bool(user_sha)
 
     if not url:
-        return web.json_response({"error": "URL is required."}, status=400)
+        return {"error": "URL is required."}, 400
+    if user_sha and not is_sha256(user_sha):
+        return {"error": "sha256 must be 64 hex characters."}, 400
 
     try:
         os.makedirs(dest_dir, exist_ok=True)
     except Exception as e:
-        return web.json_response({"error": f"Cannot access destination: {e}"}, status=400)
+        return {"error": f"Cannot access destination: {e}"}, 400
+    _paths.note(dest_dir)
 
     if not os.path.isdir(dest_dir) or not os.access(dest_dir, os.W_OK):
-        return web.json_response({"error": f"Destination not writable: {dest_dir}"}, status=400)
-
-    try:
-        _ensure_aria2_daemon()
-    except Exception as e:
-        return web.json_response({"error": str(e)}, status=500)
-
-    guessed_name, confident = _smart_guess_filename(url, token=token)
+        return {"error": f"Destination not writable: {dest_dir}"}, 400
+
+    # Same URL already fetched somewhere under the model roots? No network at all.
+    await _index.ensure_fresh()
+    linked = _link_existing(_index.find(url=url), dest_dir)
+    if linked:
+        return linked, 200
+
+    # one cached probe: filename, final (post-redirect) URL and size
+    info = await _probe(url, token=token or None)
+    if out:
+        guessed_name, confident = _sanitize_filename(out), True
+    else:
+        guessed_name, confident = await _smart_guess_filename(url, token=token or None)
+
+    size = info.get("size")
+    # hash known in advance: user-supplied, or HF's LFS sha256 when verifying
+    hf_sha = info.get("linked_etag") if is_sha256(info.get("linked_etag")) else None
+    expected = user_sha or (hf_sha if verify else None)
+    lookup_sha = user_sha or hf_sha
+    if info.get("ok") and size and (lookup_sha or info.get("etag")):
+        # index only (every hash we ever computed lands there): nothing is hashed on this path
+        src = _index.find(size=size, etag=info.get("etag") or None, sha256=lookup_sha)
+        if not src and lookup_sha and verify:
+            # same-size files nobody hashed yet: hash them in the background so the
+            # next request for this content links instead of downloading
+            asyncio.ensure_future(find_by_sha256(size, lookup_sha))
+        linked = _link_existing(src, dest_dir, guessed_name if confident else None)
+        if linked:
+            _index.record(linked["filepath"], url=url, etag=info.get("etag") or None,
+                          sha256=_index.sha256_for(linked["source"]))
+            return linked, 200
+
+    # aria2c when we can have it; the built-in range downloader otherwise
+    engine = "builtin" if _http.use_builtin() else "aria2"
+    if engine == "aria2":
+        try:
+            await _ensure_aria2_daemon()
+        except Exception as e:
+            if not _http.use_builtin(e):
+                return {"error": str(e)}, 500
+            engine = "builtin"
+
+    if size:
+        existing = 0
+        if confident and guessed_name:
+            try:
+                existing = os.path.getsize(os.path.join(dest_dir, guessed_name))
+            except OSError:
+                pass
+        try:
+            free = shutil.disk_usage(dest_dir).free
+        except OSError:
+            free = None
+        if free is not None and size - existing > free:
+            return {
+                "error": f"Not enough free space in {dest_dir}: need {size - existing} bytes, have {free}."
+            }, 400
 
     # Map CLI options and add browser-like headers to coax proper CD filename
     # NOTE: we set "out" ONLY if confident; otherwise we let aria2 use server-provided name.
+    serve_url = (info.get("final_url") or url) if info.get("ok") else url
     opts = {
         "continue": "true",
-        "max-connection-per-server": "16",
-        "split": "16",
+        **_hosts.options(serve_url, size),  # split/connections learned per serving host
         "dir": dest_dir,
         "auto-file-renaming": "true",
         "remote-time": "true",
@@ -222,6 +475,8 @@ async def aria2_start(request):
             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
         ],
         "max-tries": "5",
+        # added paused; the scheduler unpauses it when a slot frees up
+        "pause": "true",
     }
     if token:
         opts["header"].append(f"Authorization: Bearer {token}")
@@ -232,69 +487,137 @@ async def aria2_start(request):
 
     if confident and guessed_name:
         opts["out"] = guessed_name
-
+    if expected:
+        opts["checksum"] = f"sha-256={expected}"  # aria2 verifies on completion
+
+    # Start from the resolved URL (no second redirect chain); the original stays
+    # as a fallback mirror in case a signed URL expires mid-transfer.
+    uris = [url]
+    final_url = info.get("final_url") or url
+    if info.get("ok") and final_url != url:
+        uris = [final_url, url]
+        if "out" not in opts and guessed_name:
+            opts["out"] = guessed_name  # keep the original URL's name, not the CDN's
+
+    label = opts.get("out") or url
     try:
-        res = _aria2_rpc("addUri", [[url], opts])
-        gid = res.get("result")
-        if not gid:
-            return web.json_response({"error": "aria2c did not return a gid."}, status=500)
-        return web.json_response({
+        if engine == "builtin":
+            gid = _http.add(uris, opts, size=size, accept_ranges=info.get("accept_ranges"),
+                            name=guessed_name)
+            job_id = None  # resumes from its .azdl sidecar when started again
+            job = _http.http_job(gid, priority=priority, label=label, dest=dest_dir)
+        else:
+            res = await _aria2_rpc("addUri", [uris, opts])
+            gid = res.get("result")
+            if not gid:
+                return {"error": "aria2c did not return a gid."}, 500
+        _progress.track(gid)
+        _hosts.watch(gid, uris[0], int(opts["split"]))
+        _origins[gid] = {"url": url, "etag": info.get("etag") or None,
+                         "sha256": expected, "verify": verify}
+        if engine == "aria2":
+            job_id = _jobs.add(gid, uris, opts, priority=priority, label=label, dest=dest_dir,
+                               origin=dict(_origins[gid]))
+            job = aria2_job(gid, priority=priority, label=label, dest=dest_dir)
+            asyncio.ensure_future(_save_session())
+        _store.add(gid, engine, source=url, dest=dest_dir, filename=label, job_id=job_id,
+                   total=size or 0)
+        await _scheduler.submit(job)
+        return {
             "gid": gid,
+            "job_id": job_id,
+            "engine": engine,
+            "state": job.state,
             "dest_dir": dest_dir,
             "guessed_out": opts.get("out", "") or "",
             "confident": bool(confident),
-        })
+            "size": size,
+        }, 200
     except Exception as e:
-        return web.json_response({"error": f"aria2c RPC error: {e}"}, status=500)
+        return {"error": f"aria2c RPC error: {e}"}, 500
+
+@PromptServer.instance.routes.post("/aria2/start")
+async def aria2_start(request):
+    body = await request.json()
+    try:
+        priority = int(body.get("priority") or 0)
+    except (TypeError, ValueError):
+        priority = 0
+    data, status = await start_aria2_download(
+        body.get("url") or "",
+        body.get("dest_dir") or "",
+        token=(body.get("token") or "").strip(),
+        priority=priority,
+        user_sha=body.get("sha256"),
+        verify=wants_verify(body.get("verify")),
+    )
+    return web.json_response(data, status=status)
 
 @PromptServer.instance.routes.get("/aria2/status")
 async def aria2_status(request):
     gid = request.query.get("gid", "")
+    job_id = request.query.get("job", "")
+    if job_id and not gid:
+        gid = (_jobs.get(job_id) or {}).get("gid", "")
     if not gid:
         return web.json_response({"error": "gid is required."}, status=400)
+    await _ensure_restored()
+
+    st = (await _tell_status_many([gid]))[gid]
+    if isinstance(st, Aria2RPCError):
+        st = {}  # unknown gid -> "unknown" status, as before
+    elif isinstance(st, Exception):
+        return web.json_response({"error": f"aria2c RPC error: {st}"}, status=500)
+
+    out = normalize_aria2_status(st)
+    out["gid"] = gid
+    _progress.annotate(out)
+    if out["status"] not in FINAL_STATES:
+        _progress.track(gid)  # re-attach pushes, e.g. after a page reload
+    return web.json_response(out)
 
+@PromptServer.instance.routes.post("/aria2/status_batch")
+async def aria2_status_batch(request):
+    """
+    POST { gids: [gid, ...] }
+    Returns { items: [ {gid, status, percent, eta, filename, filepath, ...}, ... ] }
+    in request order; per-gid failures carry an "error" field.
+    """
     try:
-        res = _aria2_rpc("tellStatus", [gid, [
-            "status", "totalLength", "completedLength", "downloadSpeed",
-            "errorMessage", "files", "dir"
-        ]])
-        st = res.get("result", {})
-    except Exception as e:
-        return web.json_response({"error": f"aria2c RPC error: {e}"}, status=500)
-
-    status = st.get("status", "unknown")
-    total = int(st.get("totalLength", "0") or "0")
-    done = int(st.get("completedLength", "0") or "0")
-    speed = int(st.get("downloadSpeed", "0") or "0")
-    percent = (done / total * 100.0) if total > 0 else (100.0 if status == "complete" else 0.0)
-
-    filepath = ""
-    filename = ""
-    try:
-        files = st.get("files") or []
-        if files:
-            fp = files[0].get("path") or ""
-            if fp:
-                filepath = fp
-                filename = os.path.basename(fp)
-        if not filepath and st.get("dir") and filename:
-            filepath = os.path.join(st["dir"], filename)
+        body = await request.json()
     except Exception:
-        pass
-
-    out = {
-        "status": status,
-        "percent": round(percent, 2),
-        "completedLength": done,
-        "totalLength": total,
-        "downloadSpeed": speed,
-        "eta": _eta(total, done, speed),
-        "filename": filename,
-        "filepath": filepath,
-    }
-    if status == "error":
-        out["error"] = st.get("errorMessage", "unknown error")
-    return web.json_response(out)
+        body = {}
+    gids = body.get("gids") or []
+    if isinstance(gids, str):
+        gids = gids.split(",")
+    gids = [str(g).strip() for g in gids if str(g).strip()]
+    if not gids:
+        return web.json_response({"error": "gids is required."}, status=400)
+    if len(gids) > STATUS_BATCH_MAX:
+        return web.json_response({"error": f"At most {STATUS_BATCH_MAX} gids per request."}, status=400)
+    await _ensure_restored()
+
+    resolved = await _tell_status_many(gids)
+    items = []
+    for gid in gids:
+        st = resolved.get(gid)
+        if isinstance(st, Exception):
+            items.append({"gid": gid, "status": "unknown", "error": f"aria2c RPC error: {st}"})
+            continue
+        item = normalize_aria2_status(st or {})
+        item["gid"] = gid
+        items.append(_progress.annotate(item))
+    return web.json_response({"items": items})
+
+async def stop_aria2_download(gid: str):
+    """Shared by /aria2/stop and the HF routes; raises on RPC failure."""
+    dl = _http.get(gid)
+    if dl is not None:
+        await dl.remove()
+        return
+    await _aria2_rpc("remove", [gid])
+    _scheduler.finished(gid)
+    _jobs.drop_gid(gid)
 
 @PromptServer.instance.routes.post("/aria2/stop")
 async def aria2_stop(request):
@@ -303,11 +626,53 @@ async def aria2_stop(request):
     if not gid:
         return web.json_response({"error": "gid is required."}, status=400)
     try:
-        _aria2_rpc("remove", [gid])
+        await stop_aria2_download(gid)
         return web.json_response({"ok": True})
     except Exception as e:
         return web.json_response({"error": f"aria2c RPC error: {e}"}, status=500)
 
+@PromptServer.instance.routes.get("/aria2/job")
+async def aria2_job_lookup(request):
+    """GET ?id=<job_id> -> { job_id, gid, label, dest, priority, created } (stable across restarts)."""
+    rec = _jobs.get(request.query.get("id", ""))
+    if not rec:
+        return web.json_response({"error": "unknown job id."}, status=404)
+    await _ensure_restored()
+    return web.json_response({k: rec[k] for k in ("job_id", "gid", "label", "dest", "priority", "created")})
+
+async def _ensure_restored():
+    """Persisted jobs are re-attached on first contact after a restart."""
+    if _restored or not len(_jobs):
+        return
+    try:
+        await _ensure_aria2_daemon()
+    except Exception:
+        pass
+
+async def _reattach_jobs():
+    """aria2 jobs the job store saw open last run: follow them again (lost gids turn into errors)."""
+    rows = _store.take_leftover("aria2")
+    if not rows:
+        return
+    try:
+        await _ensure_aria2_daemon()
+    except Exception as e:
+        for r in rows:
+            _store.update(r["gid"], state="error", error=f"Interrupted by restart: {e}")
+        return
+    for r in rows:
+        _progress.track(r["gid"])
+
+def _restore_on_startup():
+    _store.interrupt("http")  # the built-in engine resumes only when started again
+    loop = getattr(PromptServer.instance, "loop", None)
+    if loop is not None and len(_jobs):
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(_ensure_restored()))
+    if loop is not None and _store.leftover:
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(_reattach_jobs()))
+
+_restore_on_startup()
+
 # ========= UI-only node =========
 class Aria2Downloader:
     @classmethod
@@ -4,6 +4,7 @@ from .extra_node import AzInput, OverrideCLIPDevice, FluxResolutionNode, GetImag
 from .path_uploader import PathUploader
 from .Downloader_helper import Aria2Downloader
 from .hf_hub_downloader import hf_hub_downloader
+from . import manifest  # /az/manifest routes
 
 
 NODE_CLASS_MAPPINGS = {
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming extraction of uploaded archives (POST /az/upload with extract=1).
+- the request body is handed to a worker thread through a bounded queue, and
+  members are written into dest_dir while the archive is still arriving; the
+  archive itself never touches the disk
+- tar (plain, gz, bz2, xz) through tarfile's stream mode; tar.zst through
+  zstandard (optional: pip install zstandard)
+- zip is read entry by entry from its local headers (stored / deflate). Only
+  when an entry cannot be streamed (stored with a trailing data descriptor,
+  other compression methods) is the rest of the archive spooled to a temp file
+  and finished through its central directory
+- member names are checked before anything is written: absolute paths, drive
+  letters, ".." and names that resolve outside dest_dir are skipped, as are
+  links and special files
+- per-member progress is pushed as az.extract.progress events
+"""
+
+import os
+import io
+import time
+import queue
+import struct
+import asyncio
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+import threading
+import zlib
+
+from .progress import emit, SAMPLE_INTERVAL
+
+EXTRACT_EVENT = "az.extract.progress"
+STREAM_QUEUE = 16
+WRITE_CHUNK = 1 << 20
+SPOOL_MEMORY = 64 << 20  # zip fallback: spool in memory up to this, then to a temp file
+
+_ZIP_LOCAL = b"PK\x03\x04"
+_ZIP_CENTRAL = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06")
+_ZIP_DESCRIPTOR = b"PK\x07\x08"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_LOCAL = struct.Struct("<4sHHHHHIIIHH")
+
+
+class ExtractError(Exception):
+    pass
+
+class _Aborted(Exception):
+    pass
+
+class _Unstreamable(Exception):
+    """A zip entry needs the central directory; carries the header bytes already read."""
+
+    def __init__(self, header: bytes):
+        super().__init__("zip entry needs the central directory")
+        self.header = header
+
+
+class _Pipe(io.RawIOBase):
+    """Blocking reader over chunks the event loop puts in (one slot released per chunk)."""
+
+    def __init__(self, release):
+        self._q: queue.Queue = queue.Queue()
+        self._release = release
+        self._buf = b""
+        self._pos = 0  # read offset into _buf (no copy per small read)
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def feed(self, item):
+        """bytes, None (end of stream) or False (abort)."""
+        self._q.put(item)
+
+    def _fill(self, n: int):
+        while len(self._buf) - self._pos < n and not self._eof:
+            item = self._q.get()
+            if item is None:
+                self._eof = True
+            elif item is False:
+                raise _Aborted()
+            else:
+                self._release()
+                self._buf = self._buf[self._pos:] + item
+                self._pos = 0
+
+    def peek(self, n: int) -> bytes:
+        self._fill(n)
+        return self._buf[self._pos:self._pos + n]
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0:
+            out = []
+            while True:
+                b = self.read(WRITE_CHUNK)
+                if not b:
+                    return b"".join(out)
+                out.append(b)
+        self._fill(1)
+        out = self._buf[self._pos:self._pos + n]
+        self._pos += len(out)
+        return out
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def read_exact(self, n: int) -> bytes:
+        self._fill(n)
+        if len(self._buf) - self._pos < n:
+            raise ExtractError("Archive ended unexpectedly.")
+        return self.read(n)
+
+    def unread(self, data: bytes):
+        if data:
+            self._buf = data + self._buf[self._pos:]
+            self._pos = 0
+
+    def drain(self):
+        try:
+            while self.read(WRITE_CHUNK):
+                pass
+        except _Aborted:
+            pass
+
+
+def _member_path(dest: str, name: str) -> str | None:
+    """Absolute target for an archive member, or None if it would leave dest."""
+    name = name.replace("\\", "/")
+    if name.startswith("/") or (len(name) > 1 and name[1] == ":"):
+        return None
+    parts = [p for p in name.split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    target = os.path.join(dest, *parts)
+    parent = os.path.realpath(os.path.dirname(target))
+    if parent != dest and not parent.startswith(dest + os.sep):
+        return None  # through a symlinked folder
+    return target
+
+
+class _Extractor:
+    """
+    Same put()/close() contract as path_uploader._StreamWriter, but unpacks the
+    stream into dest instead of saving it. close() returns the archive's sha256.
+    """
+
+    def __init__(self, dest: str, archive: str = "", uid: str = "", fsync: str = "end"):
+        self.dest = os.path.realpath(dest)
+        self.archive = archive
+        self.uid = uid
+        self.fsync = fsync != "off"
+        self.bytes = 0
+        self.total = 0  # bytes written into dest
+        self.files: list[dict] = []
+        self.skipped: list[dict] = []
+        self.error: Exception | None = None
+        self._slots = asyncio.Semaphore(STREAM_QUEUE)
+        self._loop = asyncio.get_running_loop()
+        self._done = self._loop.create_future()
+        self._pipe = _Pipe(lambda: self._loop.call_soon_threadsafe(self._slots.release))
+        self._sha = hashlib.sha256()
+        self._names: set[str] = set()
+        self._last_emit = 0.0
+        threading.Thread(target=self._run, name="az-extract", daemon=True).start()
+
+    async def put(self, chunk: bytes):
+        if self.error is not None:
+            raise self.error
+        await self._slots.acquire()
+        self._sha.update(chunk)
+        self.bytes += len(chunk)
+        self._pipe.feed(chunk)
+
+    async def close(self, ok: bool = True) -> str:
+        """ok: finish the archive, returns its sha256; else stop (members written so far stay)."""
+        self._pipe.feed(None if ok else False)
+        await asyncio.shield(self._done)
+        if ok and self.error is not None:
+            raise self.error
+        return self._sha.hexdigest()
+
+    # ---------- worker ----------
+    def _run(self):
+        try:
+            head = self._pipe.peek(4)
+            if head == _ZIP_LOCAL or head[:4] in _ZIP_CENTRAL:
+                self._zip()
+            elif head == _ZSTD_MAGIC:
+                self._tar(_zstd_reader(self._pipe))
+            else:
+                self._tar(self._pipe)
+            self._pipe.drain()  # trailing padding / central directory
+            self._emit("complete")
+        except _Aborted:
+            self.error = ExtractError("Upload aborted.")
+        except Exception as e:
+            self.error = e if isinstance(e, ExtractError) else ExtractError(f"{type(e).__name__}: {e}")
+            self._emit("error", error=str(self.error))
+            self._pipe.drain()  # keep consuming so put() never blocks forever
+        finally:
+            self._loop.call_soon_threadsafe(self._done.set_result, None)
+
+    def _emit(self, state: str, member: str = "", done: int = 0, size: int | None = None,
+              force: bool = True, **extra):
+        now = time.monotonic()
+        if not force and now - self._last_emit < SAMPLE_INTERVAL:
+            return
+        self._last_emit = now
+        emit(EXTRACT_EVENT, {
+            "id": self.uid, "archive": self.archive, "state": state,
+            "member": member, "memberBytes": done, "memberSize": size,
+            "files": len(self.files), "skipped": len(self.skipped),
+            "written": self.total, "received": self.bytes, **extra,
+        })
+
+    def _skip(self, name: str, reason: str):
+        self.skipped.append({"name": name, "reason": reason})
+
+    def _write(self, name: str, chunks, size: int | None = None):
+        """Write one member from an iterable of byte chunks (temp file + rename)."""
+        target = _member_path(self.dest, name)
+        if target is None:
+            for _ in chunks:
+                pass
+            self._skip(name, "outside destination")
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target),
+                                   prefix=f".{os.path.basename(target)}.", suffix=".part")
+        done = 0
+        try:
+            with os.fdopen(fd, "wb", buffering=0) as f:
+                self._emit("extracting", name, 0, size)
+                for chunk in chunks:
+                    f.write(chunk)
+                    done += len(chunk)
+                    self.total += len(chunk)
+                    self._emit("extracting", name, done, size, force=False)
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self._names.add(name)
+        self.files.append({"name": name, "path": target, "bytes": done})
+        self._emit("extracting", name, done, size)
+
+    def _mkdir(self, name: str):
+        target = _member_path(self.dest, name)
+        if target is None:
+            self._skip(name, "outside destination")
+        else:
+            os.makedirs(target, exist_ok=True)
+
+    # ---------- tar ----------
+    def _tar(self, src):
+        try:
+            tf = tarfile.open(fileobj=src, mode="r|*")
+        except tarfile.ReadError:
+            raise ExtractError("Not a tar or zip archive.")
+        with tf:
+            for m in tf:
+                if m.isdir():
+                    self._mkdir(m.name)
+                elif m.isreg():
+                    f = tf.extractfile(m)
+                    self._write(m.name, iter(lambda: f.read(WRITE_CHUNK), b""), m.size)
+                else:
+                    self._skip(m.name, "links and special files are not extracted")
+
+    # ---------- zip ----------
+    def _zip(self):
+        p = self._pipe
+        try:
+            while True:
+                sig = p.peek(4)
+                if sig[:4] in _ZIP_CENTRAL or not sig:
+                    return
+                if sig != _ZIP_LOCAL:
+                    raise ExtractError("Corrupt zip: unexpected data between entries.")
+                self._zip_entry()
+        except _Unstreamable as u:
+            p.unread(u.header)
+            self._zip_spooled()
+
+    def _zip_entry(self):
+        p = self._pipe
+        raw = p.read_exact(_LOCAL.size)
+        (_sig, _ver, flags, method, _t, _d, crc, csize, usize, nlen, xlen) = _LOCAL.unpack(raw)
+        name_b = p.read_exact(nlen)
+        extra = p.read_exact(xlen)
+        header = raw + name_b + extra
+        name = name_b.decode("utf-8" if flags & 0x800 else "cp437", "replace")
+        if flags & 0x1:
+            raise ExtractError(f"Encrypted zip entries are not supported ({name}).")
+
+        zip64 = False
+        i = 0
+        while i + 4 <= len(extra):
+            tag, ln = struct.unpack_from("<HH", extra, i)
+            if tag == 0x0001:
+                zip64 = True
+                vals = list(struct.unpack_from(f"<{ln // 8}Q", extra, i + 4))
+                if usize == 0xFFFFFFFF and vals:
+                    usize = vals.pop(0)
+                if csize == 0xFFFFFFFF and vals:
+                    csize = vals.pop(0)
+            i += 4 + ln
+
+        descriptor = bool(flags & 0x8)
+        if method not in (0, 8) or (method == 0 and descriptor):
+            raise _Unstreamable(header)
+
+        if name.endswith("/"):
+            self._mkdir(name)
+        else:
+            state = {"crc": 0}
+            self._write(name, self._zip_data(method, csize, descriptor, state),
+                        None if descriptor else usize)
+            if descriptor:
+                crc = self._zip_descriptor(zip64)
+            if state["crc"] != crc:
+                raise ExtractError(f"CRC mismatch in {name}.")
+            return
+        if method == 8:
+            for _ in self._zip_data(method, csize, descriptor, {"crc": 0}):
+                pass
+        else:
+            p.read_exact(csize)
+        if descriptor:
+            self._zip_descriptor(zip64)
+
+    def _zip_data(self, method: int, csize: int, descriptor: bool, state: dict):
+        p = self._pipe
+        if method == 0:
+            left = csize
+            while left:
+                b = p.read(min(left, WRITE_CHUNK))
+                if not b:
+                    raise ExtractError("Archive ended unexpectedly.")
+                left -= len(b)
+                state["crc"] = zlib.crc32(b, state["crc"])
+                yield b
+            return
+        d = zlib.decompressobj(-15)
+        left = None if descriptor else csize
+        while not d.eof:
+            b = p.read(WRITE_CHUNK if left is None else min(left, WRITE_CHUNK))
+            if not b:
+                raise ExtractError("Archive ended unexpectedly.")
+            if left is not None:
+                left -= len(b)
+            out = d.decompress(b)
+            if out:
+                state["crc"] = zlib.crc32(out, state["crc"])
+                yield out
+        p.unread(d.unused_data)
+        if left:
+            p.read_exact(left)
+
+    def _zip_descriptor(self, zip64: bool) -> int:
+        p = self._pipe
+        if p.peek(4) == _ZIP_DESCRIPTOR:
+            p.read_exact(4)
+        crc, = struct.unpack("<I", p.read_exact(4))
+        p.read_exact(16 if zip64 else 8)
+        return crc
+
+    def _zip_spooled(self):
+        """Rest of the archive -> spool, then finish it through the central directory."""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY, dir=self.dest,
+                                           prefix=".azextract.", suffix=".zip") as spool:
+            self._emit("spooling")
+            while True:
+                b = self._pipe.read(WRITE_CHUNK)
+                if not b:
+                    break
+                spool.write(b)
+            spool.seek(0)
+            try:
+                # offsets come out negative for the entries already streamed
+                # (zipfile treats the missing head like prepended data)
+                zf = zipfile.ZipFile(spool)
+            except zipfile.BadZipFile as e:
+                raise ExtractError(f"Corrupt zip: {e}")
+            with zf:
+                for info in zf.infolist():
+                    if info.header_offset < 0 or info.filename in self._names:
+                        continue
+                    if info.is_dir():
+                        self._mkdir(info.filename)
+                        continue
+                    if info.flag_bits & 0x1:
+                        raise ExtractError(f"Encrypted zip entries are not supported ({info.filename}).")
+                    with zf.open(info) as f:
+                        self._write(info.filename, iter(lambda: f.read(WRITE_CHUNK), b""), info.file_size)
+
+
+def _zstd_reader(src):
+    try:
+        import zstandard
+    except ImportError:
+        raise ExtractError("tar.zst archives need zstandard (pip install zstandard).")
+    return zstandard.ZstdDecompressor().stream_reader(src, read_across_frames=True)
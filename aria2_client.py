@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Async aria2 JSON-RPC client shared by the download routes.
+- one keep-alive aiohttp.ClientSession per event loop (pooled connections)
+- per-call timeout + retries on transport errors
+- system.multicall for batching several calls into one round trip
+"""
+
+import os
+import asyncio
+from uuid import uuid4
+
+import aiohttp
+
+# ========= Config =========
+ARIA2_SECRET = os.environ.get("COMFY_ARIA2_SECRET", "comfyui_aria2_secret")
+ARIA2_RPC_URL = os.environ.get("COMFY_ARIA2_RPC", "http://127.0.0.1:6800/jsonrpc")
+ARIA2_RPC_TIMEOUT = float(os.environ.get("COMFY_ARIA2_RPC_TIMEOUT", "10"))
+ARIA2_RPC_RETRIES = int(os.environ.get("COMFY_ARIA2_RPC_RETRIES", "2"))
+
+
+class Aria2RPCError(RuntimeError):
+    """aria2 answered, but with a JSON-RPC error object."""
+
+    def __init__(self, code, message):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+
+
+class Aria2Client:
+    def __init__(self, url: str = ARIA2_RPC_URL, secret: str = ARIA2_SECRET,
+                 timeout: float = ARIA2_RPC_TIMEOUT, retries: int = ARIA2_RPC_RETRIES):
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+        self.retries = retries
+        self._session: aiohttp.ClientSession | None = None
+
+    # ---------- session ----------
+    def session(self) -> aiohttp.ClientSession:
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        s = self._session
+        if s is None or s.closed or getattr(s, "_loop", loop) is not loop:
+            connector = aiohttp.TCPConnector(limit=8, keepalive_timeout=60)
+            s = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Content-Type": "application/json"},
+            )
+            self._session = s
+        return s
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ---------- low level ----------
+    def _params(self, params):
+        return [f"token:{self.secret}"] + list(params or [])
+
+    async def _post(self, payload: dict, timeout: float | None = None, retries: int | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        last_exc = None
+        for attempt in range(retries + 1):
+            try:
+                session = self.session()
+                async with session.post(
+                    self.url, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as resp:
+                    # aria2 returns 400/500 bodies that still carry a JSON-RPC error
+                    return await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_exc = e
+                if attempt < retries:
+                    await asyncio.sleep(0.15 * (2 ** attempt))
+        raise last_exc
+
+    # ---------- API ----------
+    async def call_raw(self, method: str, params=None, timeout: float | None = None,
+                       retries: int | None = None) -> dict:
+        """Full JSON-RPC response dict ({"result": ...} or {"error": ...})."""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": str(uuid4()),
+            "method": f"aria2.{method}",
+            "params": self._params(params),
+        }
+        return await self._post(payload, timeout=timeout, retries=retries)
+
+    async def call(self, method: str, params=None, timeout: float | None = None,
+                   retries: int | None = None):
+        """Result of a single call; raises Aria2RPCError on an RPC error."""
+        res = await self.call_raw(method, params, timeout=timeout, retries=retries)
+        if "error" in res:
+            err = res["error"] or {}
+            raise Aria2RPCError(err.get("code"), err.get("message", "unknown error"))
+        return res.get("result")
+
+    async def multicall(self, calls, timeout: float | None = None) -> list:
+        """
+        calls: [(method, params), ...]
+        Returns one entry per call: the result, or an Aria2RPCError instance.
+        """
+        if not calls:
+            return []
+        methods = [
+            {"methodName": f"aria2.{m}", "params": self._params(p)}
+            for m, p in calls
+        ]
+        payload = {
+            "jsonrpc": "2.0",
+            "id": str(uuid4()),
+            "method": "system.multicall",
+            "params": [methods],
+        }
+        res = await self._post(payload, timeout=timeout)
+        if "error" in res:
+            err = res["error"] or {}
+            raise Aria2RPCError(err.get("code"), err.get("message", "unknown error"))
+        out = []
+        for item in res.get("result") or []:
+            # success -> [value], failure -> {"code":..,"message":..}
+            if isinstance(item, list):
+                out.append(item[0] if item else None)
+            else:
+                out.append(Aria2RPCError(item.get("code"), item.get("message", "unknown error")))
+        return out
+
+
+# shared instance used by all routes
+client = Aria2Client()
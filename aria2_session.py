@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Persistence for aria2 downloads across ComfyUI / daemon restarts.
+- the daemon is started with --save-session/--input-file on one session file,
+  saved every SESSION_SAVE_INTERVAL seconds and after each new download
+- our own job ids map to aria2 gids in a small JSON store, together with what
+  is needed to re-add a download (uris, options, priority, origin); a re-added
+  download keeps its gid (aria2 "gid" option) and resumes from its .aria2
+  control file
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+
+from .storage import state_path
+
+SESSION_FILE = os.environ.get("COMFY_AZ_ARIA2_SESSION", "") or state_path("aria2.session")
+SESSION_SAVE_INTERVAL = int(os.environ.get("COMFY_AZ_ARIA2_SAVE_INTERVAL", "30"))
+JOBS_FILE = "aria2_jobs.json"
+
+
+def session_args() -> list[str]:
+    """Extra aria2c arguments for a persistent session."""
+    args = [
+        f"--save-session={SESSION_FILE}",
+        f"--save-session-interval={SESSION_SAVE_INTERVAL}",
+    ]
+    if os.path.isfile(SESSION_FILE):
+        args.append(f"--input-file={SESSION_FILE}")  # aria2c refuses a missing input file
+    return args
+
+
+class Aria2JobStore:
+    """job_id -> {gid, uris, opts, priority, label, dest, origin, created}."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or state_path(JOBS_FILE)
+        self._jobs: dict[str, dict] = {}
+        self._gids: dict[str, str] = {}  # gid -> job_id
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._jobs = dict(json.load(f).get("jobs") or {})
+        except (OSError, ValueError):
+            self._jobs = {}
+        self._gids = {j["gid"]: jid for jid, j in self._jobs.items() if j.get("gid")}
+
+    def _save(self):
+        payload = json.dumps({"version": 1, "jobs": self._jobs})
+        tmp = f"{self.path}.tmp"
+        try:
+            # options may carry an Authorization header
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def add(self, gid: str, uris: list[str], opts: dict, priority: int = 0,
+            label: str = "", dest: str = "", origin: dict | None = None) -> str:
+        job_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._jobs[job_id] = {
+                "gid": gid, "uris": list(uris), "opts": dict(opts), "priority": int(priority),
+                "label": label, "dest": dest, "origin": origin, "created": time.time(),
+            }
+            self._gids[gid] = job_id
+            self._save()
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        j = self._jobs.get(job_id)
+        return dict(j, job_id=job_id) if j else None
+
+    def job_id_for(self, gid: str) -> str | None:
+        return self._gids.get(gid)
+
+    def drop_gid(self, gid: str):
+        with self._lock:
+            jid = self._gids.pop(gid, None)
+            if jid and self._jobs.pop(jid, None) is not None:
+                self._save()
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            return [dict(j, job_id=jid) for jid, j in self._jobs.items()]
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+jobs = Aria2JobStore()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Cached directory listings for the destination pickers (/az/listdir).
+- one os.scandir per directory (d_type: no stat per entry on most filesystems),
+  names kept in the picker's usual sorted() order, plus a case-insensitive
+  key index for prefix bisects
+- LRU cache keyed by path and validated by the directory's mtime
+- on Linux, cached directories are also watched with inotify: local changes
+  drop the entry at once and watched entries skip the mtime stat; they are
+  still re-checked every REVALIDATE seconds for changes made by other hosts
+  (network volumes)
+
+COMFY_AZ_LISTDIR_INOTIFY: auto (default) | off
+"""
+
+import os
+import sys
+import time
+import bisect
+import ctypes
+import select
+import struct
+import threading
+from collections import OrderedDict
+
+CACHE_MAX = int(os.environ.get("COMFY_AZ_LISTDIR_CACHE", "512"))
+REVALIDATE = float(os.environ.get("COMFY_AZ_LISTDIR_REVALIDATE", "10"))
+INOTIFY = os.environ.get("COMFY_AZ_LISTDIR_INOTIFY", "auto").lower() != "off"
+
+# <sys/inotify.h>
+IN_ATTRIB, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x4, 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_IGNORED, IN_ONLYDIR = 0x400, 0x800, 0x8000, 0x01000000
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_WATCH_MASK = (IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")
+
+
+def _keys(names: list[str]) -> tuple[list[str], list[str]]:
+    """(lowered names, names) sorted case-insensitively: the prefix index for page()."""
+    pairs = sorted((n.lower(), n) for n in names)
+    return [k for k, _n in pairs], [n for _k, n in pairs]
+
+
+class _Listing:
+    __slots__ = ("mtime", "checked", "folders", "files", "fkeys", "gkeys", "watched")
+
+    def __init__(self, mtime: int, folders: list[str], files: list[str]):
+        self.mtime = mtime
+        self.checked = time.monotonic()
+        self.folders = sorted(folders)
+        self.files = sorted(files)
+        self.fkeys = _keys(folders)
+        self.gkeys = _keys(files)
+        self.watched = False
+
+
+class _Inotify:
+    """Minimal inotify over ctypes: wd <-> path, callback on any change."""
+
+    def __init__(self, on_change):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._on_change = on_change
+        self._paths: dict[int, str] = {}
+        self._wds: dict[str, int] = {}
+        threading.Thread(target=self._run, name="az-listdir-inotify", daemon=True).start()
+
+    def watch(self, path: str) -> bool:
+        if path in self._wds:
+            return True
+        wd = self._add(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            return False  # e.g. max_user_watches reached: mtime checks only
+        self._paths[wd] = path
+        self._wds[path] = wd
+        return True
+
+    def unwatch(self, path: str):
+        wd = self._wds.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self._rm(self.fd, wd)
+
+    def _run(self):
+        while True:
+            try:
+                select.select([self.fd], [], [])
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            i = 0
+            while i + _EVENT.size <= len(data):
+                wd, mask, _cookie, n = _EVENT.unpack_from(data, i)
+                i += _EVENT.size + n
+                path = self._paths.get(wd)
+                if path is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._paths.pop(wd, None)
+                    self._wds.pop(path, None)
+                self._on_change(path)
+
+
+class DirCache:
+    def __init__(self, maxsize: int = CACHE_MAX, inotify: bool = INOTIFY):
+        self.maxsize = maxsize
+        self._d: OrderedDict[str, _Listing] = OrderedDict()
+        self._lock = threading.Lock()
+        self._changes = 0  # bumped by every invalidation
+        self._ino: _Inotify | None = None
+        if inotify and sys.platform.startswith("linux"):
+            try:
+                self._ino = _Inotify(self.invalidate)
+            except (OSError, AttributeError):
+                self._ino = None
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._d.pop(path, None)
+            self._changes += 1
+        if self._ino is not None:
+            self._ino.unwatch(path)  # re-watched on the next listing
+
+    def _scan(self, path: str, mtime: int) -> _Listing:
+        folders, files = [], []
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    (folders if e.is_dir() else files).append(e.name)
+                except OSError:
+                    continue  # skip entries we cannot stat
+        return _Listing(mtime, folders, files)
+
+    def get(self, path: str) -> _Listing:
+        """Listing of an absolute directory path; raises like os.scandir."""
+        with self._lock:
+            hit = self._d.get(path)
+            if hit is not None:
+                self._d.move_to_end(path)
+        now = time.monotonic()
+        if hit is not None and hit.watched and now - hit.checked < REVALIDATE:
+            return hit
+        st = os.stat(path)
+        if hit is not None and hit.mtime == st.st_mtime_ns:
+            hit.checked = now
+            return hit
+
+        # watch before scanning, so a change during the scan is not lost
+        changes = self._changes
+        watched = self._ino is not None and self._ino.watch(path)
+        listing = self._scan(path, st.st_mtime_ns)
+        evicted = []
+        with self._lock:
+            # an event during the scan may predate it: fall back to mtime checks
+            listing.watched = watched and changes == self._changes
+            self._d[path] = listing
+            self._d.move_to_end(path)
+            while len(self._d) > self.maxsize:
+                evicted.append(self._d.popitem(last=False)[0])
+        if self._ino is not None:
+            for p in evicted:
+                self._ino.unwatch(p)
+        return listing
+
+
+def page(names: list[str], keys: tuple[list[str], list[str]], prefix: str, offset: int,
+         limit: int | None) -> tuple[list[str], int]:
+    """Names starting with prefix (case-insensitive), in listing order -> (one page, total matches)."""
+    if prefix:
+        lowered, by_key = keys
+        p = prefix.lower()
+        lo = bisect.bisect_left(lowered, p)
+        hi = bisect.bisect_left(lowered, p + "\uffff", lo)
+        names = sorted(by_key[lo:hi])
+    end = None if limit is None else offset + limit
+    return names[offset:end], len(names)
+
+
+cache = DirCache()
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Shared download scheduler for the aria2 and HF routes.
+- bounded active set across both engines (urgent jobs first, by priority)
+- aria2 jobs are added paused and unpaused when a slot frees up, so they get
+  a gid (and UI progress) immediately; queue order is mirrored with changePosition
+- pause / resume / reprioritize at runtime
+- a job whose start fails is dropped from its engine (aria2 forceRemove),
+  marked error in the job store and pushed to the UI as an error
+- global bandwidth cap: aria2 changeGlobalOption(max-overall-download-limit);
+  the built-in HTTP engine reads it for its own shared token bucket
+
+Routes:
+- GET  /az/queue           : jobs + limits
+- POST /az/queue/priority  : { gid, priority }
+- POST /az/queue/pause     : { gid }
+- POST /az/queue/resume    : { gid }
+- POST /az/queue/limits    : { max_active?, max_download_limit? }
+"""
+
+import os
+import time
+import asyncio
+import itertools
+from typing import Awaitable, Callable
+
+from aiohttp import web
+from server import PromptServer
+
+from .aria2_client import client as _aria2
+from .progress import broadcaster as _progress, emit, ARIA2_EVENT, FINAL_STATES
+from .job_store import store as _store
+
+MAX_ACTIVE = int(os.environ.get("COMFY_AZ_MAX_ACTIVE", "3"))
+# aria2 syntax: bytes/sec, or with K/M suffix; "0" = unlimited
+MAX_DOWNLOAD_LIMIT = os.environ.get("COMFY_AZ_MAX_DOWNLOAD_LIMIT", "0")
+
+
+class Job:
+    __slots__ = ("gid", "engine", "priority", "seq", "state", "label", "dest",
+                 "created", "started", "error", "start", "pause", "remove")
+
+    def __init__(self, gid: str, engine: str, start: Callable[[], Awaitable],
+                 priority: int = 0, label: str = "", dest: str = "",
+                 pause: Callable[[], Awaitable] | None = None,
+                 remove: Callable[[], Awaitable] | None = None):
+        self.gid = gid
+        self.engine = engine
+        self.priority = int(priority)
+        self.seq = 0
+        self.state = "queued"  # queued | active | paused
+        self.label = label
+        self.dest = dest
+        self.created = time.time()
+        self.started = None
+        self.error = None
+        self.start = start  # queued -> active (also resumes a paused job)
+        self.pause = pause  # active -> paused (None: engine can't pause)
+        self.remove = remove  # drops what a failed start() left in the engine
+
+    def to_dict(self) -> dict:
+        return {
+            "gid": self.gid,
+            "engine": self.engine,
+            "priority": self.priority,
+            "state": self.state,
+            "label": self.label,
+            "dest": self.dest,
+            "created": self.created,
+            "started": self.started,
+            "error": self.error,
+        }
+
+
+class DownloadScheduler:
+    def __init__(self, max_active: int = MAX_ACTIVE, max_download_limit: str = MAX_DOWNLOAD_LIMIT):
+        self.max_active = max(1, int(max_active))
+        self.max_download_limit = str(max_download_limit)
+        self._jobs: dict[str, Job] = {}
+        self._seq = itertools.count()
+        self._lock = asyncio.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        _progress.add_listener(self._on_aria2_status)
+
+    # ---------- queue ----------
+    def _queued(self) -> list[Job]:
+        q = [j for j in self._jobs.values() if j.state == "queued"]
+        q.sort(key=lambda j: (-j.priority, j.seq))
+        return q
+
+    def _active_count(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.state == "active")
+
+    def get(self, gid: str) -> Job | None:
+        return self._jobs.get(gid)
+
+    def snapshot(self) -> dict:
+        order = {j.gid: i for i, j in enumerate(self._queued())}
+        jobs = sorted(self._jobs.values(),
+                      key=lambda j: (j.state != "active", order.get(j.gid, 0), j.seq))
+        return {
+            "max_active": self.max_active,
+            "max_download_limit": self.max_download_limit,
+            "active": self._active_count(),
+            "queued": len(order),
+            "jobs": [dict(j.to_dict(), position=order.get(j.gid)) for j in jobs],
+        }
+
+    async def submit(self, job: Job, running: bool = False):
+        """Queue job; running=True adopts one that is already transferring (e.g. after a restart)."""
+        self._loop = asyncio.get_running_loop()
+        job.seq = next(self._seq)
+        if running:
+            job.state = "active"
+            job.started = time.time()
+        self._jobs[job.gid] = job
+        await self._sync_positions()
+        await self.pump()
+
+    async def pump(self):
+        """Start queued jobs while there are free slots."""
+        async with self._lock:
+            while self._active_count() < self.max_active:
+                queued = self._queued()
+                if not queued:
+                    break
+                job = queued[0]
+                job.state = "active"
+                job.started = time.time()
+                try:
+                    await job.start()
+                except Exception as e:
+                    self._jobs.pop(job.gid, None)
+                    await self._failed(job, f"{type(e).__name__}: {e}")
+
+    async def _failed(self, job: Job, error: str):
+        """start() raised: clean the engine side, record the error, tell the UI."""
+        job.error = error
+        if job.remove is not None:
+            try:
+                await job.remove()
+            except Exception:
+                pass  # e.g. the daemon is gone: nothing left to clean
+        _store.update(job.gid, state="error", error=error)
+        if job.engine in ("aria2", "http"):
+            item = {"gid": job.gid, "status": "error", "error": error}
+            emit(ARIA2_EVENT, {"items": [_progress.annotate(item)]})
+
+    # ---------- completion ----------
+    def finished(self, gid: str):
+        """Job left the active set for good. Safe to call from worker threads."""
+        loop = self._loop
+        if loop is None:
+            self._jobs.pop(gid, None)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._finish(gid)
+        else:
+            loop.call_soon_threadsafe(self._finish, gid)
+
+    def _finish(self, gid: str):
+        if self._jobs.pop(gid, None) is not None:
+            asyncio.ensure_future(self.pump())
+
+    def _on_aria2_status(self, item: dict):
+        job = self._jobs.get(item.get("gid"))
+        if job is None or job.engine not in ("aria2", "http"):
+            return
+        if item.get("status") in FINAL_STATES:
+            self._finish(job.gid)
+        elif job.state == "queued" and item.get("status") in ("paused", "waiting"):
+            item["status"] = "queued"
+
+    # ---------- control ----------
+    async def set_priority(self, gid: str, priority: int):
+        job = self._jobs.get(gid)
+        if job is None:
+            raise KeyError(gid)
+        job.priority = int(priority)
+        await self._sync_positions()
+        await self.pump()
+
+    async def pause(self, gid: str):
+        job = self._jobs.get(gid)
+        if job is None:
+            raise KeyError(gid)
+        if job.state == "queued":
+            job.state = "paused"
+        elif job.state == "active":
+            if job.pause is None:
+                raise RuntimeError(f"{job.engine} downloads cannot be paused while running")
+            await job.pause()
+            job.state = "paused"
+            job.started = None
+            await self.pump()
+
+    async def resume(self, gid: str):
+        job = self._jobs.get(gid)
+        if job is None:
+            raise KeyError(gid)
+        if job.state == "paused":
+            job.state = "queued"
+            await self._sync_positions()
+            await self.pump()
+
+    async def set_limits(self, max_active: int | None = None, max_download_limit=None):
+        if max_active is not None:
+            self.max_active = max(1, int(max_active))
+        if max_download_limit is not None:
+            self.max_download_limit = str(max_download_limit)
+        try:
+            await self.apply_aria2_limits()
+        except Exception:
+            pass  # daemon not up yet; applied again when it starts
+        await self.pump()
+
+    async def apply_aria2_limits(self):
+        """Push limits to the daemon (call after it (re)starts)."""
+        await _aria2.call("changeGlobalOption", [{
+            "max-overall-download-limit": self.max_download_limit,
+            # we gate concurrency ourselves; keep aria2 from queueing behind us
+            "max-concurrent-downloads": str(max(self.max_active, 5)),
+        }])
+
+    async def _sync_positions(self):
+        """Mirror our queue order into aria2's waiting queue."""
+        queued = [j for j in self._queued() if j.engine == "aria2"]
+        if not queued:
+            return
+        try:
+            await _aria2.multicall([
+                ("changePosition", [j.gid, pos, "POS_SET"]) for pos, j in enumerate(queued)
+            ])
+        except Exception:
+            pass
+
+
+# ========= aria2 helpers =========
+def aria2_job(gid: str, priority: int = 0, label: str = "", dest: str = "") -> Job:
+    """Job for a gid that was added to aria2 with pause=true."""
+    async def _unpause():
+        await _aria2.call("unpause", [gid])
+
+    async def _pause():
+        await _aria2.call("pause", [gid])
+
+    async def _remove():
+        await _aria2.call("forceRemove", [gid])
+
+    return Job(gid, "aria2", start=_unpause, priority=priority, label=label,
+               dest=dest, pause=_pause, remove=_remove)
+
+
+scheduler = DownloadScheduler()
+
+# ========= routes =========
+async def _json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return {}
+
+@PromptServer.instance.routes.get("/az/queue")
+async def az_queue(request):
+    return web.json_response({"ok": True, **scheduler.snapshot()})
+
+@PromptServer.instance.routes.post("/az/queue/priority")
+async def az_queue_priority(request):
+    body = await _json_body(request)
+    gid = (body.get("gid") or "").strip()
+    try:
+        await scheduler.set_priority(gid, int(body.get("priority", 0)))
+    except KeyError:
+        return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
+    except (TypeError, ValueError):
+        return web.json_response({"ok": False, "error": "priority must be an integer"}, status=400)
+    return web.json_response({"ok": True, **scheduler.snapshot()})
+
+@PromptServer.instance.routes.post("/az/queue/pause")
+async def az_queue_pause(request):
+    body = await _json_body(request)
+    gid = (body.get("gid") or "").strip()
+    try:
+        await scheduler.pause(gid)
+    except KeyError:
+        return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
+    except Exception as e:
+        return web.json_response({"ok": False, "error": str(e)}, status=409)
+    return web.json_response({"ok": True, **scheduler.snapshot()})
+
+@PromptServer.instance.routes.post("/az/queue/resume")
+async def az_queue_resume(request):
+    body = await _json_body(request)
+    gid = (body.get("gid") or "").strip()
+    try:
+        await scheduler.resume(gid)
+    except KeyError:
+        return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
+    except Exception as e:
+        return web.json_response({"ok": False, "error": str(e)}, status=500)
+    return web.json_response({"ok": True, **scheduler.snapshot()})
+
+@PromptServer.instance.routes.post("/az/queue/limits")
+async def az_queue_limits(request):
+    body = await _json_body(request)
+    try:
+        await scheduler.set_limits(
+            max_active=body.get("max_active"),
+            max_download_limit=body.get("max_download_limit"),
+        )
+    except (TypeError, ValueError):
+        return web.json_response({"ok": False, "error": "max_active must be an integer"}, status=400)
+    return web.json_response({"ok": True, **scheduler.snapshot()})
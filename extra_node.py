@@ -2,7 +2,9 @@ import types
 import torch
 import torch.cuda
 import comfy.model_management
-import gc
+
+from .vram_evict import purge, summary, ORDERS
+from .ram_tier import tier as ram_tier
 
 
 
@@ -66,7 +68,7 @@ class OverrideDevice:
         # move model to device
         py_model = getattr(model, model_attr)
         py_model.to = types.MethodType(torch.nn.Module.to, py_model)
-        py_model.to(device)
+        ram_tier.move(py_model, device)  # plain .to() unless the RAM tier is on
 
         # remove ability to move model
         def to(*args, **kwargs):
@@ -215,6 +217,17 @@ class GetImageSizeRatio:
         return a
 
 
+# mode "all": unload every model (the original behaviour)
+# mode "target": evict only until target_free VRAM is free, in `order`,
+#                never touching models matched by `keep` (types or class names)
+_PURGE_OPTIONS = {
+    "mode": (["all", "target"], {"default": "all"}),
+    "target_free": ("FLOAT", {"default": 8.0, "min": 0.0, "max": 1024.0, "step": 0.5}),
+    "target_unit": (["GB", "%"], {"default": "GB"}),
+    "order": (ORDERS, {"default": "lru"}),
+    "keep": ("STRING", {"default": "", "placeholder": "e.g. clip, vae, wan"}),
+}
+
 class PurgeVRAM_V2:
     @classmethod
     def INPUT_TYPES(cls):
@@ -224,25 +237,17 @@ class PurgeVRAM_V2:
                 "purge_cache": ("BOOLEAN", {"default": True}),
                 "purge_models": ("BOOLEAN", {"default": True}),
             },
-            "optional": {
-            }
+            "optional": _PURGE_OPTIONS,
         }
-    RETURN_TYPES = (any,)
-    RETURN_NAMES = ("any",)
+    RETURN_TYPES = (any, "INT", "FLOAT", "STRING")
+    RETURN_NAMES = ("any", "freed_bytes", "seconds", "report")
     FUNCTION = "purge_vram_v2"
     CATEGORY = 'AZ_Nodes'
     OUTPUT_NODE = True
 
-    def purge_vram_v2(self, anything, purge_cache, purge_models):
-        gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            torch.cuda.ipc_collect()
-        if purge_models:
-            comfy.model_management.unload_all_models()
-        if purge_cache:
-            comfy.model_management.soft_empty_cache()
-        return (anything,)
+    def purge_vram_v2(self, anything, purge_cache, purge_models, **options):
+        report = purge(purge_cache, purge_models, **options)
+        return (anything, report["freed"], report["seconds"], summary(report))
     
 class PurgeVRAM:
     @classmethod
@@ -253,21 +258,14 @@ class PurgeVRAM:
                 "purge_cache": ("BOOLEAN", {"default": True}),
                 "purge_models": ("BOOLEAN", {"default": True}),
             },
-            "optional": {
-            }
+            "optional": _PURGE_OPTIONS,
         }
-    RETURN_TYPES = ()
+    RETURN_TYPES = ("INT", "FLOAT", "STRING")
+    RETURN_NAMES = ("freed_bytes", "seconds", "report")
     FUNCTION = "purge_vram"
     CATEGORY = 'AZ_Nodes'
     OUTPUT_NODE = True
 
-    def purge_vram(self, anything, purge_cache, purge_models):
-        gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            torch.cuda.ipc_collect()
-        if purge_models:
-            comfy.model_management.unload_all_models()
-        if purge_cache:
-            comfy.model_management.soft_empty_cache()
-        return (None,)
\ No newline at end of file
+    def purge_vram(self, anything, purge_cache, purge_models, **options):
+        report = purge(purge_cache, purge_models, **options)
+        return (report["freed"], report["seconds"], summary(report))
\ No newline at end of file
@@ -1,47 +1,478 @@
 import os
+import sys
+import atexit
+import glob
 import json
+import time
 import asyncio
 import threading
+import subprocess
 from uuid import uuid4
 from typing import Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 
 from aiohttp import web
 from server import PromptServer
-from huggingface_hub import hf_hub_download
+from huggingface_hub import HfApi, hf_hub_url, get_hf_file_metadata, get_token
+from huggingface_hub.hf_api import RepoFile
+from huggingface_hub.utils import filter_repo_objects
+from huggingface_hub.constants import HF_HUB_CACHE
+from huggingface_hub.file_download import repo_folder_name
 
-# ============ minimal job store (no progress math) ============
-_downloads: Dict[str, Dict[str, Any]] = {}  # gid -> {state, msg, filepath, thread, cancel}
+from .progress import broadcaster as _aria2_progress, emit_hf, progress_fields, SAMPLE_INTERVAL
+from .download_scheduler import scheduler as _scheduler, Job, MAX_ACTIVE
+from .model_index import index as _index, hf_key, link_into
+from .integrity import verify_sync, quarantine, is_sha256, wants_verify
+from .Downloader_helper import start_aria2_download, stop_aria2_download
+from .job_store import store as _store
+from .path_index import index as _paths
+from . import hf_tree
+
+HF_WORKERS = int(os.environ.get("COMFY_AZ_HF_WORKERS", str(MAX_ACTIVE)))
+JOB_TTL = float(os.environ.get("COMFY_AZ_HF_JOB_TTL", "3600"))  # seconds a finished record is kept
+MAX_JOBS = int(os.environ.get("COMFY_AZ_HF_MAX_JOBS", "256"))   # finished records kept at most
+SNAPSHOT_WORKERS = int(os.environ.get("COMFY_AZ_HF_SNAPSHOT_WORKERS", "4"))  # files in flight per snapshot
+MAX_SNAPSHOT_WORKERS = 16
+# "hf": hf_hub_download (one stream per file); "aria2": segmented transfer of the resolved CDN URL
+HF_ENGINE = os.environ.get("COMFY_AZ_HF_ENGINE", "hf").strip().lower()
+FINAL = ("done", "error", "stopped")
+
+_pool = ThreadPoolExecutor(max_workers=max(1, HF_WORKERS), thread_name_prefix="az-hf")
+
+# ============ job store ============
+# gid -> {state, msg, filepath, cancel, progress..., _future, _procs, _ended}; LRU order
+_downloads: Dict[str, Dict[str, Any]] = OrderedDict()
+_downloads_lock = threading.RLock()  # workers update records while the loop reorders / evicts
+
+# our states -> the aria2 status vocabulary the shared progress model speaks
+_STATUS = {
+    "queued": "waiting",
+    "running": "active",
+    "verifying": "verifying",
+    "done": "complete",
+    "stopped": "removed",
+    "error": "error",
+}
+
+_STATES = {v: k for k, v in _STATUS.items()}  # and back
+
+def _progress(info: dict) -> dict:
+    """Same fields as aria2_status (percent, completedLength, totalLength, downloadSpeed, eta)."""
+    state = info.get("state", "unknown")
+    status = _STATUS.get(state, state)
+    total = info.get("totalLength") or 0
+    done = info.get("completedLength") or 0
+    if status == "complete" and total:
+        done = total
+    speed = int(info.get("_speed", 0.0)) if status == "active" else 0
+    out = progress_fields(status, total, done, speed)
+    out["instantSpeed"] = int(info.get("_inst", 0.0)) if status == "active" else 0
+    out["filename"] = info.get("filename") or ""
+    return out
 
 def _set(gid: str, **kw):
-    _downloads.setdefault(gid, {})
-    _downloads[gid].update(kw)
+    with _downloads_lock:
+        info = _downloads.setdefault(gid, {})
+        info.update(kw)
+        info.update(_progress(info))
+        if kw.get("state") in FINAL:
+            info["_ended"] = time.monotonic()
+        if info.get("engine") != "aria2":  # aria2-backed records are stored by the aria2 route
+            _store.update(gid, state=info["status"], total=info["totalLength"], done=info["completedLength"],
+                          speed=info["downloadSpeed"], filepath=info.get("filepath"),
+                          error=info.get("msg") if info["status"] == "error" else None)
+        if "state" in kw or "msg" in kw or "completedLength" in kw:
+            emit_hf(gid, info)
 
 def _get(gid: str, key: str, default=None):
     return _downloads.get(gid, {}).get(key, default)
 
+def _touch(gid: str):
+    with _downloads_lock:
+        try:
+            _downloads.move_to_end(gid)
+        except KeyError:
+            pass
+
+def _evict():
+    """Finished records go after JOB_TTL, oldest-touched first beyond MAX_JOBS; live jobs stay."""
+    now = time.monotonic()
+    with _downloads_lock:
+        ended = [g for g, info in _downloads.items()
+                 if info.get("_ended") is not None and not (info.get("_future") and not info["_future"].done())]
+        for g in ended:
+            if now - _downloads[g]["_ended"] > JOB_TTL:
+                _downloads.pop(g, None)
+        ended = [g for g in ended if g in _downloads]
+        for g in ended[:max(len(ended) - MAX_JOBS, 0)]:
+            _downloads.pop(g, None)
+
+# ============ byte-level progress ============
+def _partial_paths(repo_id: str, filename: str, dest_dir: str, etag: str | None) -> list[str]:
+    """Where hf_hub_download keeps the bytes it has so far (local_dir and cache layouts)."""
+    stem = os.path.join(dest_dir, ".cache", "huggingface", "download", filename)
+    paths = glob.glob(glob.escape(stem) + ".*incomplete")
+    if etag:
+        paths.append(os.path.join(HF_HUB_CACHE, repo_folder_name(repo_id=repo_id, repo_type="model"),
+                                  "blobs", f"{etag}.incomplete"))
+    return paths
+
+def _bytes_on_disk(paths: list[str]) -> int | None:
+    best = None
+    for p in paths:
+        try:
+            best = max(best or 0, os.path.getsize(p))
+        except OSError:
+            pass
+    return best
+
+def _sample(gid: str, measure, stop: threading.Event):
+    """
+    Polls measure() (bytes on disk, .incomplete files included) while the worker
+    blocks on its download processes; keeps an instantaneous and an
+    exponentially smoothed rate.
+    """
+    t0, b0 = time.monotonic(), None
+    while not stop.wait(SAMPLE_INTERVAL):
+        if _get(gid, "state") != "running":
+            continue
+        done = measure()
+        if done is None:
+            continue
+        now = time.monotonic()
+        if b0 is not None and now > t0:
+            inst = max(done - b0, 0) / (now - t0)
+            speed = _get(gid, "_speed", 0.0)
+            _set(gid, _inst=inst, _speed=inst if speed == 0 else 0.7 * speed + 0.3 * inst)
+        t0, b0 = now, done
+        _set(gid, completedLength=done)
+
+def _remove_partials(paths: list[str]):
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
 # ============ worker ============
-def _worker(gid: str, repo_id: str, filename: str, dest_dir: str, token: str | None):
+# hf_hub_download runs in a child process so a stop can really end the transfer
+_CHILD = r"""
+import json, os, sys
+try:
+    from huggingface_hub import hf_hub_download
+    path = hf_hub_download(token=os.environ.get("AZ_HF_TOKEN") or None, **json.loads(sys.argv[1]))
+    print(json.dumps({"path": path}))
+except Exception as e:
+    print(json.dumps({"error": f"{type(e).__name__}: {e}"}))
+    sys.exit(1)
+"""
+
+class HFDownloadError(Exception):
+    pass
+
+def _terminate(info: dict):
+    with _downloads_lock:
+        procs = list(info.get("_procs") or ())
+    for proc in procs:
+        if proc.poll() is None:
+            proc.terminate()
+
+@atexit.register
+def _kill_children():
+    with _downloads_lock:
+        infos = list(_downloads.values())
+    for info in infos:
+        _terminate(info)
+
+def _download(gid: str, repo_id: str, filename: str, dest_dir: str, token: str | None,
+              revision: str | None = None) -> str | None:
+    """Local path of the finished file, or None when the job was cancelled."""
+    args = {
+        "repo_id": repo_id,
+        "filename": filename,
+        "revision": revision,
+        "local_dir": dest_dir,
+        "local_dir_use_symlinks": False,
+        "force_download": False,
+        "resume_download": True,
+    }
+    env = dict(os.environ, HF_HUB_DISABLE_PROGRESS_BARS="1", AZ_HF_TOKEN=token or "")
+    proc = subprocess.Popen([sys.executable, "-c", _CHILD, json.dumps(args)],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    with _downloads_lock:
+        procs = _downloads[gid].setdefault("_procs", set())
+        procs.add(proc)
+    if _get(gid, "cancel"):
+        proc.terminate()  # stop arrived before the process was recorded
+    out, _ = proc.communicate()
+    with _downloads_lock:
+        procs.discard(proc)
+    if _get(gid, "cancel"):
+        return None
+    lines = out.decode("utf-8", "replace").strip().splitlines()
+    try:
+        res = json.loads(lines[-1]) if lines else {}
+    except ValueError:
+        res = {}
+    if proc.returncode or not res.get("path"):
+        raise HFDownloadError(res.get("error") or f"download process exited with code {proc.returncode}")
+    return res["path"]
+
+def _metadata(repo_id: str, filename: str, token: str | None, revision: str | None = None):
+    try:
+        return get_hf_file_metadata(hf_hub_url(repo_id, filename, revision=revision), token=token or None)
+    except Exception:
+        return None  # offline / gated: no size, hf_hub_download reports the real error
+
+def _expected_sha256(meta) -> str | None:
+    """LFS files: the Hub ETag is the file's sha256."""
+    etag = ((meta.etag if meta else None) or "").strip('"')
+    return etag.lower() if is_sha256(etag) else None
+
+def _worker(gid: str, repo_id: str, filename: str, dest_dir: str, token: str | None,
+            verify: bool = False, expected: str | None = None, revision: str | None = None):
+    stop = threading.Event()
+    partials: list[str] = []
     try:
-        # mark started (no size / no chunks)
-        _set(gid, state="running", msg="Download started…", filepath=None)
+        if _get(gid, "cancel"):
+            return
+        meta = _metadata(repo_id, filename, token, revision)
+        etag = (meta.etag or "").strip('"') if meta else None
+        if _get(gid, "cancel"):
+            return  # stopped while the metadata was fetched: keep "stopped"
+        _set(gid, state="running", msg="Download started…", filepath=None,
+             totalLength=(meta.size or 0) if meta else 0, completedLength=0)
+        measure = lambda: _bytes_on_disk(_partial_paths(repo_id, filename, dest_dir, etag))
+        threading.Thread(target=_sample, args=(gid, measure, stop), daemon=True).start()
 
-        # Do the download (no polling, no chunk updates)
         # We place the file directly into dest_dir.
-        local_path = hf_hub_download(
-            repo_id=repo_id,
-            filename=filename,
-            local_dir=dest_dir,
-            local_dir_use_symlinks=False,
-            token=token,
-            force_download=False,
-            resume_download=True,
-        )
+        local_path = _download(gid, repo_id, filename, dest_dir, token, revision)
+        stop.set()
+        if local_path is None:
+            partials = _partial_paths(repo_id, filename, dest_dir, etag)
+            return
+        if _get(gid, "cancel"):
+            _set(gid, msg="Stopped; the file had already finished downloading.", filepath=local_path)
+            return
+        try:
+            size = os.path.getsize(local_path)
+        except OSError:
+            size = 0
+        _set(gid, totalLength=_get(gid, "totalLength") or size, completedLength=size)
+
+        sha256 = None
+        if verify:
+            _set(gid, state="verifying", msg="Verifying sha256…", filepath=local_path)
+            expected = expected or _expected_sha256(meta)
+            res = verify_sync(local_path, expected)
+            if not res["ok"]:
+                bad = quarantine(local_path)
+                _set(gid, state="error", msg=f"{res['error']} (moved to {bad})", filepath=None)
+                return
+            sha256 = res["sha256"]
 
         # Finished
-        _set(gid, state="done", msg="File download complete.", filepath=local_path)
+        _index.record(local_path, hf=hf_key(repo_id, filename, revision), sha256=sha256)
+        _set(gid, state="done", msg="File verified and complete." if sha256 else "File download complete.",
+             filepath=local_path)
+
+    except Exception as e:
+        _set(gid, state="error", msg=str(e) if isinstance(e, HFDownloadError) else f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+        if partials:
+            _remove_partials(partials)
+            _set(gid, state="stopped", msg="Stopped by user; partial file removed.")
+        _scheduler.finished(gid)
+
+# ============ snapshot worker ============
+def _list_files(repo_id: str, token: str | None, allow, ignore,
+                revision: str | None = None) -> list[RepoFile]:
+    """One listing of the repo, filtered like snapshot_download does."""
+    tree = HfApi().list_repo_tree(repo_id, recursive=True, revision=revision, token=token or None)
+    files = [f for f in tree if isinstance(f, RepoFile)]
+    return list(filter_repo_objects(files, allow_patterns=allow, ignore_patterns=ignore,
+                                    key=lambda f: f.path))
+
+def _file_etag(f: RepoFile) -> str | None:
+    return f.lfs.sha256 if f.lfs else f.blob_id
+
+def _snapshot_worker(gid: str, repo_id: str, dest_dir: str, token: str | None,
+                     allow, ignore, workers: int, verify: bool = False, revision: str | None = None):
+    """Downloads every matching file into dest_dir, `workers` at a time, with aggregate progress."""
+    stop = threading.Event()
+    files: list[RepoFile] = []
+    finished: dict[str, int] = {}  # path -> bytes, for files already in place
+    try:
+        if _get(gid, "cancel"):
+            return
+        files = _list_files(repo_id, token, allow, ignore, revision)
+        if not files:
+            raise HFDownloadError("No files in the repo match the given patterns.")
+
+        # files the model index already has: link them, download the rest
+        todo = []
+        for f in files:
+            src = _index.find(hf=hf_key(repo_id, f.path, revision))
+            dst = os.path.join(dest_dir, f.path)
+            try:
+                how = link_into(src, dst) if src else None
+            except OSError:
+                how = None
+            if how:
+                finished[f.path] = f.size or 0
+            else:
+                todo.append(f)
+
+        if _get(gid, "cancel"):
+            return  # stopped during the listing / linking: don't flip back to "running"
+        _set(gid, state="running", msg=f"Downloading {len(todo)} of {len(files)} files…", filepath=dest_dir,
+             totalLength=sum(f.size or 0 for f in files), completedLength=sum(finished.values()),
+             files=len(files), filesDone=len(finished))
+
+        def measure():
+            partial = sum(_bytes_on_disk(_partial_paths(repo_id, f.path, dest_dir, _file_etag(f))) or 0
+                          for f in todo if f.path not in finished)
+            return sum(finished.values()) + partial
+
+        threading.Thread(target=_sample, args=(gid, measure, stop), daemon=True).start()
+
+        def fetch(f: RepoFile) -> str | None:
+            local_path = _download(gid, repo_id, f.path, dest_dir, token, revision)
+            if local_path is None:
+                return None
+            sha256 = None
+            if verify and f.lfs:
+                res = verify_sync(local_path, f.lfs.sha256)
+                if not res["ok"]:
+                    bad = quarantine(local_path)
+                    raise HFDownloadError(f"{f.path}: {res['error']} (moved to {bad})")
+                sha256 = res["sha256"]
+            _index.record(local_path, hf=hf_key(repo_id, f.path, revision), sha256=sha256)
+            return local_path
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="az-hf-snap") as ex:
+            futs = {ex.submit(fetch, f): f for f in todo}
+            try:
+                for fut in as_completed(futs):
+                    if fut.result() is None:
+                        continue  # cancelled
+                    f = futs[fut]
+                    finished[f.path] = f.size or 0
+                    _set(gid, filesDone=len(finished), completedLength=measure())
+            except BaseException:
+                # one file failed: take the rest down with it
+                _set(gid, cancel=True)
+                _terminate(_downloads[gid])
+                for fut in futs:
+                    fut.cancel()
+                raise
+        stop.set()
+
+        if _get(gid, "cancel"):
+            return
+        _set(gid, state="done", msg=f"{len(files)} files complete.", completedLength=measure())
 
     except Exception as e:
-        _set(gid, state="error", msg=f"{type(e).__name__}: {e}")
+        _set(gid, state="error", msg=str(e) if isinstance(e, HFDownloadError) else f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+        if _get(gid, "cancel"):
+            _remove_partials([p for f in files if f.path not in finished
+                              for p in _partial_paths(repo_id, f.path, dest_dir, _file_etag(f))])
+            if _get(gid, "state") != "error":
+                _set(gid, state="stopped", msg=f"Stopped by user; {len(finished)} of {len(files)} files kept.")
+        _scheduler.finished(gid)
+
+def _patterns(v) -> list[str] | None:
+    """allow/ignore patterns as a list, or a comma/newline separated string."""
+    if not v:
+        return None
+    if isinstance(v, str):
+        v = v.replace("\n", ",").split(",")
+    out = [str(p).strip() for p in v if str(p).strip()]
+    return out or None
+
+# ============ aria2 engine ============
+# HF files can be handed to aria2 instead: the resolve URL is probed server-side
+# (token, revision, redirect to the signed CDN URL) and added through the same
+# path as /aria2/start, so they get 16-segment transfers, the scheduler and the
+# index. The HF record mirrors the aria2 gid's pushes.
+_ARIA2_STATES = {
+    "active": "running",
+    "waiting": "queued",
+    "paused": "queued",
+    "verifying": "verifying",
+    "complete": "done",
+    "error": "error",
+    "removed": "stopped",
+}
+_ARIA2_MSGS = {
+    "running": "Downloading with aria2…",
+    "queued": "Queued…",
+    "verifying": "Verifying sha256…",
+    "stopped": "Stopped.",
+}
+
+def _on_aria2_item(item: dict):
+    gid = item.get("gid")
+    info = _downloads.get(gid)
+    if info is None or info.get("engine") != "aria2" or info.get("state") in FINAL:
+        return
+    state = _ARIA2_STATES.get(item.get("status"), info.get("state"))
+    info["_speed"] = info["_inst"] = float(item.get("downloadSpeed") or 0)
+    kw = {"totalLength": item.get("totalLength") or 0, "completedLength": item.get("completedLength") or 0}
+    if item.get("filepath"):
+        kw["filepath"] = item["filepath"]
+    if state == "done":
+        sha256 = item.get("sha256") or info.get("_sha256")
+        path = kw.get("filepath") or info.get("filepath")
+        if path:
+            _index.record(path, hf=info.get("_hf"), sha256=sha256)
+        msg = "File verified and complete." if sha256 or info.get("_verify") else "File download complete."
+    elif state == "error":
+        msg = item.get("error") or "aria2 error"
+    else:
+        msg = _ARIA2_MSGS.get(state, info.get("msg", ""))
+    _set(gid, state=state, msg=msg, **kw)
+
+_aria2_progress.add_listener(_on_aria2_item)
+_store.interrupt("hf")  # HF transfers do not outlive the process that ran them
+
+async def _start_via_aria2(repo_id: str, filename: str, dest_dir: str, token: str, revision: str | None,
+                           expected: str | None, verify: bool, priority: int) -> web.Response:
+    url = hf_hub_url(repo_id, filename, revision=revision)
+    # same layout as local_dir: dest_dir/<subdirs of filename>/<name>
+    sub_dir = os.path.join(dest_dir, os.path.dirname(filename))
+    reply, code = await start_aria2_download(url, sub_dir, token=token or get_token() or "",
+                                             priority=priority, user_sha=expected, verify=verify,
+                                             out=os.path.basename(filename))
+    if code != 200:
+        return web.json_response({"ok": False, "error": reply.get("error", "aria2 error")}, status=code)
+
+    gid = reply.get("gid") or uuid4().hex
+    _downloads[gid] = {
+        "state": "queued",
+        "msg": "Queued…",
+        "filepath": None,
+        "filename": filename,
+        "cancel": False,
+        "engine": "aria2",
+        "_hf": hf_key(repo_id, filename, revision),
+        "_sha256": expected,
+        "_verify": verify,
+    }
+    if not reply.get("gid"):
+        # satisfied from disk by the model index
+        _set(gid, state="done", msg=f"Already on disk ({reply.get('linked')}).", filepath=reply.get("filepath"))
+    else:
+        _set(gid, state="queued" if reply.get("state") == "queued" else "running",
+             msg=_ARIA2_MSGS["queued" if reply.get("state") == "queued" else "running"],
+             totalLength=reply.get("size") or 0)
+    info = _downloads[gid]
+    return web.json_response({"ok": True, "gid": gid, "engine": "aria2", "state": info["state"],
+                              "msg": info["msg"], "filepath": info.get("filepath")})
 
 # ============ routes ============
 async def start_download(request: web.Request):
@@ -51,56 +482,160 @@ async def start_download(request: web.Request):
         filename = (data.get("filename") or "").strip()
         dest_dir = (data.get("dest_dir") or "").strip()
         token = (data.get("token_input") or "").strip()
+        expected = (data.get("sha256") or "").strip().lower() or None
+        verify = wants_verify(data.get("verify")) or bool(expected)
+        snapshot = bool(data.get("snapshot"))
+        revision = (data.get("revision") or "").strip() or None
+        engine = (data.get("engine") or HF_ENGINE).strip().lower()
+        try:
+            priority = int(data.get("priority") or 0)
+        except (TypeError, ValueError):
+            priority = 0
 
+        if snapshot:
+            if not repo_id or not dest_dir:
+                return web.json_response({"ok": False, "error": "repo_id, dest_dir are required"}, status=400)
+            return await _start_snapshot(data, repo_id, dest_dir, token, verify, priority, revision)
         if not repo_id or not filename or not dest_dir:
             return web.json_response({"ok": False, "error": "repo_id, filename, dest_dir are required"}, status=400)
+        if expected and not is_sha256(expected):
+            return web.json_response({"ok": False, "error": "sha256 must be 64 hex characters"}, status=400)
 
         os.makedirs(dest_dir, exist_ok=True)
+        _paths.note(dest_dir)
 
         gid = data.get("gid") or uuid4().hex
-        
+        _evict()
+
+        # Same repo file already on disk? Hardlink/reflink it instead of downloading.
+        await _index.ensure_fresh()
+        src = _index.find(hf=hf_key(repo_id, filename, revision))
+        if src:
+            dst = os.path.join(dest_dir, filename)
+            try:
+                how = link_into(src, dst)
+            except OSError:
+                how = None
+            if how:
+                _downloads[gid] = {"cancel": False, "filename": filename}
+                _store.add(gid, "hf", source=f"hf://{repo_id}/{filename}", dest=dest_dir, filename=filename)
+                _set(gid, state="done", msg=f"Already on disk ({how}).", filepath=dst)
+                return web.json_response({"ok": True, "gid": gid, "state": "done",
+                                          "msg": _get(gid, "msg"), "filepath": dst})
+
+        if engine == "aria2":
+            return await _start_via_aria2(repo_id, filename, dest_dir, token, revision,
+                                          expected, verify, priority)
 
         # create record
         _downloads[gid] = {
-            "state": "starting",
-            "msg": "Starting…",
+            "state": "queued",
+            "msg": "Queued…",
             "filepath": None,
+            "filename": filename,
             "cancel": False,
-            "thread": None,
         }
+        _downloads[gid].update(_progress(_downloads[gid]))
+        _store.add(gid, "hf", source=f"hf://{repo_id}/{filename}", dest=dest_dir, filename=filename)
 
-        # spin the worker thread (no async progress)
-        t = threading.Thread(target=_worker, args=(gid, repo_id, filename, dest_dir, token), daemon=True)
-        _downloads[gid]["thread"] = t
-        t.start()
+        async def _start():
+            # hand the job to the bounded pool once the scheduler grants a slot
+            try:
+                _downloads[gid]["_future"] = _pool.submit(
+                    _worker, gid, repo_id, filename, dest_dir, token, verify, expected, revision)
+            except Exception as e:
+                _set(gid, state="error", msg=f"{type(e).__name__}: {e}")
+                raise
 
-        return web.json_response({"ok": True, "gid": gid, "state": "running", "msg": "Download started…"})
+        await _scheduler.submit(Job(gid, "hf", start=_start, priority=priority,
+                                    label=f"{repo_id}/{filename}", dest=dest_dir))
+
+        info = _downloads[gid]
+        return web.json_response({"ok": True, "gid": gid, "state": info["state"], "msg": info["msg"]})
 
     except Exception as e:
         return web.json_response({"ok": False, "error": f"{type(e).__name__}: {e}"}, status=500)
 
+async def _start_snapshot(data: dict, repo_id: str, dest_dir: str, token: str, verify: bool,
+                          priority: int, revision: str | None = None) -> web.Response:
+    """
+    /hf/start with snapshot=true: { repo_id, dest_dir, allow_patterns?, ignore_patterns?, workers? }
+    One job (one scheduler slot) whose files download in parallel.
+    """
+    allow = _patterns(data.get("allow_patterns"))
+    ignore = _patterns(data.get("ignore_patterns"))
+    try:
+        workers = int(data.get("workers") or SNAPSHOT_WORKERS)
+    except (TypeError, ValueError):
+        workers = SNAPSHOT_WORKERS
+    workers = min(max(workers, 1), MAX_SNAPSHOT_WORKERS)
+
+    os.makedirs(dest_dir, exist_ok=True)
+    _paths.note(dest_dir)
+    gid = data.get("gid") or uuid4().hex
+    _evict()
+    await _index.ensure_fresh()
+
+    label = f"{repo_id} [{', '.join(allow)}]" if allow else repo_id
+    _downloads[gid] = {
+        "state": "queued",
+        "msg": "Queued…",
+        "filepath": None,
+        "filename": label,
+        "cancel": False,
+    }
+    _downloads[gid].update(_progress(_downloads[gid]))
+    _store.add(gid, "hf", source=f"hf://{repo_id}", dest=dest_dir, filename=label)
+
+    async def _start():
+        try:
+            _downloads[gid]["_future"] = _pool.submit(
+                _snapshot_worker, gid, repo_id, dest_dir, token, allow, ignore, workers, verify, revision)
+        except Exception as e:
+            _set(gid, state="error", msg=f"{type(e).__name__}: {e}")
+            raise
+
+    await _scheduler.submit(Job(gid, "hf", start=_start, priority=priority, label=label, dest=dest_dir))
+
+    info = _downloads[gid]
+    return web.json_response({"ok": True, "gid": gid, "state": info["state"], "msg": info["msg"]})
+
 async def status_download(request: web.Request):
     """
     GET /hf/status?gid=...
-    Returns only coarse state, no progress fields.
+    Returns state/msg/filepath plus the aria2_status progress fields
+    (status, percent, completedLength, totalLength, downloadSpeed, eta);
+    snapshot jobs also carry files / filesDone and aggregate byte counts.
     """
     gid = request.query.get("gid", "")
+    _evict()
     if gid not in _downloads:
-        return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
+        rec = await asyncio.to_thread(_store.get, gid) if gid else None
+        if rec is None:
+            return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
+        # evicted, or from before a restart: answer from the job history
+        out = progress_fields(rec["state"], rec["total"] or 0, rec["done"] or 0, 0)
+        out.update({"ok": True, "gid": gid, "state": _STATES.get(rec["state"], rec["state"]),
+                    "msg": rec["error"] or "", "filepath": rec["filepath"], "filename": rec["filename"]})
+        return web.json_response(out)
 
+    _touch(gid)
     info = _downloads[gid]
-    return web.json_response({
+    out = {
         "ok": True,
         "gid": gid,
         "state": info.get("state", "unknown"),
         "msg": info.get("msg", ""),
         "filepath": info.get("filepath"),
-    })
+    }
+    out.update(_progress(info))
+    return web.json_response(out)
 
 async def stop_download(request: web.Request):
     """
     POST /hf/stop { gid }
-    (Best effort: we cannot forcibly kill hf_hub_download cleanly; we just mark as stopped if thread is alive.)
+    Queued jobs are dropped; running ones have their download process
+    terminated and the partial file removed by the worker.
     """
     try:
         data = await request.json()
@@ -109,24 +644,57 @@ async def stop_download(request: web.Request):
             return web.json_response({"ok": False, "error": "unknown gid"}, status=404)
 
         info = _downloads[gid]
-        t: threading.Thread | None = info.get("thread")
-        # We cannot safely terminate threads in Python.
-        # Mark state and let UI reset; user can delete the node or ignore the result.
-        if t and t.is_alive():
-            _set(gid, state="stopped", msg="Stop requested by user.")
+        fut: Future | None = info.get("_future")
+        if info.get("state") in FINAL:
+            pass  # nothing left to stop; keep the outcome
+        elif info.get("engine") == "aria2":
+            await stop_aria2_download(gid)
+            _set(gid, state="stopped", msg="Stopped by user.")
+        elif fut is None or fut.cancel():
+            # still waiting for a slot (scheduler or pool): drop it from the queue
+            info["cancel"] = True
+            _scheduler.finished(gid)
+            _set(gid, state="stopped", msg="Removed from queue.")
         else:
-            _set(gid, state="stopped", msg="Already finished.")
+            info["cancel"] = True
+            _terminate(info)
+            _set(gid, state="stopped", msg="Stop requested by user.")
 
         return web.json_response({"ok": True, "gid": gid, "state": _get(gid, "state"), "msg": _get(gid, "msg")})
     except Exception as e:
         return web.json_response({"ok": False, "error": f"{type(e).__name__}: {e}"}, status=500)
 
+async def list_repo(request: web.Request):
+    """
+    GET /hf/list?repo_id=...&revision=&prefix=&files=1&limit=
+    Repo entries {path, type, size, sha256} under prefix, from the cached
+    listing (token in the X-HF-Token header, else the saved HF token).
+    """
+    q = request.query
+    repo_id = (q.get("repo_id") or "").strip()
+    if not repo_id:
+        return web.json_response({"ok": False, "error": "repo_id is required"}, status=400)
+    try:
+        limit = min(max(int(q.get("limit") or hf_tree.LIST_LIMIT), 1), 5000)
+    except ValueError:
+        return web.json_response({"ok": False, "error": "limit must be an integer"}, status=400)
+    token = (request.headers.get("X-HF-Token") or "").strip() or get_token()
+
+    rec = await hf_tree.listing(repo_id, (q.get("revision") or "").strip() or None, token)
+    if rec["error"]:
+        return web.json_response({"ok": False, "error": rec["error"]}, status=502)
+    entries, truncated = hf_tree.match(rec, q.get("prefix") or "",
+                                       files_only=q.get("files") in ("1", "true"), limit=limit)
+    return web.json_response({"ok": True, "repo_id": repo_id, "entries": entries,
+                              "truncated": truncated, "age": round(time.monotonic() - rec["t"], 1)})
+
 # ============ register with ComfyUI server ============
 def _register_routes():
     app = PromptServer.instance.app
     app.router.add_post("/hf/start", start_download)
     app.router.add_get("/hf/status", status_download)
     app.router.add_post("/hf/stop", stop_download)
+    app.router.add_get("/hf/list", list_repo)
 
 _register_routes()
 
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Cached Hugging Face repo listings for filename autocomplete.
+- one list_repo_tree(recursive=True) per (repo, revision, token), run off the
+  event loop; entries are {path, type, size, sha256} sorted by path
+- TTL+LRU cache with stale-while-revalidate: a stale listing is served at once
+  while a single background refresh replaces it
+- concurrent lookups of the same repo share one Hub request
+- prefix filtering happens here (bisect over the sorted paths), so keystrokes
+  never reach the Hub
+"""
+
+import os
+import time
+import bisect
+import asyncio
+import hashlib
+
+from huggingface_hub import HfApi
+from huggingface_hub.hf_api import RepoFile
+
+from .url_probe import TTLCache
+
+LIST_TTL = float(os.environ.get("COMFY_AZ_HF_LIST_TTL", "300"))      # fresh for
+LIST_STALE = float(os.environ.get("COMFY_AZ_HF_LIST_STALE", "3600"))  # then served stale for
+LIST_FAIL_TTL = 30.0
+LIST_CACHE_MAX = 64
+LIST_LIMIT = 200
+
+_cache = TTLCache(LIST_CACHE_MAX)  # key -> {"t", "entries", "keys", "error"}
+_inflight: dict = {}
+
+
+def _key(repo_id: str, revision: str | None, token: str | None):
+    th = hashlib.sha1(token.encode("utf-8")).hexdigest() if token else ""
+    return (repo_id, revision or "main", th)
+
+def _fetch(repo_id: str, revision: str | None, token: str | None) -> list[dict]:
+    out = []
+    for e in HfApi().list_repo_tree(repo_id, recursive=True, revision=revision, token=token or None):
+        if isinstance(e, RepoFile):
+            out.append({"path": e.path, "type": "file", "size": e.size,
+                        "sha256": e.lfs.sha256 if e.lfs else None})
+        else:
+            out.append({"path": e.path, "type": "dir", "size": None, "sha256": None})
+    out.sort(key=lambda e: e["path"].lower())
+    return out
+
+async def _refresh(key, repo_id: str, revision: str | None, token: str | None) -> dict:
+    try:
+        entries = await asyncio.to_thread(_fetch, repo_id, revision, token)
+        rec = {"t": time.monotonic(), "entries": entries,
+               "keys": [e["path"].lower() for e in entries], "error": ""}
+        _cache.set(key, rec, LIST_TTL + LIST_STALE)
+    except Exception as e:
+        rec = {"t": time.monotonic(), "entries": [], "keys": [], "error": f"{type(e).__name__}: {e}"}
+        old = _cache.get(key)
+        if old is not None and not old["error"]:
+            return old  # keep serving the last good listing
+        _cache.set(key, rec, LIST_FAIL_TTL)
+    return rec
+
+def _refresh_once(key, repo_id: str, revision: str | None, token: str | None) -> asyncio.Future:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_refresh(key, repo_id, revision, token))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    return task
+
+async def listing(repo_id: str, revision: str | None = None, token: str | None = None) -> dict:
+    """Cached {t, entries, keys, error} for a repo; never raises."""
+    key = _key(repo_id, revision, token)
+    rec = _cache.get(key)
+    if rec is None:
+        return await asyncio.shield(_refresh_once(key, repo_id, revision, token))
+    if not rec["error"] and time.monotonic() - rec["t"] > LIST_TTL:
+        _refresh_once(key, repo_id, revision, token)  # stale: serve now, revalidate behind
+    return rec
+
+def match(rec: dict, prefix: str = "", files_only: bool = False, limit: int = LIST_LIMIT) -> tuple[list[dict], bool]:
+    """Entries whose path starts with prefix (case-insensitive); (entries, truncated)."""
+    keys, entries = rec["keys"], rec["entries"]
+    p = prefix.lower()
+    i = bisect.bisect_left(keys, p)
+    out = []
+    while i < len(keys) and keys[i].startswith(p):
+        if not files_only or entries[i]["type"] == "file":
+            if len(out) == limit:
+                return out, True
+            out.append(entries[i])
+        i += 1
+    return out, False
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Per-host connection tuning learned from finished aria2 downloads.
+- each completed job adds its average bytes/sec to an EWMA for (host, conns)
+- 429/503 (or refused connections) halve the host's connection count; after a
+  few clean downloads it creeps back up, and a clear slowdown falls back to
+  the best count seen so far
+- split / max-connection-per-server / min-split-size for the next download
+  come from the profile of the host that actually serves the bytes
+
+Routes:
+- GET  /az/hosts       : learned profiles
+- POST /az/hosts/reset : { host? }  (all hosts when omitted)
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from aiohttp import web
+from server import PromptServer
+
+from .storage import state_path
+from .progress import broadcaster as _progress, FINAL_STATES
+
+PROFILES_FILE = "host_profiles.json"
+DEFAULT_CONNS = int(os.environ.get("COMFY_AZ_DEFAULT_CONNS", "16"))
+MAX_CONNS = 16  # aria2's cap for max-connection-per-server
+MIN_CONNS = 1
+PROBE_UP_AFTER = 3  # clean downloads before trying more connections
+EWMA_ALPHA = 0.3
+SLOWDOWN = 0.7  # below this share of the best bucket -> go back to it
+MIN_SAMPLE_BYTES = 8 << 20  # tiny files say nothing about throughput
+
+_THROTTLE_RE = re.compile(r"\b(429|503)\b|too many|refused|reset by peer", re.I)
+
+
+def host_of(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+class HostProfiles:
+    def __init__(self, path: str | None = None):
+        self.path = path or state_path(PROFILES_FILE)
+        self._hosts: dict[str, dict] = {}
+        self._running: dict[str, dict] = {}  # gid -> {host, conns, active_s, last, status}
+        self._lock = threading.Lock()
+        self._load()
+        _progress.add_listener(self._on_aria2_item)
+
+    # ---------- persistence ----------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._hosts = dict(json.load(f).get("hosts") or {})
+        except (OSError, ValueError):
+            self._hosts = {}
+
+    def _save(self):
+        payload = json.dumps({"version": 1, "hosts": self._hosts})
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def _profile(self, host: str) -> dict:
+        return self._hosts.setdefault(host, {
+            "conns": DEFAULT_CONNS, "jobs": 0, "bytes": 0, "errors": 0, "throttled": 0,
+            "clean": 0, "by_conns": {}, "updated": 0.0,
+        })
+
+    # ---------- tuning ----------
+    def options(self, url: str, size: int | None = None) -> dict:
+        """aria2 options for the next download from url's host."""
+        p = self._hosts.get(host_of(url))
+        conns = max(MIN_CONNS, min(MAX_CONNS, int(p["conns"] if p else DEFAULT_CONNS)))
+        opts = {"max-connection-per-server": str(conns), "split": str(conns)}
+        if size:
+            # one segment per connection, within aria2's 1M..1024M range
+            mib = max(1, min(1024, size // conns >> 20))
+            opts["min-split-size"] = f"{mib}M"
+        return opts
+
+    def watch(self, gid: str, url: str, conns: int):
+        """Start measuring gid (url = the URI aria2 downloads from first)."""
+        host = host_of(url)
+        if host:
+            self._running[gid] = {"host": host, "conns": int(conns), "active_s": 0.0,
+                                  "last": None, "status": None}
+
+    def _on_aria2_item(self, item: dict):
+        run = self._running.get(item.get("gid"))
+        if run is None:
+            return
+        now = time.monotonic()
+        status = item.get("status")
+        if run["status"] == "active" and run["last"] is not None:
+            run["active_s"] += now - run["last"]
+        run["last"], run["status"] = now, status
+        if status not in FINAL_STATES:
+            return
+        self._running.pop(item["gid"], None)
+        if status == "complete":
+            self._observe(run, item.get("totalLength") or 0)
+        elif status == "error" and not item.get("lost"):
+            self._observe(run, 0, error=item.get("error") or "")
+
+    def _observe(self, run: dict, nbytes: int, error: str | None = None):
+        with self._lock:
+            p = self._profile(run["host"])
+            p["updated"] = time.time()
+            conns = run["conns"]
+            if error is not None:
+                p["errors"] += 1
+                p["clean"] = 0
+                if _THROTTLE_RE.search(error):
+                    p["throttled"] += 1
+                    p["conns"] = max(MIN_CONNS, conns // 2)
+                self._save()
+                return
+
+            p["jobs"] += 1
+            p["bytes"] += nbytes
+            if nbytes < MIN_SAMPLE_BYTES or run["active_s"] <= 0:
+                self._save()
+                return
+            bps = nbytes / run["active_s"]
+            buckets = p["by_conns"]
+            key = str(conns)
+            old = buckets.get(key)
+            buckets[key] = bps if old is None else old + EWMA_ALPHA * (bps - old)
+
+            best = max(buckets, key=buckets.get)
+            p["clean"] += 1
+            if best != key and bps < SLOWDOWN * buckets[best]:
+                p["conns"] = int(best)
+                p["clean"] = 0
+            elif p["clean"] >= PROBE_UP_AFTER and p["conns"] < MAX_CONNS:
+                p["conns"] = min(MAX_CONNS, p["conns"] + 2)
+                p["clean"] = 0
+            self._save()
+
+    # ---------- inspection ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for host, p in self._hosts.items():
+                out[host] = dict(p, by_conns={k: int(v) for k, v in p["by_conns"].items()})
+            return out
+
+    def reset(self, host: str | None = None):
+        with self._lock:
+            if host:
+                self._hosts.pop(host.lower(), None)
+            else:
+                self._hosts.clear()
+            self._save()
+
+
+profiles = HostProfiles()
+
+# ========= routes =========
+@PromptServer.instance.routes.get("/az/hosts")
+async def az_hosts(request):
+    return web.json_response({"ok": True, "default_conns": DEFAULT_CONNS,
+                              "hosts": profiles.snapshot()})
+
+@PromptServer.instance.routes.post("/az/hosts/reset")
+async def az_hosts_reset(request):
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    profiles.reset((body.get("host") or "").strip() or None)
+    return web.json_response({"ok": True, "hosts": profiles.snapshot()})
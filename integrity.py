@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+sha256 verification for downloaded files, kept off the event loop.
+- hashing runs in a small dedicated thread pool with large readinto buffers
+  (hashlib releases the GIL on big updates)
+- results are cached by (path, size, mtime) in memory and in the model index,
+  so the same file is never hashed twice
+- POST /az/verify : { path, sha256? } -> { ok, sha256, expected, error? }
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from server import PromptServer
+
+from .model_index import index as _index
+
+VERIFY_DEFAULT = os.environ.get("COMFY_AZ_VERIFY", "0").lower() in ("1", "true", "yes")
+HASH_BUFSIZE = 8 << 20
+HASH_WORKERS = int(os.environ.get("COMFY_AZ_HASH_WORKERS", "2"))
+MAX_CANDIDATES = 3
+
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="az-hash")
+_cache: OrderedDict = OrderedDict()  # (path, size, mtime_ns) -> sha256
+_cache_lock = threading.Lock()
+_inflight: dict = {}
+
+
+def is_sha256(v) -> bool:
+    return bool(v) and bool(_SHA256_RE.match(str(v)))
+
+def wants_verify(flag) -> bool:
+    if flag is None or flag == "":
+        return VERIFY_DEFAULT
+    if isinstance(flag, str):
+        return flag.lower() in ("1", "true", "yes", "on")
+    return bool(flag)
+
+def _stat_key(path: str):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+def _hash(path: str) -> str:
+    h = hashlib.sha256()
+    buf = bytearray(HASH_BUFSIZE)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+def file_sha256(path: str) -> str:
+    """Blocking, cached sha256 of path (use from worker threads)."""
+    key = _stat_key(path)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit:
+            _cache.move_to_end(key)
+            return hit
+    sha = _index.sha256_for(key[0])
+    if not sha:
+        sha = _hash(path)
+        if _stat_key(path) != key:
+            return sha  # file changed while hashing; don't cache
+        _index.record(key[0], sha256=sha)
+    with _cache_lock:
+        _cache[key] = sha
+        while len(_cache) > 1024:
+            _cache.popitem(last=False)
+    return sha
+
+async def sha256_async(path: str) -> str:
+    """Non-blocking file_sha256; concurrent calls for one file share the pass."""
+    key = _stat_key(path)
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.get_running_loop().run_in_executor(_pool, file_sha256, path)
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _f: _inflight.pop(key, None))
+    return await asyncio.shield(fut)
+
+def _result(path: str, expected: str | None, sha: str) -> dict:
+    expected = (expected or "").lower() or None
+    ok = expected is None or sha == expected
+    out = {"ok": ok, "path": path, "sha256": sha, "expected": expected}
+    if not ok:
+        out["error"] = f"sha256 mismatch: expected {expected}, got {sha}"
+    return out
+
+def verify_sync(path: str, expected: str | None = None) -> dict:
+    return _result(path, expected, file_sha256(path))
+
+async def verify(path: str, expected: str | None = None) -> dict:
+    return _result(path, expected, await sha256_async(path))
+
+def quarantine(path: str) -> str:
+    """Move a corrupt file out of the way so nothing loads it."""
+    bad = f"{path}.corrupt"
+    try:
+        os.replace(path, bad)
+        return bad
+    except OSError:
+        return path
+
+async def find_by_sha256(size: int, sha256: str) -> str | None:
+    """Hash (once) the few indexed files with exactly this size to find a content match."""
+    sha256 = sha256.lower()
+    for path in _index.unhashed_with_size(size)[:MAX_CANDIDATES]:
+        try:
+            if await sha256_async(path) == sha256:
+                return path
+        except OSError:
+            continue
+    return None
+
+# ========= routes =========
+@PromptServer.instance.routes.post("/az/verify")
+async def az_verify(request):
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    path = os.path.abspath(os.path.expanduser((body.get("path") or "").strip()))
+    expected = (body.get("sha256") or "").strip().lower() or None
+    if not body.get("path"):
+        return web.json_response({"ok": False, "error": "path is required"}, status=400)
+    if expected and not is_sha256(expected):
+        return web.json_response({"ok": False, "error": "sha256 must be 64 hex characters"}, status=400)
+    if not os.path.isfile(path):
+        return web.json_response({"ok": False, "error": f"Not a file: {path}"}, status=404)
+    try:
+        return web.json_response(await verify(path, expected))
+    except OSError as e:
+        return web.json_response({"ok": False, "error": f"Read failed: {e}"}, status=500)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Durable job history for the aria2, built-in and HF download routes.
+- one SQLite file in WAL mode, indexed by state and destination
+- rows: gid, job_id, engine, source, dest, filename, filepath, state, bytes,
+  speed, error and timings (created / started / finished / updated)
+- writes are buffered and flushed in one transaction every FLUSH_INTERVAL
+  seconds (sooner when a job reaches a final state), so progress ticks never
+  turn into an fsync each
+- on startup, jobs left open by the previous run are handed back to the routes:
+  aria2 gids are re-attached, other engines are marked interrupted
+
+Routes:
+- GET /az/jobs : ?state=&dest=&engine=&limit=&offset= -> { jobs, total }
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+
+from aiohttp import web
+from server import PromptServer
+
+from .storage import state_path
+
+JOBS_DB = "jobs.sqlite3"
+FLUSH_INTERVAL = float(os.environ.get("COMFY_AZ_JOBS_FLUSH", "2.0"))
+MAX_ROWS = int(os.environ.get("COMFY_AZ_JOBS_MAX_ROWS", "5000"))  # finished rows kept
+FINAL = ("complete", "error", "removed")
+OPEN = ("waiting", "queued", "paused", "active", "verifying")
+
+_COLUMNS = ("job_id", "engine", "source", "dest", "filename", "filepath", "state",
+            "total", "done", "speed", "error", "created", "started", "finished", "updated")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    gid      TEXT PRIMARY KEY,
+    job_id   TEXT,
+    engine   TEXT NOT NULL,
+    source   TEXT,
+    dest     TEXT,
+    filename TEXT,
+    filepath TEXT,
+    state    TEXT NOT NULL,
+    total    INTEGER DEFAULT 0,
+    done     INTEGER DEFAULT 0,
+    speed    INTEGER DEFAULT 0,
+    error    TEXT,
+    created  REAL,
+    started  REAL,
+    finished REAL,
+    updated  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, updated);
+CREATE INDEX IF NOT EXISTS jobs_dest ON jobs(dest, updated);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str | None = None, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path or state_path(JOBS_DB)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()  # _pending / _inserts only: update() on the loop never waits on SQLite
+        self._db_lock = threading.Lock()  # the connection; held from the batch swap to its COMMIT
+        self._pending: dict[str, dict] = {}  # gid -> fields not yet written
+        self._inserts: set[str] = set()
+        self._wake = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.leftover = self._open_rows()  # open when the previous run ended
+
+    # ---------- writes (buffered) ----------
+    def add(self, gid: str, engine: str, source: str = "", dest: str = "", filename: str = "",
+            job_id: str | None = None, state: str = "queued", total: int = 0):
+        now = time.time()
+        with self._lock:
+            self._inserts.add(gid)
+            self._pending[gid] = {
+                "job_id": job_id, "engine": engine, "source": source,
+                "dest": os.path.abspath(dest) if dest else "",
+                "filename": filename, "state": state, "total": int(total or 0), "done": 0,
+                "speed": 0, "created": now, "updated": now,
+            }
+        self._kick()
+
+    def update(self, gid: str, state: str | None = None, total=None, done=None, speed=None,
+               filepath: str | None = None, error: str | None = None):
+        """Merge a progress/state change; a no-op for gids the store never saw."""
+        now = time.time()
+        fields = {"updated": now}
+        if state is not None:
+            fields["state"] = state
+            if state == "active":
+                fields["started"] = now
+            elif state in FINAL:
+                fields["finished"] = now
+                fields["speed"] = 0
+        for k, v in (("total", total), ("done", done), ("speed", speed)):
+            if v is not None:
+                fields[k] = int(v or 0)
+        if filepath:
+            fields["filepath"] = filepath
+        if error:
+            fields["error"] = error
+        with self._lock:
+            cur = self._pending.setdefault(gid, {})
+            if "started" in fields and cur.get("started"):
+                fields.pop("started")
+            cur.update(fields)
+        self._kick(urgent=state in FINAL)
+
+    def _kick(self, urgent: bool = False):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="az-jobs", daemon=True)
+            self._flusher.start()
+        if urgent:
+            self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def flush(self):
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                inserts, self._inserts = self._inserts, set()
+            if not pending:
+                return
+            self._db.execute("BEGIN")
+            try:
+                for gid, fields in pending.items():
+                    if gid in inserts:
+                        self._db.execute("INSERT OR REPLACE INTO jobs (gid, engine, state) VALUES (?, ?, ?)",
+                                         (gid, fields["engine"], fields["state"]))
+                    cols = [c for c in fields if c in _COLUMNS]
+                    if cols:
+                        self._db.execute(f"UPDATE jobs SET {', '.join(c + ' = ?' for c in cols)} WHERE gid = ?",
+                                         [fields[c] for c in cols] + [gid])
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+            self._prune()
+
+    def _prune(self):
+        n = self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        if n > MAX_ROWS:
+            self._db.execute(
+                "DELETE FROM jobs WHERE gid IN (SELECT gid FROM jobs WHERE state IN (?, ?, ?) "
+                "ORDER BY updated LIMIT ?)", (*FINAL, n - MAX_ROWS))
+
+    # ---------- restart ----------
+    def _open_rows(self) -> list[dict]:
+        marks = ", ".join("?" * len(OPEN))
+        rows = self._db.execute(f"SELECT * FROM jobs WHERE state IN ({marks})", OPEN).fetchall()
+        return [dict(r) for r in rows]
+
+    def take_leftover(self, engine: str) -> list[dict]:
+        """Rows of `engine` still open from the previous run (each handed out once)."""
+        rows = [r for r in self.leftover if r["engine"] == engine]
+        self.leftover = [r for r in self.leftover if r["engine"] != engine]
+        return rows
+
+    def interrupt(self, engine: str, reason: str = "Interrupted by restart."):
+        for r in self.take_leftover(engine):
+            self.update(r["gid"], state="error", error=reason)
+
+    # ---------- reads (blocking: call off the event loop) ----------
+    def get(self, gid: str) -> dict | None:
+        self.flush()
+        with self._db_lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE gid = ?", (gid,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, state: str | None = None, dest: str | None = None, engine: str | None = None,
+             limit: int = 100, offset: int = 0) -> tuple[list[dict], int]:
+        self.flush()
+        where, args = [], []
+        if state == "open":
+            where.append(f"state IN ({', '.join('?' * len(OPEN))})")
+            args.extend(OPEN)
+        elif state:
+            where.append("state = ?")
+            args.append(state)
+        if dest:
+            where.append("dest = ?")
+            args.append(os.path.abspath(os.path.expanduser(dest)))
+        if engine:
+            where.append("engine = ?")
+            args.append(engine)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._db_lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM jobs{clause}", args).fetchone()[0]
+            rows = self._db.execute(f"SELECT * FROM jobs{clause} ORDER BY updated DESC LIMIT ? OFFSET ?",
+                                    args + [limit, offset]).fetchall()
+        return [dict(r) for r in rows], total
+
+
+store = JobStore()
+
+# ========= routes =========
+@PromptServer.instance.routes.get("/az/jobs")
+async def az_jobs(request):
+    q = request.query
+    try:
+        limit = min(max(int(q.get("limit") or 100), 1), 1000)
+        offset = max(int(q.get("offset") or 0), 0)
+    except ValueError:
+        return web.json_response({"ok": False, "error": "limit and offset must be integers"}, status=400)
+    jobs, total = await asyncio.to_thread(store.list, state=q.get("state") or None, dest=q.get("dest") or None,
+                                          engine=q.get("engine") or None, limit=limit, offset=offset)
+    return web.json_response({"ok": True, "jobs": jobs, "total": total})
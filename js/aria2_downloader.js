@@ -25,6 +25,32 @@ function joinPath(base, seg) {
   return (base.endsWith("/") ? base : base + "/") + seg;
 }
 
+// Status lookups from all nodes in this tab are merged into one /aria2/status_batch call.
+const pendingStatus = new Map(); // gid -> [resolve, ...]
+let statusFlushTimer = null;
+function requestStatus(gid) {
+  return new Promise((resolve) => {
+    if (!pendingStatus.has(gid)) pendingStatus.set(gid, []);
+    pendingStatus.get(gid).push(resolve);
+    if (!statusFlushTimer) statusFlushTimer = setTimeout(flushStatus, 50);
+  });
+}
+async function flushStatus() {
+  statusFlushTimer = null;
+  const batch = new Map(pendingStatus);
+  pendingStatus.clear();
+  let items = [];
+  try {
+    const resp = await api.fetchApi("/aria2/status_batch", {
+      method: "POST",
+      body: JSON.stringify({ gids: [...batch.keys()] }),
+    });
+    items = (await resp.json())?.items || [];
+  } catch {}
+  const byGid = new Map(items.map(it => [it.gid, it]));
+  for (const [gid, waiters] of batch) waiters.forEach(res => res(byGid.get(gid) || null));
+}
+
 /** ---------- extension ---------- */
 app.registerExtension({
   name: "comfyui.aria2.downloader",
@@ -126,8 +152,18 @@ app.registerExtension({
         const raw = destInput.value.trim();
         if (!raw) { items = []; renderDropdown(); return; }
         const val = normalizePath(raw);
+        if (!/[\/:~]/.test(val)) {  // bare words: fuzzy search over the indexed model folders
+          try {
+            const resp = await api.fetchApi(`/az/search?q=${encodeURIComponent(val)}&limit=50`);
+            const data = await resp.json();
+            items = data?.ok ? data.results.map(r => ({ name: r.name, path: r.path })) : [];
+          } catch { items = []; }
+          active = items.length ? 0 : -1;
+          renderDropdown();
+          return;
+        }
         try{
-          const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}`);
+          const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}&folders_only=1&partial=1&limit=200`);
           const data = await resp.json();
           if (data?.ok && Array.isArray(data.folders)) {
             items = data.folders.map(f => ({
@@ -227,6 +263,7 @@ app.registerExtension({
       this._speed = 0;
       this._eta = null;
       this._pollTimer = null;
+      this._lastEvent = 0;
       this._filename = "";
       this._filepath = "";
 
@@ -265,47 +302,70 @@ app.registerExtension({
           return;
         }
 
+        if (!data.gid && data.status === "complete") {
+          // linked from a file already on disk, nothing to download
+          this._status = `complete (${data.linked || "existing"})`;
+          this._progress = 100;
+          this._filename = data.filename || "";
+          this._filepath = data.filepath || "";
+          this.setDirtyCanvas(true);
+          return;
+        }
+
         this.gid = data.gid;
         this._status = "Active";
+        this._lastEvent = performance.now();
         this.setDirtyCanvas(true);
+        scheduleWatchdog();
+      });
 
-        const poll = async () => {
-          if (!this.gid) return;
-          let sResp, s;
-          try {
-            sResp = await api.fetchApi(`/aria2/status?gid=${encodeURIComponent(this.gid)}`);
-            s = await sResp.json();
-          } catch {
-            this._pollTimer = setTimeout(poll, 700);
-            return;
-          }
+      // --- Progress: pushed by the server (one shared aria2 sampler for all nodes/tabs) ---
+      const applyStatus = (s) => {
+        if (s?.error) {
+          this._status = `Error: ${s.error}`;
+          this.gid = null;
+          this.setDirtyCanvas(true);
+          return;
+        }
 
-          if (s?.error) {
-            this._status = `Error: ${s.error}`;
-            this.gid = null;
-            this.setDirtyCanvas(true);
-            return;
-          }
+        this._status = s.status || "active";
+        this._progress = s.percent ?? 0;
+        this._speed = s.downloadSpeed ?? 0;
+        this._eta = s.eta ?? null;
 
-          this._status = s.status || "active";
-          this._progress = s.percent ?? 0;
-          this._speed = s.downloadSpeed ?? 0;
-          this._eta = s.eta ?? null;
+        if (s.filename) this._filename = s.filename;
+        if (s.filepath) this._filepath = s.filepath;
 
-          if (s.filename) this._filename = s.filename;
-          if (s.filepath) this._filepath = s.filepath;
+        this.setDirtyCanvas(true);
 
-          this.setDirtyCanvas(true);
+        if (["complete", "error", "removed"].includes(this._status)) {
+          this.gid = null;
+        }
+      };
 
-          if (["complete", "error", "removed"].includes(this._status)) {
-            this.gid = null;
-            return;
-          }
-          this._pollTimer = setTimeout(poll, 500);
-        };
+      const onProgress = (ev) => {
+        if (!this.gid) return;
+        const s = (ev.detail?.items || []).find(it => it.gid === this.gid);
+        if (!s) return;
+        this._lastEvent = performance.now();
+        applyStatus(s);
+      };
+      api.addEventListener("az.aria2.progress", onProgress);
 
-        poll();
-      });
+      // Fallback: if no push arrived for a while (e.g. websocket reconnect), ask once.
+      const scheduleWatchdog = () => {
+        if (this._pollTimer) clearTimeout(this._pollTimer);
+        this._pollTimer = setTimeout(watchdog, 5000);
+      };
+      const watchdog = async () => {
+        this._pollTimer = null;
+        if (!this.gid) return;
+        if (performance.now() - (this._lastEvent || 0) > 4000) {
+          const s = await requestStatus(this.gid);
+          if (s && this.gid) applyStatus(s);
+        }
+        if (this.gid) scheduleWatchdog();
+      };
 
       // Canvas size & progress UI
       this.size = [460, 300];
@@ -371,6 +431,7 @@ app.registerExtension({
       const oldRemoved = this.onRemoved;
       this.onRemoved = function () {
         if (this._pollTimer) clearTimeout(this._pollTimer);
+        api.removeEventListener("az.aria2.progress", onProgress);
         // remove dropdown + listeners
         if (dropdown && dropdown.parentNode) dropdown.parentNode.removeChild(dropdown);
         window.removeEventListener("scroll", onScroll, true);
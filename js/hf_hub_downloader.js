@@ -10,6 +10,19 @@ function el(tag, attrs = {}, ...children) {
   for (const c of children) n.append(c);
   return n;
 }
+function fmtBytes(b) {
+  if (!b || b <= 0) return "0 B";
+  const u = ["B","KB","MB","GB","TB"];
+  const i = Math.floor(Math.log(b)/Math.log(1024));
+  return (b/Math.pow(1024,i)).toFixed(i?1:0)+" "+u[i];
+}
+function fmtETA(s) {
+  if (s == null) return "—";
+  const h = Math.floor(s/3600), m = Math.floor((s%3600)/60), sec = Math.floor(s%60);
+  if (h) return `${h}h ${m}m ${sec}s`;
+  if (m) return `${m}m ${sec}s`;
+  return `${sec}s`;
+}
 
 // Inject CSS for indeterminate bar (scoped + forced blue)
 (function ensureIndeterminateStyle() {
@@ -41,6 +54,11 @@ function el(tag, attrs = {}, ...children) {
   background: #0084ff !important;   /* force the blue */
   opacity: 0.95 !important;
 }
+/* Determinate mode once the server knows the file size */
+.az-hf-hub-downloader .hf-bar.hf-known {
+  animation: none !important;
+  transition: width 0.3s linear !important;
+}
 `;
   document.head.appendChild(style);
 })();
@@ -71,7 +89,7 @@ app.registerExtension({
 
     const fileInput = el("input", {
       type: "text",
-      placeholder: "Filename (e.g. model.safetensors)",
+      placeholder: "Filename or patterns (e.g. model.safetensors, *.gguf, unet/*)",
       style: { width: "100%", padding: "4px", boxSizing: "border-box" }
     });
 
@@ -113,8 +131,12 @@ app.registerExtension({
       dropdown.style.width = `${r.width}px`;
     };
 
+    // Filename suggestions from the repo listing (cached server-side)
+    const fileList = el("datalist", { id: `hf-files-${node.id}-${Math.random().toString(36).slice(2, 8)}` });
+    fileInput.setAttribute("list", fileList.id);
+
     // Append inputs (do NOT append dropdown here; it's body-level)
-    wrap.append(repoInput, tokenInput, fileInput, destInput);
+    wrap.append(repoInput, tokenInput, fileInput, destInput, fileList);
 
     // Indeterminate progress bar
     const progressTrack = el("div", { className: "hf-track", style: { display: "none" } });
@@ -129,10 +151,50 @@ app.registerExtension({
     const buttonRow = el("div", { style: { display: "flex", gap: "8px", justifyContent: "center" } });
     const downloadBtn = el("button", { textContent: "Download", style: { padding: "6px 12px", cursor: "pointer" } });
     const stopBtn = el("button", { textContent: "Stop", disabled: true, style: { padding: "6px 12px", cursor: "pointer" } });
-    buttonRow.append(downloadBtn, stopBtn);
+    const aria2Label = el("label", {
+      title: "Segmented download through aria2 (faster on fast links)",
+      style: { display: "flex", alignItems: "center", gap: "4px", fontSize: "12px", color: "#ccc" }
+    });
+    const aria2Box = el("input", { type: "checkbox", checked: node.properties?.engine === "aria2" });
+    aria2Label.append(aria2Box, "aria2");
+    aria2Box.addEventListener("change", () => {
+      node.properties = node.properties || {};
+      node.properties.engine = aria2Box.checked ? "aria2" : "hf";
+    });
+    buttonRow.append(downloadBtn, stopBtn, aria2Label);
 
     wrap.append(progressTrack, statusText, buttonRow);
 
+    // ================= filename autocomplete logic =================
+    let fileTimer = null;
+    let fileSeq = 0;
+    async function fetchFiles() {
+      const repo_id = repoInput.value.trim();
+      if (!repo_id) { fileList.innerHTML = ""; return; }
+      const seq = ++fileSeq;
+      const prefix = fileInput.value.trim();
+      const headers = tokenInput.value.trim() ? { "X-HF-Token": tokenInput.value.trim() } : {};
+      try {
+        const resp = await api.fetchApi(
+          `/hf/list?repo_id=${encodeURIComponent(repo_id)}&prefix=${encodeURIComponent(prefix)}&files=1&limit=100`,
+          { headers });
+        const data = await resp.json();
+        if (seq !== fileSeq) return;  // a newer keystroke won
+        fileList.innerHTML = "";
+        for (const e of (data?.ok ? data.entries : [])) {
+          fileList.append(el("option", { value: e.path, label: e.size ? fmtBytes(e.size) : "" }));
+        }
+      } catch {
+        if (seq === fileSeq) fileList.innerHTML = "";
+      }
+    }
+    const scheduleFiles = () => {
+      if (fileTimer) clearTimeout(fileTimer);
+      fileTimer = setTimeout(fetchFiles, 150);
+    };
+    fileInput.addEventListener("input", scheduleFiles);
+    fileInput.addEventListener("focus", scheduleFiles);
+
     // ================= folder autocomplete logic =================
     let items = [];
     let active = -1;
@@ -184,8 +246,18 @@ app.registerExtension({
       const raw = destInput.value.trim();
       if (!raw) { items = []; renderDropdown(); return; }
       const val = normalizePath(raw);
+      if (!/[\/:~]/.test(val)) {  // bare words: fuzzy search over the indexed model folders
+        try {
+          const resp = await api.fetchApi(`/az/search?q=${encodeURIComponent(val)}&limit=50`);
+          const data = await resp.json();
+          items = data?.ok ? data.results.map(r => ({ name: r.name, path: r.path })) : [];
+        } catch { items = []; }
+        active = items.length ? 0 : -1;
+        renderDropdown();
+        return;
+      }
       try {
-        const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}`);
+        const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}&folders_only=1&partial=1&limit=200`);
         const data = await resp.json();
         if (data?.ok && Array.isArray(data.folders)) {
           items = data.folders.map(f => ({
@@ -273,9 +345,16 @@ app.registerExtension({
     node.gid = null;
     node._pollInterval = null;
     node._pollCount = 0;
+    node._lastEvent = 0;
 
     function showBar(on) {
       progressTrack.style.display = on ? "block" : "none"; // force block
+      if (!on) setPercent(null);
+    }
+    function setPercent(p) {
+      const known = p != null;
+      progressIndet.classList.toggle("hf-known", known);
+      progressIndet.style.setProperty("width", known ? `${Math.min(Math.max(p, 0), 100)}%` : "", known ? "important" : "");
     }
     function setButtons(running) {
       downloadBtn.disabled = !!running;
@@ -296,53 +375,78 @@ app.registerExtension({
       node._pollCount = 0;
     }
 
+    function applyStatus(st) {
+      if (st.error) {
+        resetToIdle(`Error: ${st.error}`);
+        return;
+      }
+      const state = st.state || st.status;
+      if (state === "queued" || state === "starting" || state === "running" || state === "verifying") {
+        showBar(true);
+        setButtons(true);
+        if (state === "running" && st.totalLength > 0) {
+          setPercent(st.percent ?? 0);
+          const files = st.files > 1 ? `${st.filesDone ?? 0}/${st.files} files  •  ` : "";
+          statusText.textContent =
+            `${files}${(st.percent ?? 0).toFixed(1)}%  •  ${fmtBytes(st.completedLength)} / ${fmtBytes(st.totalLength)}` +
+            `  •  ${fmtBytes(st.downloadSpeed)}/s  •  ETA: ${fmtETA(st.eta)}`;
+        } else {
+          setPercent(null);
+          statusText.textContent = st.msg || "Download started...";
+        }
+        return;
+      }
+      if (state === "done" || state === "complete") {
+        statusText.textContent = st.msg ? `✅ ${st.msg}` : "✅ File download complete";
+        showBar(false);
+        setButtons(false);
+        node.gid = null;
+        stopPolling();
+        return;
+      }
+      if (state === "stopped") {
+        resetToIdle(st.msg || "Stopped.");
+        return;
+      }
+      if (state === "error") {
+        resetToIdle(st.msg ? `Error: ${st.msg}` : "Error.");
+        return;
+      }
+    }
+
+    // Pushed by the server on every state change (no per-node polling)
+    const onHfProgress = (ev) => {
+      const st = ev.detail || {};
+      if (!node.gid || st.gid !== node.gid) return;
+      node._lastEvent = performance.now();
+      applyStatus(st);
+    };
+    api.addEventListener("az.hf.progress", onHfProgress);
+
+    async function checkOnce() {
+      if (!node.gid) return;
+      try {
+        const res = await fetch(`/hf/status?gid=${encodeURIComponent(node.gid)}`, { method: "GET" });
+        if (!res.ok) throw new Error(`Status ${res.status}`);
+        applyStatus(await res.json());
+        node._pollCount = 0;
+      } catch (e) {
+        console.warn("Status check failed:", e);
+        if (++node._pollCount > 3) resetToIdle(`Error: ${e.message}`);
+      }
+    }
+
+    // Catch-up check right after start (events may beat the /hf/start reply),
+    // then a slow watchdog only while no push has been seen for a while.
     function startPolling() {
       stopPolling();
       node._pollCount = 0;
-      node._pollInterval = setInterval(async () => {
-        if (!node.gid || node._pollCount > 200) {
-          resetToIdle("Ready");
-          return;
-        }
-        node._pollCount++;
-        try {
-          const res = await fetch(`/hf/status?gid=${encodeURIComponent(node.gid)}`, { method: "GET" });
-          if (!res.ok) throw new Error(`Status ${res.status}`);
-          const st = await res.json();
-          if (st.error) {
-            resetToIdle(`Error: ${st.error}`);
-            return;
-          }
-          const state = st.state || st.status;
-          if (state === "starting" || state === "running") {
-            statusText.textContent = st.msg || "Download started...";
-            showBar(true);
-            setButtons(true);
-            return;
-          }
-          if (state === "done" || state === "complete") {
-            statusText.textContent = st.msg ? `✅ ${st.msg}` : "✅ File download complete";
-            showBar(false);
-            setButtons(false);
-            node.gid = null;
-            stopPolling();
-            return;
-          }
-          if (state === "stopped") {
-            resetToIdle(st.msg || "Stopped.");
-            return;
-          }
-          if (state === "error") {
-            resetToIdle(st.msg ? `Error: ${st.msg}` : "Error.");
-            return;
-          }
-        } catch (e) {
-          console.warn("Status poll failed:", e);
-          if (node._pollCount > 10) {
-            resetToIdle(`Error: ${e.message}`);
-          }
-        }
-      }, 1000);
+      node._lastEvent = performance.now();
+      checkOnce();
+      node._pollInterval = setInterval(() => {
+        if (!node.gid) { stopPolling(); return; }
+        if (performance.now() - node._lastEvent > 4000) checkOnce();
+      }, 5000);
     }
 
     // ====== Buttons ======
@@ -356,6 +460,12 @@ app.registerExtension({
         showBar(false);
         return;
       }
+      // Wildcards or a comma-separated list: snapshot mode, shards fetched in parallel
+      const snapshot = /[*?[,]/.test(filename);
+      const body = snapshot
+        ? { repo_id, dest_dir, token_input, snapshot: true, allow_patterns: filename }
+        : { repo_id, filename, dest_dir, token_input };
+      if (!snapshot && node.properties?.engine) body.engine = node.properties.engine;
       setButtons(true);
       statusText.textContent = "Starting download...";
       showBar(false);
@@ -363,7 +473,7 @@ app.registerExtension({
         const res = await fetch("/hf/start", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ repo_id, filename, dest_dir, token_input, })
+          body: JSON.stringify(body)
         });
         if (!res.ok) throw new Error(`Start ${res.status}`);
         const out = await res.json();
@@ -406,6 +516,7 @@ app.registerExtension({
     node.onRemoved = function () {
       // existing cleanup
       stopPolling();
+      api.removeEventListener("az.hf.progress", onHfProgress);
       if (wrap && wrap.parentNode) wrap.remove();
 
       // new: remove listeners and the body overlay
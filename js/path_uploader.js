@@ -16,6 +16,74 @@ function joinPath(base, seg) {
 }
 
 function fmtBytes(b){ if(!b||b<=0) return "0 B"; const u=["B","KB","MB","GB","TB"]; const i=Math.floor(Math.log(b)/Math.log(1024)); return (b/Math.pow(1024,i)).toFixed(i?1:0)+" "+u[i]; }
+const UPLOAD_PARALLEL = 4;   // chunk PUTs in flight
+const UPLOAD_RETRIES = 8;    // per chunk, with backoff, before pausing the upload
+const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+const GZIP_SAMPLE = 256 * 1024;  // bytes read at each of 3 spots to judge compressibility
+const GZIP_MAX_RATIO = 0.85;     // gzip the chunks only if the samples shrink below this
+
+// gzip a blob in the browser (native CompressionStream)
+async function gzipBlob(blob) {
+  return await new Response(blob.stream().pipeThrough(new CompressionStream("gzip"))).blob();
+}
+
+// Does this file compress well enough to be worth gzip on the wire?
+async function gzipPays(file) {
+  if (typeof CompressionStream === "undefined" || file.size < 4 * GZIP_SAMPLE) return false;
+  const spots = [0.1, 0.5, 0.9].map(f => Math.floor(file.size * f));
+  const sample = new Blob(spots.map(o => file.slice(o, o + GZIP_SAMPLE)));
+  try { return (await gzipBlob(sample)).size < sample.size * GZIP_MAX_RATIO; } catch { return false; }
+}
+
+async function postJSON(url, body) {
+  const res = await api.fetchApi(url, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(body) });
+  let data = null; try { data = await res.json(); } catch {}
+  if (!res.ok || !data?.ok) throw new Error((data && data.error) || `HTTP ${res.status}`);
+  return data;
+}
+
+// One chunk PUT; onProgress(bytesSentOfThisChunk). Resolves on 2xx, rejects otherwise.
+// encoding: "gzip" when blob is the gzipped chunk (the server decodes it).
+function putChunk(up, id, index, blob, onProgress, encoding = "") {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+    up.xhrs.add(xhr);
+    xhr.upload.onprogress = (e) => onProgress(e.loaded);
+    xhr.onload = () => {
+      up.xhrs.delete(xhr);
+      if (xhr.status >= 200 && xhr.status < 300) resolve();
+      else { let d=null; try{ d=JSON.parse(xhr.responseText||"{}"); }catch{} reject(new Error((d&&d.error)||`HTTP ${xhr.status}`)); }
+    };
+    xhr.onerror = () => { up.xhrs.delete(xhr); reject(new Error("Network error")); };
+    xhr.onabort = () => { up.xhrs.delete(xhr); reject(new Error("aborted")); };
+    const enc = encoding ? `&encoding=${encoding}` : "";
+    xhr.open("PUT", api.apiURL(`/az/upload/chunk?id=${encodeURIComponent(id)}&index=${index}${enc}`), true);
+    xhr.send(blob);
+  });
+}
+
+// Whole archive in one streaming POST; the server unpacks it into dest as it arrives.
+function postArchive(up, file, dest, id, onProgress) {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+    up.xhrs.add(xhr);
+    xhr.upload.onprogress = (e) => onProgress(e.loaded);
+    xhr.onload = () => {
+      up.xhrs.delete(xhr);
+      let d=null; try{ d=JSON.parse(xhr.responseText||"{}"); }catch{}
+      if (xhr.status >= 200 && xhr.status < 300 && d?.ok) resolve(d);
+      else reject(new Error((d&&d.error)||`HTTP ${xhr.status}`));
+    };
+    xhr.onerror = () => { up.xhrs.delete(xhr); reject(new Error("Network error")); };
+    xhr.onabort = () => { up.xhrs.delete(xhr); reject(new Error("aborted")); };
+    const form = new FormData();  // text fields first: the server reads them before the file
+    form.append("dest_dir", dest); form.append("extract", "1"); form.append("id", id);
+    form.append("file", file, file.name);
+    xhr.open("POST", api.apiURL("/az/upload"), true);
+    xhr.send(form);
+  });
+}
+
 function fmtETA(s){ if(s==null) return "—"; const h=Math.floor(s/3600),m=Math.floor((s%3600)/60),sec=Math.floor(s%60); if(h) return `${h}h ${m}m ${sec}s`; if(m) return `${m}m ${sec}s`; return `${sec}s`; }
 
 app.registerExtension({
@@ -30,10 +98,11 @@ app.registerExtension({
       // ---- persistent + state ----
       this.properties = this.properties || {};
       this.properties.dest_dir = normalizePath(this.properties.dest_dir || "");
+      this.properties.extract = !!this.properties.extract;
 
       this._status="Idle"; this._progress=0; this._speed=0; this._eta=null;
       this._sent=0; this._total=0; this._savedPath=""; this._filename="";
-      this._xhr=null; this._selectedFile=null; this._tPrev=0; this._sentPrev=0;
+      this._up=null; this._selectedFile=null; this._tPrev=0; this._sentPrev=0;
 
       // ===== Destination input with custom dropdown =====
       const container = document.createElement("div");
@@ -111,8 +180,18 @@ app.registerExtension({
         const raw = destInput.value.trim();
         if (!raw) { items = []; renderDropdown(); return; }
         const val = normalizePath(raw);
+        if (!/[\/:~]/.test(val)) {  // bare words: fuzzy search over the indexed model folders
+          try {
+            const resp = await api.fetchApi(`/az/search?q=${encodeURIComponent(val)}&limit=50`);
+            const data = await resp.json();
+            items = data?.ok ? data.results.map(r => ({ name: r.name, path: r.path })) : [];
+          } catch { items = []; }
+          active = items.length ? 0 : -1;
+          renderDropdown();
+          return;
+        }
         try{
-          const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}`);
+          const resp = await api.fetchApi(`/az/listdir?path=${encodeURIComponent(val)}&folders_only=1&partial=1&limit=200`);
           const data = await resp.json();
           if (data?.ok && data.folders) {
             items = data.folders.map(f=>({
@@ -175,48 +254,121 @@ app.registerExtension({
         picker.click();
       });
 
+      // ===== Extract toggle: unpack .zip / .tar(.gz|.xz|.zst) into the destination =====
+      this.addWidget("toggle","Extract archive",this.properties.extract,(v)=>{ this.properties.extract=!!v; });
+
+      // Member-by-member progress pushed while an archive is unpacked
+      const onExtract=(ev)=>{
+        const st=ev.detail||{};
+        if(!this._up || st.id!==this._up.extractId) return;
+        if(st.state==="extracting" && st.member) this._status=`Extracting ${st.member} (${st.files} done)`;
+        else if(st.state==="spooling") this._status="Extracting (reading zip directory)…";
+        this.setDirtyCanvas(true);
+      };
+      api.addEventListener("az.extract.progress", onExtract);
+      const oldRemoved=this.onRemoved;
+      this.onRemoved=function(){
+        api.removeEventListener("az.extract.progress", onExtract);
+        if(oldRemoved) oldRemoved.apply(this, arguments);
+      };
+
       // ===== Upload =====
       this.addWidget("button","Upload","Start",async ()=>{
         if(!this._selectedFile){ this._status="Please select a file first."; this.setDirtyCanvas(true); return; }
         const dest=normalizePath(this.properties.dest_dir||"").trim();
         if(!dest){ this._status="Please enter destination folder."; this.setDirtyCanvas(true); return; }
-        if(this._xhr) return;
-
-        const form=new FormData();
-        form.append("file", this._selectedFile, this._selectedFile.name);
-        form.append("dest_dir", dest);
+        if(this._up) return;
 
-        const xhr=new XMLHttpRequest(); this._xhr=xhr;
-        this._status="Uploading…"; this._progress=0; this._sent=0; this._speed=0; this._eta=null; this._savedPath="";
-        this._tPrev=performance.now(); this._sentPrev=0; this.setDirtyCanvas(true);
+        // Resumable: init (same file -> same id), then PUT the missing chunks in parallel
+        const file=this._selectedFile;
+        const up={ xhrs:new Set(), canceled:false }; this._up=up;
+        this._status="Uploading…"; this._speed=0; this._eta=null; this._savedPath="";
+        this.setDirtyCanvas(true);
 
-        xhr.upload.onprogress=(e)=>{
-          if(e.lengthComputable){ this._sent=e.loaded; this._total=e.total; this._progress=Math.max(0,Math.min(100,(e.loaded/e.total)*100)); }
+        const tick=()=>{
           const tNow=performance.now(), dt=(tNow-this._tPrev)/1000;
-          if(dt>0.25){ const dBytes=this._sent-this._sentPrev; this._speed=dBytes/dt; const remain=Math.max(this._total-this._sent,0); this._eta=this._speed>0?Math.floor(remain/this._speed):null; this._tPrev=tNow; this._sentPrev=this._sent; }
+          if(dt>0.25){ const dBytes=this._sent-this._sentPrev; this._speed=Math.max(dBytes,0)/dt; const remain=Math.max(this._total-this._sent,0); this._eta=this._speed>0?Math.floor(remain/this._speed):null; this._tPrev=tNow; this._sentPrev=this._sent; }
+          this._progress=this._total?Math.max(0,Math.min(100,(this._sent/this._total)*100)):0;
           this.setDirtyCanvas(true);
         };
 
-        xhr.onreadystatechange=()=>{
-          if(xhr.readyState===4){
-            let data=null; try{ data=JSON.parse(xhr.responseText||"{}"); }catch{}
-            if(xhr.status>=200 && xhr.status<300 && data?.ok){ this._status="Complete"; this._savedPath=data.path||""; this._progress=100; }
-            else{ const err=(data&&(data.error||data.message))||`HTTP ${xhr.status}`; this._status=`Error: ${err}`; }
-            this._xhr=null; this.setDirtyCanvas(true);
+        if(this.properties.extract){
+          up.extractId=`${Date.now().toString(36)}${Math.random().toString(36).slice(2,8)}`;
+          this._total=file.size; this._sent=0; this._sentPrev=0; this._tPrev=performance.now();
+          try{
+            const out=await postArchive(up, file, dest, up.extractId, (n)=>{ this._sent=Math.min(n,this._total); tick(); });
+            this._status=`Extracted ${out.files.length} file(s)`+(out.skipped.length?`, skipped ${out.skipped.length}`:"");
+            this._savedPath=out.path||""; this._progress=100; this._sent=this._total;
+          }catch(e){
+            if(!up.canceled) this._status=`Failed: ${e.message}`;
+          }finally{
+            if(this._up===up) this._up=null;
+            this.setDirtyCanvas(true);
           }
-        };
-        xhr.onerror=()=>{ this._status="Network error"; this._xhr=null; this.setDirtyCanvas(true); };
+          return;
+        }
 
-        xhr.open("POST","/az/upload",true); xhr.send(form);
+        try{
+          const info=await postJSON("/az/upload/init",{ dest_dir:dest, filename:file.name, size:file.size,
+                                                        fingerprint:`${file.size}:${file.lastModified}` });
+          const inflight=new Map();  // index -> bytes sent of that chunk
+          let done=info.received;
+          this._total=file.size; this._sent=done; this._sentPrev=done; this._tPrev=performance.now();
+          if(done) this._status=`Resuming at ${fmtBytes(done)}…`;
+          tick();
+          const encoding=(await gzipPays(file)) ? "gzip" : "";
+          let wireRaw=0, wireSent=0;  // bytes before / after gzip, for the status line
+          if(encoding) this._status="Uploading (gzip)…";
+
+          const queue=info.missing.slice();
+          const worker=async()=>{
+            while(queue.length && !up.canceled){
+              const idx=queue.shift();
+              const start=idx*info.chunk_size, blob=file.slice(start, Math.min(start+info.chunk_size, file.size));
+              const body=encoding ? await gzipBlob(blob) : blob;
+              const scale=blob.size/Math.max(body.size,1);  // progress in file bytes
+              for(let attempt=0;;attempt++){
+                try{
+                  await putChunk(up, info.id, idx, body, (n)=>{ inflight.set(idx,Math.min(n*scale,blob.size)); this._sent=done+[...inflight.values()].reduce((a,b)=>a+b,0); tick(); }, encoding);
+                  inflight.delete(idx); done+=blob.size; this._sent=done;
+                  if(encoding){ wireRaw+=blob.size; wireSent+=body.size;
+                    this._status=`Uploading (gzip, ${Math.round(100*wireSent/wireRaw)}% on the wire)…`; }
+                  tick();
+                  break;
+                }catch(e){
+                  inflight.delete(idx);
+                  if(up.canceled) return;
+                  if(attempt+1>=UPLOAD_RETRIES) throw e;
+                  this._status=`Retrying (${e.message})…`; this.setDirtyCanvas(true);
+                  await sleep(Math.min(1000*2**attempt, 30000));
+                  this._status=encoding?"Uploading (gzip)…":"Uploading…";
+                }
+              }
+            }
+          };
+          await Promise.all(Array.from({length:Math.min(UPLOAD_PARALLEL, Math.max(queue.length,1))}, worker));
+          if(up.canceled) return;
+
+          const out=await postJSON("/az/upload/finalize",{ id:info.id });
+          this._status="Complete"; this._savedPath=out.path||""; this._progress=100; this._sent=this._total;
+        }catch(e){
+          const byUser=up.canceled;
+          up.canceled=true; for(const x of up.xhrs) x.abort();  // stop the other workers too
+          if(!byUser) this._status=`Paused: ${e.message} — press Start to resume`;
+        }finally{
+          if(this._up===up) this._up=null;
+          this.setDirtyCanvas(true);
+        }
       });
 
       // ===== Cancel =====
       this.addWidget("button","Cancel","Stop",()=>{
-        if(this._xhr){ this._xhr.abort(); this._xhr=null; this._status="Canceled"; this.setDirtyCanvas(true); }
+        if(this._up){ const up=this._up; up.canceled=true; for(const x of up.xhrs) x.abort(); this._up=null;
+          this._status=up.extractId?"Canceled":"Canceled (Start resumes)"; this.setDirtyCanvas(true); }
       });
 
       // ===== layout & drawing =====
-      this.size=[520,290];
+      this.size=[520,314];
       this.onDrawForeground=(ctx)=>{
         const pad=10,w=this.size[0]-pad*2,barH=14,yBar=this.size[1]-pad-barH-4;
 
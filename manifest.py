@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk downloads from a JSON/YAML manifest.
+- entries are a URL, or an HF repo + file (+ revision); each has an optional
+  dest subdir (under the manifest root), output name and sha256
+- files already on disk are verified (sha256, else size) and skipped
+- the rest become scheduled aria2 jobs, at most `parallel` per manifest at a time
+- one manifest id with combined progress and bytes/sec
+
+Manifest:
+    root: /workspace/ComfyUI/models      # default: ComfyUI models dir
+    parallel: 4
+    verify: true
+    entries:
+      - url: https://example.com/vae.safetensors
+        dest: vae
+      - repo: black-forest-labs/FLUX.1-dev
+        file: flux1-dev.safetensors
+        dest: unet
+        sha256: <64 hex>
+
+Routes:
+- POST /az/manifest        : manifest object | { manifest: text|object } | { path }
+- GET  /az/manifest/status : ?id=
+- POST /az/manifest/stop   : { id }
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+
+from aiohttp import web
+from server import PromptServer
+
+from .progress import broadcaster as _progress, emit, FINAL_STATES, SAMPLE_INTERVAL
+from .download_scheduler import scheduler as _scheduler
+from .url_probe import probe as _probe
+from .integrity import verify as _verify, quarantine, is_sha256, wants_verify
+from .Downloader_helper import (
+    start_aria2_download, stop_aria2_download, _smart_guess_filename, _sanitize_filename, _safe_expand, HF_TOKEN,
+)
+
+MANIFEST_EVENT = "az.manifest.progress"
+DEFAULT_PARALLEL = int(os.environ.get("COMFY_AZ_MANIFEST_PARALLEL", "4"))
+MAX_ENTRIES = 1000
+KEEP_FINISHED = 32
+
+
+class ManifestError(ValueError):
+    pass
+
+
+# ========= parsing =========
+def _load_text(text: str, fmt: str = "") -> object:
+    fmt = (fmt or "").lower().lstrip(".")
+    if fmt != "yaml" and fmt != "yml":
+        try:
+            return json.loads(text)
+        except ValueError:
+            if fmt == "json":
+                raise ManifestError("Manifest is not valid JSON.")
+    try:
+        import yaml
+    except ImportError:
+        raise ManifestError("YAML manifests need PyYAML (pip install pyyaml); use JSON otherwise.")
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ManifestError(f"Manifest is not valid YAML: {e}")
+
+def _default_root() -> str:
+    try:
+        import folder_paths
+        return folder_paths.models_dir
+    except Exception:
+        return os.getcwd()
+
+def _hf_url(repo_id: str, filename: str, revision: str, repo_type: str | None) -> str:
+    try:
+        from huggingface_hub import hf_hub_url
+        return hf_hub_url(repo_id, filename, revision=revision, repo_type=repo_type)
+    except ImportError:
+        from urllib.parse import quote
+        prefix = {"dataset": "datasets/", "space": "spaces/"}.get(repo_type or "", "")
+        return (f"https://huggingface.co/{prefix}{repo_id}/resolve/"
+                f"{quote(revision, safe='')}/{quote(filename)}")
+
+def parse_manifest(data) -> dict:
+    """Validate a loaded manifest; returns {root, token, parallel, priority, verify, entries}."""
+    if isinstance(data, list):
+        data = {"entries": data}
+    if not isinstance(data, dict):
+        raise ManifestError("Manifest must be a mapping with 'entries', or a list of entries.")
+    raw = data.get("entries") or data.get("files") or []
+    if not isinstance(raw, list) or not raw:
+        raise ManifestError("Manifest has no entries.")
+    if len(raw) > MAX_ENTRIES:
+        raise ManifestError(f"At most {MAX_ENTRIES} entries per manifest.")
+
+    root = _safe_expand(str(data.get("root") or _default_root()))
+    try:
+        parallel = max(1, int(data.get("parallel") or DEFAULT_PARALLEL))
+        priority = int(data.get("priority") or 0)
+    except (TypeError, ValueError):
+        raise ManifestError("parallel and priority must be integers.")
+    token = str(data.get("token") or "").strip()
+    verify = wants_verify(data.get("verify"))
+
+    entries = []
+    for i, e in enumerate(raw):
+        where = f"entry {i + 1}"
+        if isinstance(e, str):
+            e = {"url": e}
+        if not isinstance(e, dict):
+            raise ManifestError(f"{where}: must be a URL or a mapping.")
+        url = str(e.get("url") or "").strip()
+        repo = str(e.get("repo") or e.get("repo_id") or "").strip()
+        hf_file = str(e.get("file") or e.get("filename") or "").strip()
+        name = str(e.get("name") or e.get("out") or "").strip()
+        if not url:
+            if not (repo and hf_file):
+                raise ManifestError(f"{where}: needs 'url', or 'repo' and 'file'.")
+            url = _hf_url(repo, hf_file, str(e.get("revision") or "main"), e.get("repo_type"))
+            name = name or os.path.basename(hf_file)
+        sha = str(e.get("sha256") or "").strip().lower() or None
+        if sha and not is_sha256(sha):
+            raise ManifestError(f"{where}: sha256 must be 64 hex characters.")
+
+        dest = os.path.normpath(os.path.join(root, os.path.expanduser(str(e.get("dest") or ""))))
+        if dest != root and not dest.startswith(root.rstrip(os.sep) + os.sep):
+            raise ManifestError(f"{where}: dest escapes the manifest root.")
+        entries.append({
+            "url": url,
+            "dest_dir": dest,
+            "name": _sanitize_filename(name) if name else "",
+            "sha256": sha,
+            "token": str(e.get("token") or "").strip() or token
+                     or (HF_TOKEN if repo else ""),
+        })
+    return {"root": root, "token": token, "parallel": parallel,
+            "priority": priority, "verify": verify, "entries": entries}
+
+
+# ========= run =========
+_manifests: dict[str, dict] = {}    # id -> run record
+_by_gid: dict[str, tuple] = {}      # aria2 gid -> (run, item)
+_waiters: dict[str, asyncio.Future] = {}
+
+def _new_item(e: dict) -> dict:
+    return {
+        "url": e["url"], "dest_dir": e["dest_dir"], "filename": e["name"],
+        "filepath": "", "gid": "", "state": "pending",
+        "totalLength": 0, "completedLength": 0, "downloadSpeed": 0, "error": "",
+    }
+
+def summary(run: dict, items: bool = True) -> dict:
+    total = done = speed = 0
+    counts: dict[str, int] = {}
+    for it in run["items"]:
+        counts[it["state"]] = counts.get(it["state"], 0) + 1
+        total += it["totalLength"]
+        done += it["completedLength"]
+        speed += it["downloadSpeed"]
+    out = {
+        "id": run["id"],
+        "state": run["state"],
+        "entries": len(run["items"]),
+        "counts": counts,
+        "totalLength": total,
+        "completedLength": done,
+        "downloadSpeed": speed,
+        "percent": round(done / total * 100.0, 2) if total else 0.0,
+        "eta": (total - done) // speed if speed and total > done else None,
+        "created": run["created"],
+        "finished": run["finished"],
+    }
+    if items:
+        out["items"] = run["items"]
+    return out
+
+def _push(run: dict, now: bool = False):
+    """Throttled aggregate progress event (at most one per sample interval)."""
+    if now:
+        run["emit_pending"] = False
+        emit(MANIFEST_EVENT, summary(run, items=False))
+        return
+    if run["emit_pending"]:
+        return
+    run["emit_pending"] = True
+    asyncio.get_running_loop().call_later(SAMPLE_INTERVAL, _push, run, True)
+
+def _on_aria2_item(item: dict):
+    hit = _by_gid.get(item.get("gid"))
+    if hit is None:
+        return
+    run, it = hit
+    status = item.get("status")
+    it["state"] = status or it["state"]
+    for k in ("totalLength", "completedLength", "downloadSpeed"):
+        if item.get(k) is not None:
+            it[k] = int(item[k])
+    if item.get("filepath"):
+        it["filepath"] = item["filepath"]
+        it["filename"] = item.get("filename") or it["filename"]
+    if status in FINAL_STATES:
+        it["downloadSpeed"] = 0
+        it["error"] = item.get("error", "") if status != "complete" else ""
+        _by_gid.pop(item["gid"], None)
+        fut = _waiters.pop(item["gid"], None)
+        if fut is not None and not fut.done():
+            fut.set_result(status)
+    _push(run)
+
+_progress.add_listener(_on_aria2_item)
+
+async def _already_there(e: dict, it: dict, verify: bool) -> bool:
+    """True if the entry's file is on disk and matches (sha256, else size)."""
+    name = e["name"]
+    if not name:
+        # the URL-path name is good enough to look for (aria2 would pick it too)
+        name, _confident = await _smart_guess_filename(e["url"], token=e["token"] or None)
+        if not name:
+            return False
+    path = os.path.join(e["dest_dir"], name)
+    if not os.path.isfile(path):
+        return False
+    size = os.path.getsize(path)
+    if e["sha256"]:
+        res = await _verify(path, e["sha256"])
+        if not res["ok"]:
+            quarantine(path)  # never resume onto bad bytes
+            return False
+    else:
+        info = await _probe(e["url"], token=e["token"] or None)
+        if not info.get("size") or info["size"] != size:
+            return False  # partial or unknown: aria2 resumes / replaces it
+        if verify:
+            await _verify(path)  # hash once so the index can dedupe it later
+    it["filepath"], it["filename"] = path, name
+    it["totalLength"] = it["completedLength"] = size
+    return True
+
+async def _run_entry(run: dict, e: dict, it: dict, sem: asyncio.Semaphore):
+    async with sem:
+        if run["state"] == "stopped":
+            return
+        try:
+            if await _already_there(e, it, run["verify"]):
+                it["state"] = "skipped"
+                return
+        except OSError as ex:
+            it["state"], it["error"] = "error", f"{type(ex).__name__}: {ex}"
+            return
+        reply, code = await start_aria2_download(
+            e["url"], e["dest_dir"], token=e["token"], priority=run["priority"],
+            user_sha=e["sha256"], verify=run["verify"], out=e["name"] or None,
+        )
+        if code != 200:
+            it["state"], it["error"] = "error", reply.get("error", f"HTTP {code}")
+            return
+        if not reply.get("gid"):
+            # satisfied from the model index (hardlink / reflink)
+            it["state"] = "linked"
+            it["filepath"], it["filename"] = reply["filepath"], reply["filename"]
+            try:
+                it["totalLength"] = it["completedLength"] = os.path.getsize(reply["filepath"])
+            except OSError:
+                pass
+            return
+        gid = it["gid"] = reply["gid"]
+        it["state"] = reply.get("state") or "queued"
+        it["totalLength"] = reply.get("size") or 0
+        fut = _waiters[gid] = asyncio.get_running_loop().create_future()
+        _by_gid[gid] = (run, it)
+        _push(run)
+        await fut
+
+async def _run(run: dict, entries: list[dict]):
+    sem = asyncio.Semaphore(run["parallel"])
+    try:
+        await asyncio.gather(*(
+            _run_entry(run, e, it, sem) for e, it in zip(entries, run["items"])
+        ))
+        if run["state"] == "running":
+            failed = any(it["state"] in ("error", "removed") for it in run["items"])
+            run["state"] = "error" if failed else "complete"
+    except asyncio.CancelledError:
+        run["state"] = "stopped"
+    finally:
+        run["finished"] = time.time()
+        _push(run, now=True)
+
+def _prune():
+    done = [m for m in _manifests.values() if m["finished"]]
+    done.sort(key=lambda m: m["finished"])
+    for m in done[:max(0, len(done) - KEEP_FINISHED)]:
+        _manifests.pop(m["id"], None)
+
+def start_manifest(spec: dict) -> dict:
+    """Kick off a parsed manifest in the background; returns its run record."""
+    _prune()
+    run = {
+        "id": uuid.uuid4().hex[:12],
+        "state": "running",
+        "root": spec["root"],
+        "parallel": spec["parallel"],
+        "priority": spec["priority"],
+        "verify": spec["verify"],
+        "created": time.time(),
+        "finished": None,
+        "emit_pending": False,
+        "items": [_new_item(e) for e in spec["entries"]],
+    }
+    run["task"] = asyncio.ensure_future(_run(run, spec["entries"]))
+    _manifests[run["id"]] = run
+    return run
+
+async def stop_manifest(run: dict):
+    """Stop a manifest: unstarted entries are dropped, running downloads removed."""
+    if run["finished"]:
+        return
+    run["state"] = "stopped"
+    for it in run["items"]:
+        gid = it["gid"]
+        if gid and _by_gid.pop(gid, None) is not None:
+            try:
+                await stop_aria2_download(gid)  # either engine; frees the scheduler slot and job row
+            except Exception:
+                _scheduler.finished(gid)
+            it["state"] = "removed"
+            it["downloadSpeed"] = 0
+            _waiters.pop(gid, None)
+        elif it["state"] == "pending":
+            it["state"] = "removed"
+    run["task"].cancel()
+    await asyncio.wait([run["task"]], timeout=5)
+
+
+# ========= routes =========
+@PromptServer.instance.routes.post("/az/manifest")
+async def az_manifest(request):
+    try:
+        body = await request.json()
+    except Exception:
+        return web.json_response({"ok": False, "error": "Body must be JSON."}, status=400)
+    try:
+        if isinstance(body, dict) and body.get("path"):
+            path = _safe_expand(str(body["path"]))
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = _load_text(f.read(), os.path.splitext(path)[1])
+            except OSError as e:
+                return web.json_response({"ok": False, "error": f"Cannot read manifest: {e}"}, status=400)
+        elif isinstance(body, dict) and "manifest" in body:
+            data = body["manifest"]
+            if isinstance(data, str):
+                data = _load_text(data, body.get("format") or "")
+        else:
+            data = body
+        spec = parse_manifest(data)
+        if isinstance(body, dict) and body.get("parallel"):
+            spec["parallel"] = max(1, int(body["parallel"]))
+    except (ManifestError, TypeError, ValueError) as e:
+        return web.json_response({"ok": False, "error": str(e)}, status=400)
+
+    run = start_manifest(spec)
+    return web.json_response({"ok": True, **summary(run, items=False)})
+
+@PromptServer.instance.routes.get("/az/manifest/status")
+async def az_manifest_status(request):
+    mid = (request.rel_url.query.get("id") or "").strip()
+    run = _manifests.get(mid)
+    if run is None:
+        return web.json_response({"ok": False, "error": "unknown manifest id"}, status=404)
+    return web.json_response({"ok": True, **summary(run)})
+
+@PromptServer.instance.routes.post("/az/manifest/stop")
+async def az_manifest_stop(request):
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    run = _manifests.get((body.get("id") or "").strip())
+    if run is None:
+        return web.json_response({"ok": False, "error": "unknown manifest id"}, status=404)
+    await stop_manifest(run)
+    return web.json_response({"ok": True, **summary(run, items=False)})
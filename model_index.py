@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent, content-addressed index of model files already on disk.
+- entries: path -> {size, mtime, sha256, etag, urls, hf}
+- match by original URL, HF repo/filename, or (size + ETag/sha256)
+- incremental refresh over the model roots (only changed size/mtime is re-read)
+- matched files are hardlinked (or reflinked) into the destination instead of
+  being downloaded again
+"""
+
+import os
+import json
+import time
+import errno
+import atexit
+import asyncio
+import threading
+
+from .storage import state_path, model_roots
+
+INDEX_FILE = "model_index.json"
+REFRESH_INTERVAL = float(os.environ.get("COMFY_AZ_INDEX_REFRESH", "300"))
+MIN_SIZE = 1 << 20  # ignore small files (configs, previews)
+MODEL_EXTS = {
+    ".safetensors", ".sft", ".ckpt", ".pt", ".pth", ".bin", ".gguf",
+    ".onnx", ".pkl", ".engine", ".npz",
+}
+SAVE_DELAY = 2.0  # record() bursts (snapshot downloads) coalesce into one write
+FICLONE = 0x40049409  # linux ioctl: share extents (btrfs/xfs reflink)
+
+
+def hf_key(repo_id: str, filename: str, revision: str | None = None) -> str:
+    return f"{repo_id}@{revision or 'main'}::{filename}"
+
+def _is_model(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in MODEL_EXTS
+
+
+class ModelIndex:
+    def __init__(self, path: str | None = None):
+        self.path = path or state_path(INDEX_FILE)
+        self._files: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._refreshing: asyncio.Future | None = None
+        self._save_timer: threading.Timer | None = None
+        self._load()
+        atexit.register(self.save)
+
+    # ---------- persistence ----------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._files = dict(data.get("files") or {})
+        except (OSError, ValueError):
+            self._files = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": 1, "files": self._files})
+            self._dirty = False
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def save_soon(self):
+        """Debounced save() on a timer thread: never serializes on the caller's (event loop) thread."""
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(SAVE_DELAY, self._timed_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _timed_save(self):
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    # ---------- entries ----------
+    def _fresh(self, path: str, e: dict) -> bool:
+        """True if the file still matches what we indexed (size + mtime)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._files.pop(path, None)
+            self._dirty = True
+            return False
+        if st.st_size != e.get("size") or st.st_mtime_ns != e.get("mtime"):
+            # content changed: drop identity fields, keep it indexed by stat only
+            self._files[path] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+            self._dirty = True
+            return False
+        return True
+
+    def record(self, path: str, url: str | None = None, hf: str | None = None,
+               etag: str | None = None, sha256: str | None = None):
+        """Remember where a file came from (call after a completed download)."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            e = self._files.get(path)
+            if not e or e.get("size") != st.st_size or e.get("mtime") != st.st_mtime_ns:
+                e = {"size": st.st_size, "mtime": st.st_mtime_ns}
+            if url and url not in e.setdefault("urls", []):
+                e["urls"].append(url)
+            if hf and hf not in e.setdefault("hf", []):
+                e["hf"].append(hf)
+            if etag:
+                e["etag"] = etag
+            if sha256:
+                e["sha256"] = sha256.lower()
+            self._files[path] = e
+            self._dirty = True
+        self.save_soon()
+
+    def find(self, url: str | None = None, hf: str | None = None, size: int | None = None,
+             etag: str | None = None, sha256: str | None = None) -> str | None:
+        """Path of an on-disk file with the same identity, or None."""
+        sha256 = (sha256 or "").lower()
+        with self._lock:
+            for path, e in list(self._files.items()):
+                if size is not None and e.get("size") != size:
+                    continue
+                hit = (
+                    (url and url in (e.get("urls") or []))
+                    or (hf and hf in (e.get("hf") or []))
+                    or (sha256 and e.get("sha256") == sha256)
+                    or (etag and size is not None and e.get("etag") == etag)
+                )
+                if hit and self._fresh(path, e):
+                    return path
+        return None
+
+    def sha256_for(self, path: str) -> str | None:
+        """Known sha256 of path, if the file is unchanged since it was hashed."""
+        path = os.path.abspath(path)
+        with self._lock:
+            e = self._files.get(path)
+            if e and e.get("sha256") and self._fresh(path, e):
+                return e["sha256"]
+        return None
+
+    def unhashed_with_size(self, size: int) -> list[str]:
+        with self._lock:
+            return [p for p, e in self._files.items()
+                    if e.get("size") == size and not e.get("sha256")]
+
+    # ---------- refresh ----------
+    def refresh(self, roots: list[str] | None = None):
+        """Incremental walk of the model roots (blocking; run it in a thread)."""
+        roots = roots if roots is not None else model_roots()
+        seen = set()
+        stack = list(roots)
+        while stack:
+            d = stack.pop()
+            try:
+                it = os.scandir(d)
+            except OSError:
+                continue
+            with it:
+                for de in it:
+                    try:
+                        if de.is_dir(follow_symlinks=False):
+                            stack.append(de.path)
+                            continue
+                        if not _is_model(de.name):
+                            continue
+                        st = de.stat()
+                    except OSError:
+                        continue
+                    if st.st_size < MIN_SIZE:
+                        continue
+                    path = os.path.abspath(de.path)
+                    seen.add(path)
+                    with self._lock:
+                        e = self._files.get(path)
+                        if e and e.get("size") == st.st_size and e.get("mtime") == st.st_mtime_ns:
+                            continue
+                        self._files[path] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+                        self._dirty = True
+        # prune vanished files under the walked roots
+        prefixes = tuple(r.rstrip(os.sep) + os.sep for r in roots)
+        with self._lock:
+            for path in [p for p in self._files if p.startswith(prefixes) and p not in seen]:
+                if not os.path.exists(path):
+                    self._files.pop(path, None)
+                    self._dirty = True
+            self._last_refresh = time.time()
+        self.save()
+
+    async def ensure_fresh(self):
+        """Kick a background refresh if the last one is older than REFRESH_INTERVAL."""
+        if time.time() - self._last_refresh < REFRESH_INTERVAL:
+            return
+        if self._refreshing is None or self._refreshing.done():
+            loop = asyncio.get_running_loop()
+            self._refreshing = loop.run_in_executor(None, self.refresh)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": sum(e.get("size", 0) for e in self._files.values()),
+                "last_refresh": self._last_refresh,
+            }
+
+
+def link_into(src: str, dst: str) -> str | None:
+    """
+    Make dst share src's data. Returns "exists", "hardlink", "reflink" or None
+    (caller should download instead).
+    """
+    src = os.path.abspath(src)
+    dst = os.path.abspath(dst)
+    if src == dst:
+        return "exists"
+    if os.path.exists(dst):
+        try:
+            if os.path.samefile(src, dst):
+                return "exists"
+        except OSError:
+            pass
+        return None  # never clobber an unrelated file
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            return None
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    tmp = f"{dst}.azlink"
+    try:
+        with open(src, "rb") as fs, open(tmp, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        os.replace(tmp, dst)
+        return "reflink"
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return None
+
+
+index = ModelIndex()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Queue a download manifest on a running ComfyUI (az nodes) and follow it.
+
+    python az_manifest.py models.yaml
+    python az_manifest.py models.json --server http://127.0.0.1:8188 --parallel 6
+    python az_manifest.py --status <id>
+    python az_manifest.py --stop <id>
+
+Stdlib only, so it runs from any python. YAML parsing happens on the server.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.error
+import urllib.request
+
+POLL_INTERVAL = 2.0
+
+
+def _call(server: str, path: str, body: dict | None = None) -> dict:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(server.rstrip("/") + path, data=data,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as r:
+            return json.loads(r.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            return json.loads(e.read().decode("utf-8"))
+        except ValueError:
+            return {"ok": False, "error": f"HTTP {e.code}"}
+
+def _human(n: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+def _line(s: dict) -> str:
+    counts = " ".join(f"{k}={v}" for k, v in sorted(s.get("counts", {}).items()))
+    eta = s.get("eta")
+    return (f"[{s['state']}] {s['percent']:5.1f}%  "
+            f"{_human(s['completedLength'])}/{_human(s['totalLength'])}  "
+            f"{_human(s['downloadSpeed'])}/s  eta {eta if eta is not None else '-'}s  {counts}")
+
+def _follow(server: str, mid: str) -> int:
+    try:
+        while True:
+            s = _call(server, f"/az/manifest/status?id={mid}")
+            if not s.get("ok"):
+                print(s.get("error"), file=sys.stderr)
+                return 1
+            print("\r" + _line(s), end="", flush=True)
+            if s["state"] != "running":
+                print()
+                for it in s.get("items", []):
+                    if it.get("error"):
+                        print(f"  ! {it.get('filename') or it['url']}: {it['error']}")
+                return 0 if s["state"] == "complete" else 1
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print(f"\nstopping {mid} ...")
+        _call(server, "/az/manifest/stop", {"id": mid})
+        return 130
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("manifest", nargs="?", help="JSON or YAML manifest file")
+    ap.add_argument("--server", default=os.environ.get("COMFY_URL", "http://127.0.0.1:8188"))
+    ap.add_argument("--parallel", type=int, help="override the manifest's parallel")
+    ap.add_argument("--no-wait", action="store_true", help="print the manifest id and exit")
+    ap.add_argument("--status", metavar="ID", help="follow an already queued manifest")
+    ap.add_argument("--stop", metavar="ID", help="stop a manifest")
+    args = ap.parse_args()
+
+    if args.stop:
+        r = _call(args.server, "/az/manifest/stop", {"id": args.stop})
+        print(_line(r) if r.get("ok") else r.get("error"))
+        return 0 if r.get("ok") else 1
+    if args.status:
+        return _follow(args.server, args.status)
+    if not args.manifest:
+        ap.error("manifest file is required")
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        text = f.read()
+    body = {"manifest": text, "format": os.path.splitext(args.manifest)[1]}
+    if args.parallel:
+        body["parallel"] = args.parallel
+    r = _call(args.server, "/az/manifest", body)
+    if not r.get("ok"):
+        print(r.get("error"), file=sys.stderr)
+        return 1
+    print(f"manifest {r['id']}: {r['entries']} entries")
+    if args.no_wait:
+        return 0
+    return _follow(args.server, r["id"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
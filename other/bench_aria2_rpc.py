@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+What does batching status polls into one system.multicall buy over one
+JSON-RPC call per gid? Runs against a local fake aria2 JSON-RPC server, so no
+daemon is needed and the numbers are repeatable.
+
+    python bench_aria2_rpc.py
+    python bench_aria2_rpc.py --gids 1 16 64 256 --rtt 2 --per-call 0.1
+    python bench_aria2_rpc.py --repeat 20
+
+The fake server answers tellStatus with an aria2-shaped status. Each HTTP
+request costs RTT ms (network + HTTP handling), and each aria2 method inside it
+costs PER_CALL ms (aria2 serializes its RPC work), so:
+
+    N single calls : N * (RTT + PER_CALL)
+    one multicall  : RTT + N * PER_CALL
+
+Rows, for N gids:
+    urllib x N      a fresh connection per call (the routes before the pooled client)
+    pooled x N      Aria2Client.call one after another on a keep-alive session
+    pooled gather   the same N calls in flight at once (connection pool of 8)
+    multicall       one Aria2Client.multicall carrying all N tellStatus calls
+
+Needs aiohttp (ships with ComfyUI) for the pooled rows.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECRET = "bench"
+
+
+def _status(gid: str) -> dict:
+    return {"gid": gid, "status": "active", "totalLength": "7516192768", "completedLength": "2147483648",
+            "downloadSpeed": "52428800", "dir": "/models/checkpoints",
+            "files": [{"path": f"/models/checkpoints/{gid}.safetensors", "length": "7516192768"}]}
+
+def _handler(rtt: float, per_call: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like aria2
+        disable_nagle_algorithm = True  # headers and body go out as two writes
+
+        def log_message(self, *args):
+            pass
+
+        def _one(self, method: str, params: list):
+            time.sleep(per_call)
+            if params[:1] != [f"token:{SECRET}"]:
+                return None, {"code": 1, "message": "Unauthorized"}
+            if method == "aria2.tellStatus":
+                return _status(params[1]), None
+            if method == "aria2.getVersion":
+                return {"version": "1.37.0"}, None
+            return None, {"code": 1, "message": f"No such method: {method}"}
+
+        def do_POST(self):
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            time.sleep(rtt)
+            if req.get("method") == "system.multicall":
+                out = []
+                for c in req["params"][0]:
+                    res, err = self._one(c["methodName"], c.get("params") or [])
+                    out.append(err if err else [res])
+                body = {"jsonrpc": "2.0", "id": req.get("id"), "result": out}
+            else:
+                res, err = self._one(req.get("method"), req.get("params") or [])
+                body = {"jsonrpc": "2.0", "id": req.get("id")}
+                body.update({"error": err} if err else {"result": res})
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    return Handler
+
+def _urllib_call(url: str, gid: str):
+    payload = {"jsonrpc": "2.0", "id": gid, "method": "aria2.tellStatus",
+               "params": [f"token:{SECRET}", gid]}
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read())
+
+async def _rows(url: str, counts: list[int], repeat: int) -> list[tuple[int, str, float]]:
+    from aria2_client import Aria2Client
+    client = Aria2Client(url=url, secret=SECRET, retries=0)
+    await client.call("getVersion")  # open the pooled connection first
+
+    async def timed(fn) -> float:
+        runs = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            await fn()
+            runs.append(time.perf_counter() - t)
+        return statistics.median(runs)
+
+    rows = []
+    try:
+        for n in counts:
+            gids = [f"{i:016x}" for i in range(n)]
+
+            async def old():
+                await asyncio.to_thread(lambda: [_urllib_call(url, g) for g in gids])
+
+            async def serial():
+                for g in gids:
+                    await client.call("tellStatus", [g])
+
+            async def gathered():
+                await asyncio.gather(*(client.call("tellStatus", [g]) for g in gids))
+
+            async def multi():
+                res = await client.multicall([("tellStatus", [g]) for g in gids])
+                assert len(res) == n and not any(isinstance(r, Exception) for r in res)
+
+            for name, fn in (("urllib x N", old), ("pooled x N", serial),
+                             ("pooled gather", gathered), ("multicall", multi)):
+                rows.append((n, name, await timed(fn)))
+    finally:
+        await client.close()
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--gids", type=int, nargs="+", default=[1, 8, 32, 128], help="gids per poll (default 1 8 32 128)")
+    ap.add_argument("--rtt", type=float, default=1.0, help="ms per HTTP request (default 1.0)")
+    ap.add_argument("--per-call", type=float, default=0.05, help="ms per aria2 method (default 0.05)")
+    ap.add_argument("--repeat", type=int, default=7, help="runs per row, median reported (default 7)")
+    args = ap.parse_args()
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise SystemExit("needs aiohttp for the pooled client (pip install aiohttp)")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(args.rtt / 1000, args.per_call / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/jsonrpc"
+    try:
+        rows = asyncio.run(_rows(url, args.gids, args.repeat))
+    finally:
+        server.shutdown()
+
+    print(f"fake aria2: {args.rtt:g} ms per request, {args.per_call:g} ms per call; median of {args.repeat}")
+    print(f"{'gids':>5} {'client':14} {'ms':>9} {'ms/gid':>8} {'vs urllib':>9}")
+    base = {}
+    for n, name, sec in rows:
+        base.setdefault(n, sec)
+        print(f"{n:5d} {name:14} {sec * 1000:9.2f} {sec * 1000 / n:8.3f} {base[n] / sec:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+How long does a purged model take to come back: reloaded from its
+.safetensors on disk, from ordinary (pageable) RAM, or from the RAM tier's
+pinned host memory (ram_tier.py, COMFY_AZ_RAM_TIER_GB)?
+
+    python bench_ram_tier.py model.safetensors
+    python bench_ram_tier.py --synthetic 4
+    python bench_ram_tier.py unet.safetensors --repeat 5 --device cuda:1
+
+Rows:
+    disk (cold)   file dropped from the page cache first (posix_fadvise), then
+                  safetensors -> CPU -> device, as ComfyUI's loaders do
+    disk (warm)   same, file still in the page cache
+    RAM pageable  CPU tensors -> device with .to() (ComfyUI's default offload)
+    RAM tier      pinned tensors -> device, non_blocking copies on one side
+                  stream (what the tier's restore does)
+
+Without CUDA the device rows are CPU copies and the RAM tier row is skipped.
+Needs torch and safetensors (both ship with ComfyUI).
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+GiB = 1 << 30
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _sync(device):
+    import torch
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+def _drop_cache(path: str) -> bool:
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+def _synthetic(size_gib: float, folder: str) -> str:
+    """A checkpoint-shaped file: fp16 blocks of 16-64 MiB plus small norms / biases."""
+    import torch
+    from safetensors.torch import save_file
+    g = torch.Generator().manual_seed(0)
+    sd, total, i = {}, 0, 0
+    while total < size_gib * GiB:
+        rows = (2048, 4096, 8192)[i % 3]
+        sd[f"blocks.{i}.weight"] = (torch.randn(rows, 4096, generator=g) * 0.02).half()
+        sd[f"blocks.{i}.bias"] = torch.zeros(rows, dtype=torch.float16)
+        total += rows * 4096 * 2
+        i += 1
+    path = os.path.join(folder, "synthetic.safetensors")
+    save_file(sd, path)
+    return path
+
+def _timed(fn, device, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        _sync(device)
+        best = min(best, time.perf_counter() - t)
+        del out
+    return best
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("file", nargs="?", help=".safetensors file to reload")
+    ap.add_argument("--synthetic", type=float, metavar="GIB", help="generate a GIB-sized fp16 checkpoint instead")
+    ap.add_argument("--device", default=None, help="target device (default cuda if available, else cpu)")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per row, best is reported (default 3)")
+    args = ap.parse_args()
+    if not args.file and not args.synthetic:
+        ap.error("give a .safetensors file or --synthetic GIB")
+
+    try:
+        import torch
+        from safetensors.torch import load_file
+    except ImportError as e:
+        raise SystemExit(f"needs torch and safetensors: {e}")
+    from ram_tier import RamTier
+
+    device = torch.device(args.device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or _synthetic(args.synthetic, tmp)
+        size = os.path.getsize(path)
+
+        def from_disk(cold: bool):
+            def run():
+                if cold:
+                    _drop_cache(path)
+                return {k: v.to(device) for k, v in load_file(path, device="cpu").items()}
+            return run
+
+        sd = load_file(path, device="cpu")
+        module = torch.nn.Module()
+        for i, (k, v) in enumerate(sd.items()):
+            module.register_buffer(f"t{i}", v)
+        rows = [
+            ("disk (cold)", _timed(from_disk(True), device, args.repeat)),
+            ("disk (warm)", _timed(from_disk(False), device, args.repeat)),
+            ("RAM pageable", _timed(lambda: {k: v.to(device) for k, v in sd.items()}, device, args.repeat)),
+        ]
+        if device.type == "cuda":
+            tier = RamTier(budget=size * 2)
+            best = float("inf")
+            for _ in range(args.repeat):
+                module.to("cpu")
+                if not tier.stash(module):
+                    raise SystemExit("RAM tier refused the model (pinned allocation failed?)")
+                _sync(device)
+                t = time.perf_counter()
+                tier.restore(module, device)
+                _sync(device)
+                best = min(best, time.perf_counter() - t)
+            rows.append(("RAM tier (pinned)", best))
+
+    print(f"{os.path.basename(path)}: {size / GiB:.2f} GiB -> {device}")
+    print(f"{'source':18} {'seconds':>8} {'GiB/s':>7} {'vs cold disk':>12}")
+    cold = rows[0][1]
+    for name, sec in rows:
+        print(f"{name:18} {sec:8.3f} {size / GiB / sec:7.2f} {cold / sec:11.1f}x")
+    if device.type != "cuda":
+        print("(RAM tier row skipped: no CUDA device, nothing to pin)")
+    if not hasattr(os, "posix_fadvise"):
+        print("(no posix_fadvise here: 'disk (cold)' may be served from the page cache)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+How much faster is the built-in engine's multi-connection Range download
+(range_downloader.py) than one HTTP stream, and how does it compare to aria2c?
+
+    python bench_range_download.py
+    python bench_range_download.py --size 512 --conn-mbit 200 --conns 1 4 8 16
+    python bench_range_download.py --profile trickle
+    python bench_range_download.py --url https://huggingface.co/.../model.safetensors --conns 4 16
+
+Without --url, a local server serves SIZE MiB of random bytes with Range
+support, capping every connection at CONN_MBIT Mbit/s (what CDNs and many
+hosts do per TCP stream: the reason splitting helps at all) after TTFB ms,
+in PIECE-byte writes. The local server is plain Python: on a machine with few
+cores it tops out around 100 MiB/s in total, so keep CONN_MBIT * N below
+that or the rows measure the server.
+
+Profiles (defaults for --size / --conn-mbit / --piece / --conns / --min-split):
+    fast      256 MiB, 100 Mbit/s, 64 KiB writes, x4 x8 x16, 20 MiB splits
+    trickle   32 MiB, 20 Mbit/s, 1400-byte writes (one TCP segment each),
+              x2 x4, 8 MiB splits: a slow host whose bytes arrive a packet at
+              a time, so one 4 MiB write buffer holds thousands of pieces
+              (more than IOV_MAX, what pwritev takes in one call)
+
+Rows:
+    single stream   RangeDownload without Range support: one GET, sequential
+    range xN        RangeDownload with N connections (split = N)
+    aria2c xN       aria2c -x N -s N, when aria2c is on PATH
+
+The range rows run the real RangeDownload. ComfyUI is not needed: a stand-in
+`server` module takes the route registrations, the repo is imported as a
+package without its __init__.py (no torch), and state files go to a temp dir.
+"bufs" is the most buffers the engine handed to one pwrite. Every file is
+checked against the served bytes; the exit status is 1 if any row failed.
+
+Needs aiohttp (ships with ComfyUI).
+"""
+
+import os
+import sys
+import time
+import types
+import shutil
+import hashlib
+import asyncio
+import argparse
+import tempfile
+import importlib
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MiB = 1 << 20
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = {
+    "fast": {"size": 256, "conn_mbit": 100, "piece": 64 << 10, "conns": [4, 8, 16], "min_split": 20},
+    "trickle": {"size": 32, "conn_mbit": 20, "piece": 1400, "conns": [2, 4], "min_split": 8},
+}
+
+
+def _handler(blob: bytes, conn_bps: float, ttfb: float, piece: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # every piece leaves as its own segment
+
+        def log_message(self, *args):
+            pass
+
+        def _range(self) -> tuple[int, int] | None:
+            r = self.headers.get("Range", "")
+            if not r.startswith("bytes="):
+                return None
+            a, _, b = r[6:].partition("-")
+            start = int(a)
+            end = int(b) + 1 if b else len(blob)
+            return start, min(end, len(blob))
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(blob)))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+
+        def do_GET(self):
+            rng = self._range()
+            start, end = rng or (0, len(blob))
+            self.send_response(206 if rng else 200)
+            self.send_header("Content-Length", str(end - start))
+            self.send_header("Accept-Ranges", "bytes")
+            if rng:
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(blob)}")
+            self.end_headers()
+            time.sleep(ttfb)
+            t0, sent = time.monotonic(), 0
+            try:
+                for off in range(start, end, piece):
+                    data = blob[off:min(off + piece, end)]
+                    self.wfile.write(data)
+                    sent += len(data)
+                    ahead = sent / conn_bps - (time.monotonic() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # a stolen segment's stream is closed early
+    return Handler
+
+
+def _import_engine(state_dir: str):
+    """range_downloader, imported with a stand-in for ComfyUI's server module."""
+    class Routes:
+        def __getattr__(self, method):
+            return lambda path: (lambda fn: fn)
+
+    class Instance:
+        routes = Routes()
+
+        def send_sync(self, event, data, sid=None):
+            pass
+
+    server = types.ModuleType("server")
+    server.PromptServer = types.SimpleNamespace(instance=Instance())
+    sys.modules.setdefault("server", server)
+    os.environ["COMFY_AZ_STATE_DIR"] = state_dir
+    pkg = types.ModuleType("az_bench")
+    pkg.__path__ = [REPO]  # the node pack as a package, minus its __init__.py
+    sys.modules["az_bench"] = pkg
+    return importlib.import_module("az_bench.range_downloader")
+
+async def _engine(rd, url: str, folder: str, name: str, size: int, conns: int, min_split: int) -> str:
+    opts = {"dir": folder, "out": name, "max-connection-per-server": str(conns),
+            "split": str(conns), "min-split-size": str(min_split)}
+    dl = rd.RangeDownload(f"bench{conns}", [url], opts, size=size, accept_ranges=conns > 1)
+    await dl.unpause()
+    await dl._task
+    return dl.error if dl.status != "complete" else ""
+
+def _aria2c(url: str, folder: str, name: str, conns: int, min_split: int) -> float:
+    cmd = ["aria2c", "-q", "-x", str(conns), "-s", str(conns), f"--min-split-size={max(min_split // MiB, 1)}M",
+           "--file-allocation=none", "--allow-overwrite=true", "--auto-file-renaming=false",
+           "-d", folder, "-o", name, url]
+    t = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - t
+
+def _sha(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(8 * MiB):
+            h.update(chunk)
+    return h.hexdigest()
+
+async def _bench(rd, url: str, size: int, conns: list[int], min_split: int, folder: str, want: str | None):
+    widest = [0]
+    pwrite = rd.pwrite
+
+    def counting(fd, chunks, offset):
+        widest[0] = max(widest[0], len(chunks))
+        pwrite(fd, chunks, offset)
+
+    rd.pwrite = counting
+    rows = []
+    try:
+        for n in [1] + [c for c in conns if c > 1]:
+            name, widest[0] = f"range{n}.bin", 0
+            t = time.perf_counter()
+            err = await _engine(rd, url, folder, name, size, n, min_split)
+            sec = time.perf_counter() - t
+            path = os.path.join(folder, name)
+            if not err and want is not None and _sha(path) != want:
+                err = "MISMATCH"
+            rows.append(("single stream" if n == 1 else f"range x{n}", sec, widest[0], err))
+            if os.path.exists(path):
+                os.remove(path)
+    finally:
+        rd.pwrite = pwrite
+        await rd.http_session().close()
+    if shutil.which("aria2c"):
+        for n in [c for c in conns if c > 1]:
+            sec = await asyncio.to_thread(_aria2c, url, folder, "aria2.bin", n, min_split)
+            path = os.path.join(folder, "aria2.bin")
+            rows.append((f"aria2c x{n}", sec, None, "" if want is None or _sha(path) == want else "MISMATCH"))
+            os.remove(path)
+    return rows
+
+async def _head(url: str) -> int:
+    import aiohttp
+    async with aiohttp.ClientSession() as s:
+        async with s.head(url, allow_redirects=True) as r:
+            if r.headers.get("Accept-Ranges", "").lower() != "bytes":
+                print("(server does not advertise Range support; split rows may fail)")
+            return int(r.headers.get("Content-Length") or 0)
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="download this instead of the local server's file")
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="local server preset (default fast)")
+    ap.add_argument("--size", type=int, help="local file size in MiB")
+    ap.add_argument("--conn-mbit", type=float, help="local per-connection cap, Mbit/s")
+    ap.add_argument("--piece", type=int, help="local server write size in bytes")
+    ap.add_argument("--ttfb", type=float, default=20, help="local time to first byte, ms (default 20)")
+    ap.add_argument("--conns", type=int, nargs="+", help="connection counts")
+    ap.add_argument("--min-split", type=int, help="min segment size in MiB (aria2's default is 20)")
+    args = ap.parse_args()
+    for k, v in PROFILES[args.profile].items():
+        if getattr(args, k) is None:
+            setattr(args, k, v)
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        raise SystemExit("needs aiohttp (pip install aiohttp)")
+
+    server, want = None, None
+    if args.url:
+        url = args.url
+        size = asyncio.run(_head(url))
+        if not size:
+            raise SystemExit("no Content-Length from the server")
+    else:
+        blob = os.urandom(args.size * MiB)
+        want, size = hashlib.sha256(blob).hexdigest(), len(blob)
+        handler = _handler(blob, args.conn_mbit * 1e6 / 8, args.ttfb / 1000, args.piece)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/model.bin"
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            rd = _import_engine(os.path.join(folder, "state"))
+            iov_max = sys.modules["az_bench.file_io"].IOV_MAX
+            rows = asyncio.run(_bench(rd, url, size, args.conns, args.min_split * MiB, folder, want))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    where = url if args.url else (f"local server ({args.profile}), {args.conn_mbit:g} Mbit/s per connection, "
+                                  f"{args.piece}-byte writes, {args.ttfb:g} ms TTFB")
+    print(f"{size / MiB:.0f} MiB from {where}")
+    print(f"{'engine':14} {'seconds':>8} {'MiB/s':>8} {'vs single':>9} {'bufs':>6}  ok")
+    base = rows[0][1]
+    for name, sec, bufs, err in rows:
+        print(f"{name:14} {sec:8.2f} {size / MiB / sec:8.1f} {base / sec:8.1f}x "
+              f"{'-' if bufs is None else bufs:>6}  {err or 'yes'}")
+    if not shutil.which("aria2c"):
+        print("(aria2c rows skipped: aria2c not on PATH)")
+    if args.profile == "trickle" and not args.url and max(r[2] or 0 for r in rows) <= iov_max:
+        print(f"(no write went past IOV_MAX={iov_max} buffers: the client read faster than pieces arrived)")
+    return 1 if any(r[3] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+How much faster does a compressed upload (/az/upload ... encoding=gzip|zstd)
+get a file onto the server, for a given uplink?
+
+    python bench_upload_encoding.py model.safetensors captions.txt
+    python bench_upload_encoding.py --synthetic
+    python bench_upload_encoding.py lora.safetensors --uplink 10 40 100 --sample 64
+
+For each file, SAMPLE MiB read from several spots are compressed with each
+codec, measuring the ratio and the compress / decompress speeds on this
+machine. The transfer is a pipeline (client compresses, wire, server
+decodes), so its time is set by the slowest stage:
+
+    t_raw = size / uplink
+    t_enc = max(size * ratio / uplink, size / compress_speed, size / decode_speed)
+    gain  = t_raw / t_enc   (effective throughput = gain * uplink)
+
+Browsers compress with CompressionStream("gzip") (zlib's default level), so
+"gzip-6" is what the PathUploader node achieves. zstd rows need zstandard
+(pip install zstandard); it is what scripted clients can send.
+Stdlib only otherwise.
+"""
+
+import os
+import sys
+import time
+import zlib
+import random
+import struct
+import argparse
+
+MiB = 1 << 20
+
+
+def _codecs() -> dict:
+    out = {
+        "gzip-1": (lambda b: _gzip(b, 1), lambda b: zlib.decompress(b, 16 + zlib.MAX_WBITS)),
+        "gzip-6": (lambda b: _gzip(b, 6), lambda b: zlib.decompress(b, 16 + zlib.MAX_WBITS)),
+    }
+    try:
+        import zstandard
+        for level in (1, 3):
+            c = zstandard.ZstdCompressor(level=level)
+            d = zstandard.ZstdDecompressor()
+            out[f"zstd-{level}"] = (c.compress, lambda b, d=d: d.decompressobj().decompress(b))
+    except ImportError:
+        pass
+    return out
+
+def _gzip(data: bytes, level: int) -> bytes:
+    c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return c.compress(data) + c.flush()
+
+def _sample(path: str, size_mib: int, spots: int = 8) -> bytes:
+    """Up to size_mib MiB, read in equal pieces spread over the file."""
+    total = os.path.getsize(path)
+    want = min(total, size_mib * MiB)
+    piece = max(want // spots, 1)
+    parts = []
+    with open(path, "rb") as f:
+        for i in range(spots):
+            f.seek(int((total - piece) * i / max(spots - 1, 1)))
+            parts.append(f.read(piece))
+    return b"".join(parts)
+
+def _synthetic(size_mib: int) -> dict[str, bytes]:
+    """Stand-ins for the usual uploads, when no sample files are at hand."""
+    rnd = random.Random(0)
+    n = size_mib * MiB
+    # fp16 weights: gaussian values around 0, stored as IEEE half
+    vals = [rnd.gauss(0.0, 0.02) for _ in range(n // 2)]
+    fp16 = struct.pack(f"<{len(vals)}e", *vals)
+    # fp16 with padded (zeroed) rows, like aligned / pruned checkpoints
+    row = 4096
+    padded = bytearray(fp16)
+    for off in range(0, len(padded) - row, row * 4):
+        padded[off:off + row] = bytes(row)
+    words = ("a photo of a cat dog woman man portrait landscape detailed lighting "
+             "cinematic 8k sharp focus bokeh trending masterpiece").split()
+    captions = "\n".join(" ".join(rnd.choice(words) for _ in range(rnd.randint(8, 30)))
+                         for _ in range(n // 120)).encode()[:n]
+    return {
+        "fp16 weights": fp16,
+        "fp16 + zero padding": bytes(padded),
+        "caption text": captions,
+        "random (pre-compressed)": rnd.randbytes(n),
+    }
+
+def _timed(fn, data: bytes) -> tuple[bytes, float]:
+    t = time.perf_counter()
+    out = fn(data)
+    return out, max(time.perf_counter() - t, 1e-9)
+
+def _bench(name: str, data: bytes, uplinks: list[float], codecs: dict) -> list[str]:
+    rows = []
+    for codec, (comp, decomp) in codecs.items():
+        packed, tc = _timed(comp, data)
+        back, td = _timed(decomp, packed)
+        if back != data:
+            raise SystemExit(f"{codec}: round trip mismatch on {name}")
+        ratio = len(packed) / max(len(data), 1)
+        cs, ds = len(data) / tc, len(data) / td  # bytes/s
+        gains = []
+        for mbit in uplinks:
+            up = mbit * 1e6 / 8
+            t_raw = 1 / up
+            t_enc = max(ratio / up, 1 / cs, 1 / ds)
+            gains.append(f"{t_raw / t_enc:5.2f}x")
+        rows.append(f"{name[:26]:26} {codec:7} {ratio * 100:6.1f}% {cs / MiB:8.0f} {ds / MiB:8.0f}  " + "  ".join(gains))
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="sample files (model weights, datasets, workflows)")
+    ap.add_argument("--synthetic", action="store_true", help="use generated fp16 / text / random samples")
+    ap.add_argument("--sample", type=int, default=32, help="MiB read per file (default 32)")
+    ap.add_argument("--uplink", type=float, nargs="+", default=[10, 50, 100, 500],
+                    help="uplink speeds in Mbit/s (default 10 50 100 500)")
+    args = ap.parse_args()
+    if not args.files and not args.synthetic:
+        ap.error("give sample files or --synthetic")
+
+    samples = {}
+    for p in args.files:
+        try:
+            samples[os.path.basename(p)] = _sample(p, args.sample)
+        except OSError as e:
+            print(f"{p}: {e}", file=sys.stderr)
+    if args.synthetic:
+        samples.update(_synthetic(args.sample))
+
+    codecs = _codecs()
+    head = "  ".join(f"{u:>5g}M" for u in args.uplink)
+    print(f"{'sample':26} {'codec':7} {'size':>7} {'comp':>8} {'decode':>8}  gain at uplink (Mbit/s)")
+    print(f"{'':26} {'':7} {'':>7} {'MiB/s':>8} {'MiB/s':>8}  {head}")
+    for name, data in samples.items():
+        for row in _bench(name, data, args.uplink, codecs):
+            print(row)
+    if "zstd-1" not in codecs:
+        print("(zstd rows skipped: pip install zstandard)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory index of the folders under the model roots, for the destination
+pickers' search (/az/search).
+- built by a background thread at startup (os.scandir walk, symlinked folders
+  followed once), then kept current incrementally: every REFRESH_INTERVAL
+  seconds each indexed folder is stat'ed and only those whose mtime moved are
+  re-read; folders created by our own routes are added at once via note()
+- fuzzy subsequence matching over "<root name>/<relative path>", ranked by
+  where and how tightly the characters hit (basename, segment starts, runs)
+- COMFY_AZ_SEARCH_ROOTS adds os.pathsep-separated roots to storage.model_roots()
+
+Routes:
+- GET /az/search : ?q=&limit= -> { results: [{name, path, score}], ready, folders }
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import threading
+
+from aiohttp import web
+from server import PromptServer
+
+from .storage import model_roots
+
+REFRESH_INTERVAL = float(os.environ.get("COMFY_AZ_SEARCH_REFRESH", "60"))
+MAX_DIRS = int(os.environ.get("COMFY_AZ_SEARCH_MAX_DIRS", "200000"))
+SEARCH_LIMIT = 50
+_SKIP = {"__pycache__", "node_modules"}
+_BOUNDARY = "/\\_-. "
+
+
+def _roots() -> list[str]:
+    roots = list(model_roots())
+    extra = os.environ.get("COMFY_AZ_SEARCH_ROOTS", "")
+    for p in extra.split(os.pathsep):
+        p = os.path.abspath(os.path.expanduser(p.strip())) if p.strip() else ""
+        if p and os.path.isdir(p) and p not in roots:
+            roots.append(p)
+    return roots
+
+def _score(term: str, text: str, base: int) -> int:
+    """Score of term as a subsequence of text (0 = no match); base = index of the basename."""
+    i = text.find(term)
+    if i >= 0:  # contiguous hit
+        s = 100 + 4 * len(term)
+        if i >= base:
+            s += 60 + (40 if i == base else 0)
+        elif i == 0 or text[i - 1] in _BOUNDARY:
+            s += 30
+        return s
+    # greedy subsequence from each of the first few places the first char occurs
+    best, start = 0, text.find(term[0])
+    for _ in range(8):
+        if start < 0:
+            break
+        s, prev = 0, start - 1
+        for ch in term:
+            j = text.find(ch, prev + 1)
+            if j < 0:
+                return best
+            if j == prev + 1 and j != start:
+                s += 8
+            elif j == 0 or text[j - 1] in _BOUNDARY:
+                s += 6
+            else:
+                s -= min(j - prev - 1, 4)
+            if j >= base:
+                s += 2
+            prev = j
+        best = max(best, s, 1)
+        start = text.find(term[0], start + 1)
+    return best
+
+
+class PathIndex:
+    def __init__(self, roots: list[str] | None = None):
+        self._roots = roots
+        self._dirs: dict[str, int] = {}  # abs folder -> mtime_ns when last read
+        self._lock = threading.Lock()
+        self._snapshot: list[tuple[str, str, str, int]] = []  # (abs, display, lowered, basename offset)
+        self._dirty = True
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---------- building ----------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="az-path-index", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            for root in (self._roots if self._roots is not None else _roots()):
+                self._walk(root)
+        finally:
+            self._ready.set()
+        while True:
+            time.sleep(REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception:
+                pass
+
+    def _walk(self, top: str):
+        """Add top and everything below it."""
+        seen = set()
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            try:
+                st = os.stat(d)
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue  # symlink loop or the same folder linked twice
+            seen.add((st.st_dev, st.st_ino))
+            children = self._read(d, st.st_mtime_ns)
+            if children is None:
+                continue
+            stack.extend(c for c in children if c not in self._dirs)
+
+    def _read(self, d: str, mtime: int) -> list[str] | None:
+        """Record d, return its sub-folders (None if unreadable or over MAX_DIRS)."""
+        try:
+            with os.scandir(d) as it:
+                children = []
+                for e in it:
+                    if e.name.startswith(".") or e.name in _SKIP:
+                        continue
+                    try:
+                        if e.is_dir():
+                            children.append(e.path)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        with self._lock:
+            if d not in self._dirs and len(self._dirs) >= MAX_DIRS:
+                return None
+            self._dirs[d] = mtime
+            self._dirty = True
+        return children
+
+    def _drop(self, d: str):
+        pre = d.rstrip(os.sep) + os.sep
+        with self._lock:
+            for p in [p for p in self._dirs if p == d or p.startswith(pre)]:
+                del self._dirs[p]
+            self._dirty = True
+
+    def refresh(self):
+        """Re-read folders whose mtime changed; pick up new and vanished sub-folders."""
+        with self._lock:
+            items = list(self._dirs.items())
+        for d, mtime in items:
+            try:
+                st = os.stat(d)
+            except OSError:
+                self._drop(d)
+                continue
+            if st.st_mtime_ns == mtime:
+                continue
+            children = self._read(d, st.st_mtime_ns)
+            if children is None:
+                continue
+            pre = d.rstrip(os.sep) + os.sep
+            with self._lock:
+                known = {p for p in self._dirs if p.startswith(pre) and os.sep not in p[len(pre):]}
+            for gone in known - set(children):
+                self._drop(gone)
+            for new in set(children) - known:
+                self._walk(new)
+
+    def note(self, path: str):
+        """A folder was just created (or written to) by one of our routes."""
+        if not self._ready.is_set():
+            return  # the initial walk will get there
+        path = os.path.abspath(path)
+        roots = self._roots if self._roots is not None else _roots()
+        root = next((r for r in roots if path == r or path.startswith(r.rstrip(os.sep) + os.sep)), None)
+        if root is None:
+            return
+        # add the missing chain from the deepest indexed ancestor down
+        chain = []
+        p = path
+        while p not in self._dirs and len(p) >= len(root):
+            chain.append(p)
+            p = os.path.dirname(p)
+        for d in reversed(chain):
+            try:
+                self._read(d, os.stat(d).st_mtime_ns)
+            except OSError:
+                return
+
+    # ---------- search ----------
+    def _entries(self) -> list[tuple[str, str, str, int]]:
+        with self._lock:
+            if not self._dirty:
+                return self._snapshot
+            paths = sorted(self._dirs)
+            self._dirty = False
+        roots = self._roots if self._roots is not None else _roots()
+        parents = sorted((os.path.dirname(r.rstrip(os.sep)) for r in roots), key=len, reverse=True)
+        snap = []
+        for p in paths:
+            parent = next((r for r in parents if p.startswith(r.rstrip(os.sep) + os.sep)), "")
+            disp = (os.path.relpath(p, parent) if parent else p).replace(os.sep, "/")
+            low = disp.lower()
+            snap.append((p, disp, low, low.rfind("/") + 1))
+        self._snapshot = snap
+        return snap
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+        terms = query.lower().replace("\\", "/").split()
+        if not terms:
+            return []
+        scored = []
+        for p, disp, low, base in self._entries():
+            total = 0
+            for t in terms:
+                s = _score(t, low, base)
+                if not s:
+                    break
+                total += s
+            else:
+                scored.append((total, -len(low), disp, p))  # shorter paths win ties
+        best = heapq.nlargest(limit, scored)
+        return [{"name": disp, "path": p, "score": s} for s, _n, disp, p in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ready": self._ready.is_set(), "folders": len(self._dirs)}
+
+
+index = PathIndex()
+index.start()
+
+# ========= routes =========
+@PromptServer.instance.routes.get("/az/search")
+async def az_search(request):
+    q = request.query
+    try:
+        limit = min(max(int(q.get("limit") or SEARCH_LIMIT), 1), 500)
+    except ValueError:
+        return web.json_response({"ok": False, "error": "limit must be an integer"}, status=400)
+    results = await asyncio.to_thread(index.search, q.get("q", ""), limit)
+    return web.json_response({"ok": True, "results": results, **index.stats()})
@@ -1,17 +1,65 @@
 # -*- coding: utf-8 -*-
 """
 Path Uploader (UI-only) for ComfyUI
-- POST /az/upload    : multipart/form-data { file, dest_dir } -> streams to disk
-- GET  /az/listdir   : ?path=... -> lists sub-folders (and files) for dropdown
+- POST /az/upload    : multipart/form-data { dest_dir, file } -> streams to disk
+                       (large reads, a bounded queue and a writer thread; temp
+                       file + atomic rename; sha256 computed on the way)
+                       extract=1: unpack a tar / tar.zst / zip into dest_dir
+                       as it arrives instead (see archive_stream)
+                       encoding=gzip|deflate|zstd (or the file part's own
+                       Content-Encoding): the file is decoded on the way in
+- GET  /az/listdir   : ?path=&prefix=&offset=&limit=&folders_only=&partial=
+                       -> lists sub-folders (and files) for dropdown, served from
+                       the cached scandir listings in dir_listing
+
+Resumable uploads (fixed-size chunks, any order, several at once):
+- POST /az/upload/init     : { dest_dir, filename, size, fingerprint? }
+                             -> { id, chunk_size, chunks, missing, received }
+- GET  /az/upload/offset   : ?id= -> { received, missing }
+- PUT  /az/upload/chunk    : ?id=&index=&encoding= , raw body -> written at index * chunk_size
+                             (encoding as above; chunk_size counts decoded bytes)
+- POST /az/upload/finalize : { id } -> { path, bytes }
+Chunks go into a preallocated <name>.azup next to the target, with the
+received-chunk map in <name>.azup.json; finalize renames it into place. The
+same file (dest, name, size, fingerprint) maps to the same id, so a client
+that lost its connection (or a restarted server) picks up where it stopped.
+Uploads idle for COMFY_AZ_UPLOAD_TTL seconds are closed (map flushed, fd
+released) and forgotten; init reopens them from the part file.
+
+Compressed transfer: the encoding is declared with the `encoding` parameter.
+A request-level Content-Encoding: gzip/deflate header is already decoded by
+aiohttp itself; zstd needs the zstandard package on the server.
 """
 
 import os
 import re
 import sys
-import pathlib
+import json
+import queue
+import asyncio
+import hashlib
+import time
+import tempfile
+import threading
+import zlib
 from aiohttp import web
 from server import PromptServer
 
+from .file_io import allocate, pwrite
+from . import dir_listing
+from .archive_stream import _Extractor
+from .path_index import index as _paths
+
+UPLOAD_CHUNK = int(os.environ.get("COMFY_AZ_UPLOAD_CHUNK", str(16 << 20)))
+PART_EXT = ".azup"
+UPLOAD_TTL = float(os.environ.get("COMFY_AZ_UPLOAD_TTL", "3600"))  # idle seconds before the fd is released
+SIDECAR_INTERVAL = 2.0  # chunk map rewritten at most this often...
+SIDECAR_BYTES = 256 << 20  # ...or after this many new bytes (lost entries are just resent)
+READ_CHUNK = 1 << 20
+STREAM_QUEUE = 16  # READ_CHUNK buffers between the socket and the writer thread
+# "end": fsync before the rename (default) | "off" | <MiB>: also every N MiB written
+UPLOAD_FSYNC = os.environ.get("COMFY_AZ_UPLOAD_FSYNC", "end").strip().lower()
+
 # ---------- helpers ----------
 _SAN = re.compile(r'[\\:*?"<>|\x00-\x1F]')  # leave / and \ alone for paths
 
@@ -32,26 +80,321 @@ def _safe_filename(name: str) -> str:
     base = _SAN.sub("_", base)
     return base or "upload.bin"
 
-def _listdir(path: str):
-    """Return (folders, files) for a directory, sorted."""
-    p = pathlib.Path(_safe_expand(path))
-    if not p.exists():
+def _listdir(abs_root: str, partial: bool = False):
+    """Return (listed dir, cached listing, name prefix) for an absolute path.
+
+    With partial, a path that is not an existing directory is read as
+    "<parent>/<typed prefix>" (what the dropdown sends while the user types).
+    """
+    prefix = ""
+    if partial and not os.path.isdir(abs_root):
+        abs_root, prefix = os.path.dirname(abs_root), os.path.basename(abs_root)
+    if not os.path.exists(abs_root):
         raise FileNotFoundError("Path does not exist")
-    if not p.is_dir():
+    if not os.path.isdir(abs_root):
         raise NotADirectoryError("Not a directory")
-    folders, files = [], []
-    for entry in p.iterdir():
+    return abs_root, dir_listing.cache.get(abs_root), prefix
+
+def _prepare_dest(dest_dir: str | None) -> tuple[str, web.Response | None]:
+    """(absolute dest, None) or (_, error response)."""
+    if not dest_dir or not dest_dir.strip():
+        return "", web.json_response({"ok": False, "error": "Destination folder is empty. Please enter a folder."}, status=400)
+
+    abs_dest = _safe_expand(dest_dir)
+    try:
+        os.makedirs(abs_dest, exist_ok=True)
+    except Exception as e:
+        return abs_dest, web.json_response({"ok": False, "error": f"Cannot create destination: {e}"}, status=400)
+
+    if not os.path.isdir(abs_dest):
+        return abs_dest, web.json_response({"ok": False, "error": f"Not a directory: {abs_dest}"}, status=400)
+    if not os.access(abs_dest, os.W_OK):
+        return abs_dest, web.json_response({"ok": False, "error": f"Destination not writable: {abs_dest}"}, status=400)
+    _paths.note(abs_dest)
+    return abs_dest, None
+
+# ---------- transfer encoding ----------
+DECODE_STEP = 1 << 20  # decoded bytes per step, so a compression bomb never lands in memory at once
+ZSTD_STEP = 1 << 10    # zstd has no output cap per call: small input slices bound it (~32 MiB worst case)
+
+class _Decoder:
+    """Incremental decoding of a gzip / deflate / zstd encoded body ("" = as is)."""
+
+    def __init__(self, encoding: str | None):
+        enc = (encoding or "").strip().lower()
+        self.encoding = "" if enc == "identity" else enc
+        self.wire = 0  # encoded bytes received
+        self._wbits = 16 + zlib.MAX_WBITS if enc in ("gzip", "x-gzip") else zlib.MAX_WBITS
+        self._zstd = None
+        if not self.encoding:
+            self._d = None
+        elif enc in ("gzip", "x-gzip", "deflate"):
+            self._d = zlib.decompressobj(self._wbits)
+        elif enc == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("zstd uploads need zstandard on the server (pip install zstandard).")
+            self._zstd = zstandard.ZstdDecompressor()
+            self._d = self._zstd.decompressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding} (use gzip, deflate or zstd).")
+
+    def _next(self):
+        """Concatenated members / frames: a fresh decompressor for the next one."""
+        return self._zstd.decompressobj() if self._zstd else zlib.decompressobj(self._wbits)
+
+    def feed(self, data: bytes):
+        """Yield the decoded pieces of one received chunk."""
+        self.wire += len(data)
+        if self._d is None:
+            yield data
+            return
+        while data:
+            d = self._d
+            try:
+                if self._zstd:
+                    piece, data = data[:ZSTD_STEP], data[ZSTD_STEP:]
+                    out = d.decompress(piece)
+                    rest = getattr(d, "unused_data", b"") if getattr(d, "eof", False) else b""
+                else:
+                    out = d.decompress(data, DECODE_STEP)
+                    rest = d.unused_data if d.eof else b""
+                    data = b"" if d.eof else d.unconsumed_tail
+            except Exception as e:  # zlib.error / zstandard.ZstdError
+                raise ValueError(f"cannot decode {self.encoding} body: {e}")
+            if out:
+                yield out
+            if rest:
+                self._d = self._next()
+                data = rest + data
+
+    def end(self):
+        if self._d is not None and not getattr(self._d, "eof", True):
+            raise ValueError(f"{self.encoding} body ended mid-stream.")
+
+# ---------- streaming writer ----------
+def _fsync_every(policy: str) -> int:
+    try:
+        return max(int(policy), 1) << 20
+    except ValueError:
+        return 0
+
+class _StreamWriter:
+    """
+    Writes chunks handed over by the event loop on its own thread: into a
+    hidden temp file next to the target, hashing as it goes. At most
+    STREAM_QUEUE chunks wait in memory; put() waits for room.
+    """
+
+    def __init__(self, path: str, fsync: str = UPLOAD_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        self.every = _fsync_every(fsync)
+        self.bytes = 0
+        self.error: Exception | None = None
+        self._q: queue.Queue = queue.Queue()
+        self._slots = asyncio.Semaphore(STREAM_QUEUE)
+        self._loop = asyncio.get_running_loop()
+        self._done = self._loop.create_future()
+        fd, self.tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        prefix=f".{os.path.basename(path)}.", suffix=".part")
+        self._f = os.fdopen(fd, "wb", buffering=0)
+        self._sha = hashlib.sha256()
+        threading.Thread(target=self._run, name="az-upload", daemon=True).start()
+
+    async def put(self, chunk: bytes):
+        if self.error is not None:
+            raise self.error
+        await self._slots.acquire()
+        self._q.put(chunk)
+
+    async def close(self, ok: bool = True) -> str:
+        """ok: finish and rename into place, returns the sha256; else discard the temp file."""
+        self._q.put(None if ok else False)
+        await asyncio.shield(self._done)
+        if ok and self.error is not None:
+            raise self.error
+        return self._sha.hexdigest()
+
+    def _release(self):
+        self._loop.call_soon_threadsafe(self._slots.release)
+
+    def _run(self):
+        synced = 0
+        keep = False
+        try:
+            while True:
+                chunk = self._q.get()
+                if chunk is None or chunk is False:
+                    keep = chunk is None and self.error is None
+                    break
+                try:
+                    if self.error is None:
+                        self._f.write(chunk)
+                        self._sha.update(chunk)
+                        self.bytes += len(chunk)
+                        if self.every and self.bytes - synced >= self.every:
+                            getattr(os, "fdatasync", os.fsync)(self._f.fileno())
+                            synced = self.bytes
+                except OSError as e:
+                    self.error = e  # keep draining so put() never blocks forever
+                finally:
+                    self._release()
+            if keep:
+                if self.fsync != "off":
+                    os.fsync(self._f.fileno())
+                self._f.close()
+                os.replace(self.tmp, self.path)
+        except OSError as e:
+            self.error = e
+            keep = False
+        finally:
+            if not self._f.closed:
+                self._f.close()
+            if not keep:
+                try:
+                    os.remove(self.tmp)
+                except OSError:
+                    pass
+            self._loop.call_soon_threadsafe(self._done.set_result, None)
+
+# ---------- resumable uploads ----------
+class _Upload:
+    """One file being assembled from chunks into <path>.azup."""
+
+    def __init__(self, uid: str, path: str, size: int, chunk: int):
+        self.id = uid
+        self.path = path
+        self.part = path + PART_EXT
+        self.size = size
+        self.chunk = chunk
+        self.chunks = -(-size // chunk)
+        self.done = bytearray(self.chunks)  # 1 per received chunk
+        self._fd: int | None = None
+        self._lock = threading.Lock()
+        self._unsaved = 0  # bytes recorded in done but not yet in the sidecar
+        self._saved_at = 0.0
+        self.ready: asyncio.Future | None = None  # open() running / done
+        self.busy = 0  # chunk writes in flight (event loop side)
+        self.touched = time.monotonic()
+
+    @property
+    def _sidecar(self) -> str:
+        return self.part + ".json"
+
+    def open(self):
+        """Reuse a matching part file + chunk map, else preallocate a fresh one."""
+        try:
+            with open(self._sidecar, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if (state.get("id") == self.id and state.get("chunk") == self.chunk
+                    and os.path.getsize(self.part) == self.size):
+                self.done = bytearray(1 if c == "1" else 0 for c in state.get("done", ""))[:self.chunks]
+                self.done.extend(bytes(self.chunks - len(self.done)))
+        except (OSError, ValueError):
+            pass
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.part, flags, 0o644)
+        if not any(self.done):
+            os.ftruncate(self._fd, 0)  # leftover from another attempt: start clean
+            allocate(self._fd, self.size)
+        self._save()
+
+    def _save(self):
+        state = {"version": 1, "id": self.id, "size": self.size, "chunk": self.chunk,
+                 "done": "".join("1" if d else "0" for d in self.done)}
+        tmp = self._sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._sidecar)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def chunk_len(self, index: int) -> int:
+        return min(self.chunk, self.size - index * self.chunk)
+
+    def write(self, index: int, chunks: list[bytes]):
+        pwrite(self._fd, chunks, index * self.chunk)  # per-fd locked where there is no pwrite
+        with self._lock:
+            self.done[index] = 1
+            self._unsaved += self.chunk_len(index)
+            if self._unsaved >= SIDECAR_BYTES or time.monotonic() - self._saved_at >= SIDECAR_INTERVAL:
+                self._save()
+
+    def missing(self) -> list[int]:
+        return [i for i, d in enumerate(self.done) if not d]
+
+    def received(self) -> int:
+        return sum(self.chunk_len(i) for i, d in enumerate(self.done) if d)
+
+    def close(self):
+        """Flush the chunk map and release the fd (idle or abandoned upload)."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def finish(self):
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._fd = None
+        os.replace(self.part, self.path)
         try:
-            if entry.is_dir():
-                folders.append(entry.name)
-            else:
-                files.append(entry.name)
-        except PermissionError:
-            # skip entries we cannot stat
-            continue
-    folders.sort()
-    files.sort()
-    return folders, files
+            os.remove(self._sidecar)
+        except OSError:
+            pass
+
+    def info(self) -> dict:
+        missing = self.missing()
+        return {"ok": True, "id": self.id, "path": self.path, "size": self.size,
+                "chunk_size": self.chunk, "chunks": self.chunks, "missing": missing,
+                "received": self.received()}
+
+
+_uploads: dict[str, _Upload] = {}
+_sweeper: asyncio.Task | None = None
+
+async def _sweep():
+    """Close and forget uploads nobody touched for UPLOAD_TTL seconds."""
+    global _sweeper
+    try:
+        while _uploads:
+            await asyncio.sleep(min(max(UPLOAD_TTL / 4, 1.0), 300.0))
+            now = time.monotonic()
+            for uid, up in list(_uploads.items()):
+                if up.busy or not up.ready or not up.ready.done() or now - up.touched < UPLOAD_TTL:
+                    continue
+                _uploads.pop(uid, None)
+                try:
+                    await asyncio.to_thread(up.close)
+                except OSError:
+                    pass
+    finally:
+        _sweeper = None
+
+def _watch_idle():
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = asyncio.ensure_future(_sweep())
+
+def _upload_id(path: str, size: int, fingerprint: str) -> str:
+    return hashlib.sha1(f"{path}\0{size}\0{fingerprint}".encode("utf-8")).hexdigest()[:24]
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return {}
+
+def _lookup(uid: str) -> tuple[_Upload | None, web.Response | None]:
+    up = _uploads.get(uid or "")
+    if up is None:
+        return None, web.json_response({"ok": False, "error": "Unknown upload id; call init again."}, status=404)
+    up.touched = time.monotonic()
+    return up, None
 
 # ---------- routes ----------
 @PromptServer.instance.routes.get("/az/listdir")
@@ -59,17 +402,32 @@ async def az_listdir(request: web.Request):
     """
     Query:
       ?path=<path>
+      &prefix=<name prefix, case-insensitive>
+      &offset=<n>&limit=<n>   (applied to folders and files separately)
+      &folders_only=1         (files: [] and total_files: 0)
+      &partial=1              (path may end in a partially typed name)
     Returns:
       { ok: true, root: "<abs>", sep: "\\ or /",
         folders: [ {name, path}, ... ],
-        files:   [ {name, path}, ... ] }
+        files:   [ {name, path}, ... ],
+        total_folders, total_files, truncated }
       or { ok: false, error: "..." }
     """
-    qpath = request.query.get("path", "") or ""
+    q = request.query
+    qpath = q.get("path", "") or ""
     try:
-        abs_root = _safe_expand(qpath)
+        offset = max(int(q.get("offset") or 0), 0)
+        limit = max(int(q["limit"]), 0) if q.get("limit") else None
+        folders_only = q.get("folders_only", "") in ("1", "true", "yes")
+        abs_root, listing, prefix = await asyncio.to_thread(
+            _listdir, _safe_expand(qpath), q.get("partial", "") in ("1", "true", "yes"))
+        prefix = q.get("prefix") or prefix
         sep = os.sep
-        folders, files = _listdir(abs_root)
+        folders, total_folders = dir_listing.page(listing.folders, listing.fkeys, prefix, offset, limit)
+        if folders_only:
+            files, total_files = [], 0
+        else:
+            files, total_files = dir_listing.page(listing.files, listing.gkeys, prefix, offset, limit)
 
         def make_entries(names):
             out = []
@@ -83,6 +441,9 @@ async def az_listdir(request: web.Request):
             "sep": sep,
             "folders": make_entries(folders),
             "files": make_entries(files),
+            "total_folders": total_folders,
+            "total_files": total_files,
+            "truncated": offset + len(folders) < total_folders or offset + len(files) < total_files,
         })
     except Exception as e:
         return web.json_response({
@@ -97,61 +458,205 @@ async def az_listdir(request: web.Request):
 async def az_upload(request: web.Request):
     """
     multipart/form-data:
+      - dest_dir: string (required; before file, or as ?dest_dir=)
+      - extract: "1" to unpack the archive into dest_dir (optional; or ?extract=1)
+      - id: echoed in az.extract.progress events (optional; or ?id=)
+      - encoding: gzip | deflate | zstd if the file is sent compressed (optional;
+        or ?encoding=, or a Content-Encoding header on the file part)
       - file: binary (required)
-      - dest_dir: string (required)
+    The file is streamed while it arrives, so the other fields must come first.
     """
     reader = await request.multipart()
     file_field = None
-    dest_dir = None
+    dest_dir = request.query.get("dest_dir")
+    extract = request.query.get("extract", "")
+    uid = request.query.get("id", "")
+    encoding = request.query.get("encoding", "")
 
     while True:
         field = await reader.next()
         if field is None:
             break
-        if field.name == "file":
-            file_field = field
-        elif field.name == "dest_dir":
+        if field.name == "dest_dir":
             # small text part
-            dest_dir_text = await field.text()
-            dest_dir = dest_dir_text
+            dest_dir = await field.text()
+        elif field.name == "extract":
+            extract = await field.text()
+        elif field.name == "id":
+            uid = await field.text()
+        elif field.name == "encoding":
+            encoding = await field.text()
+        elif field.name == "file":
+            file_field = field
+            break  # stream it now; reading on would discard it
 
     if not file_field:
         return web.json_response({"ok": False, "error": "No file selected. Please choose a file."}, status=400)
 
-    if not dest_dir or not dest_dir.strip():
-        return web.json_response({"ok": False, "error": "Destination folder is empty. Please enter a folder."}, status=400)
+    abs_dest, err = _prepare_dest(dest_dir)
+    if err is not None:
+        return err
 
-    abs_dest = _safe_expand(dest_dir)
     try:
-        os.makedirs(abs_dest, exist_ok=True)
-    except Exception as e:
-        return web.json_response({"ok": False, "error": f"Cannot create destination: {e}"}, status=400)
-
-    if not os.path.isdir(abs_dest):
-        return web.json_response({"ok": False, "error": f"Not a directory: {abs_dest}"}, status=400)
-    if not os.access(abs_dest, os.W_OK):
-        return web.json_response({"ok": False, "error": f"Destination not writable: {abs_dest}"}, status=400)
+        dec = _Decoder(encoding or file_field.headers.get("Content-Encoding"))
+    except ValueError as e:
+        return web.json_response({"ok": False, "error": str(e)}, status=415)
 
     filename = _safe_filename(file_field.filename or "upload.bin")
     save_path = os.path.join(abs_dest, filename)
 
-    total = 0
+    extract = extract.strip().lower() in ("1", "true", "yes")
     try:
-        with open(save_path, "wb") as f:
-            while True:
-                chunk = await file_field.read_chunk()  # default 8192
-                if not chunk:
-                    break
-                f.write(chunk)
-                total += len(chunk)
+        w = _Extractor(abs_dest, filename, uid, UPLOAD_FSYNC) if extract else _StreamWriter(save_path)
+    except OSError as e:
+        return web.json_response({"ok": False, "error": f"Write failed: {e}"}, status=500)
+    try:
+        while True:
+            chunk = await file_field.read_chunk(READ_CHUNK)
+            if not chunk:
+                break
+            for piece in dec.feed(chunk):
+                await w.put(piece)
+        dec.end()
     except Exception as e:
+        bad_archive = extract and w.error is not None  # vs. a broken upload
+        await w.close(ok=False)
+        if isinstance(e, ValueError) and not bad_archive:  # from the decoder
+            return web.json_response({"ok": False, "error": f"Upload failed: {e}"}, status=400)
+        if bad_archive:
+            return web.json_response({"ok": False, "error": f"Extract failed: {w.error}",
+                                      "files": w.files, "skipped": w.skipped}, status=400)
+        return web.json_response({"ok": False, "error": f"Upload failed: {e}"}, status=500)
+    try:
+        sha256 = await w.close()
+    except Exception as e:
+        if extract:
+            return web.json_response({"ok": False, "error": f"Extract failed: {e}",
+                                      "files": w.files, "skipped": w.skipped}, status=400)
         return web.json_response({"ok": False, "error": f"Write failed: {e}"}, status=500)
 
+    wire = {"encoding": dec.encoding, "wire_bytes": dec.wire} if dec.encoding else {}
+    if extract:
+        return web.json_response({
+            "ok": True,
+            "filename": filename,
+            "path": abs_dest,
+            "bytes": w.bytes,
+            "sha256": sha256,
+            "written": w.total,
+            "files": w.files,
+            "skipped": w.skipped,
+            **wire,
+        })
     return web.json_response({
         "ok": True,
         "filename": filename,
         "path": os.path.abspath(save_path),
-        "bytes": total,
+        "bytes": w.bytes,
+        "sha256": sha256,
+        **wire,
+    })
+
+@PromptServer.instance.routes.post("/az/upload/init")
+async def az_upload_init(request: web.Request):
+    body = await _json_body(request)
+    try:
+        size = int(body.get("size"))
+        if size < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return web.json_response({"ok": False, "error": "size must be a non-negative integer."}, status=400)
+    abs_dest, err = _prepare_dest(body.get("dest_dir"))
+    if err is not None:
+        return err
+
+    path = os.path.join(abs_dest, _safe_filename(body.get("filename") or "upload.bin"))
+    uid = _upload_id(path, size, str(body.get("fingerprint") or ""))
+    up = _uploads.get(uid)
+    if up is None:
+        up = _uploads[uid] = _Upload(uid, path, size, UPLOAD_CHUNK)
+        up.ready = asyncio.ensure_future(asyncio.to_thread(up.open))
+        _watch_idle()
+    up.touched = time.monotonic()
+    try:
+        await asyncio.shield(up.ready)
+    except OSError as e:
+        _uploads.pop(uid, None)
+        return web.json_response({"ok": False, "error": f"Cannot create upload file: {e}"}, status=500)
+    return web.json_response(up.info())
+
+@PromptServer.instance.routes.get("/az/upload/offset")
+async def az_upload_offset(request: web.Request):
+    up, err = _lookup(request.query.get("id", ""))
+    if err is not None:
+        return err
+    return web.json_response(up.info())
+
+@PromptServer.instance.routes.put("/az/upload/chunk")
+async def az_upload_chunk(request: web.Request):
+    up, err = _lookup(request.query.get("id", ""))
+    if err is not None:
+        return err
+    try:
+        index = int(request.query.get("index", ""))
+        if not 0 <= index < up.chunks:
+            raise ValueError
+    except ValueError:
+        return web.json_response({"ok": False, "error": f"index must be 0..{up.chunks - 1}."}, status=400)
+
+    try:
+        dec = _Decoder(request.query.get("encoding"))
+    except ValueError as e:
+        return web.json_response({"ok": False, "error": str(e)}, status=415)
+
+    expected = up.chunk_len(index)
+    chunks, n = [], 0
+    try:
+        async for data in request.content.iter_chunked(READ_CHUNK):
+            for piece in dec.feed(data):
+                n += len(piece)
+                if n > expected:
+                    return web.json_response({"ok": False, "error": f"Chunk {index} is larger than {expected} bytes."}, status=400)
+                chunks.append(piece)
+        if n == expected:
+            dec.end()
+    except ValueError as e:
+        return web.json_response({"ok": False, "error": f"Chunk {index}: {e}"}, status=400)
+    if n != expected:
+        # connection dropped mid-chunk: nothing recorded, the client resends it
+        return web.json_response({"ok": False, "error": f"Chunk {index}: got {n} of {expected} bytes."}, status=400)
+    if _uploads.get(up.id) is not up:  # closed as idle while this chunk was arriving
+        return web.json_response({"ok": False, "error": "Upload expired; call init again."}, status=404)
+    up.busy += 1
+    try:
+        await asyncio.to_thread(up.write, index, chunks)
+    except OSError as e:
+        return web.json_response({"ok": False, "error": f"Write failed: {e}"}, status=500)
+    finally:
+        up.busy -= 1
+        up.touched = time.monotonic()
+    return web.json_response({"ok": True, "index": index})
+
+@PromptServer.instance.routes.post("/az/upload/finalize")
+async def az_upload_finalize(request: web.Request):
+    body = await _json_body(request)
+    up, err = _lookup(body.get("id") or "")
+    if err is not None:
+        return err
+    missing = up.missing()
+    if missing:
+        return web.json_response({"ok": False, "error": f"{len(missing)} chunks missing.", "missing": missing},
+                                 status=409)
+    _uploads.pop(up.id, None)
+    try:
+        await asyncio.to_thread(up.finish)
+    except OSError as e:
+        return web.json_response({"ok": False, "error": f"Finalize failed: {e}"}, status=500)
+    return web.json_response({
+        "ok": True,
+        "filename": os.path.basename(up.path),
+        "path": up.path,
+        "bytes": up.size,
     })
 
 # ---------- node stub ----------
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Shared progress model + push-based progress events for the downloader nodes.
+- aria2: subscribes to aria2's websocket notifications and samples tellActive
+  on ONE shared timer, however many nodes / browser tabs are watching; the
+  websocket reconnects with exponential backoff and gives up while the daemon
+  is absent (not installed, or not up after LISTEN_GIVE_UP tries) until
+  start_aria2_download brings it up again (wake())
+- events are pushed to every client via PromptServer.instance.send_sync
+    az.aria2.progress : { items: [ {gid, status, percent, ...}, ... ] }
+    az.hf.progress    : { gid, state, msg, filepath, percent, downloadSpeed, eta, ... }
+    az.extract.progress : { id, archive, state, member, files, written, ... }
+                          (sent by archive_stream while an upload is unpacked)
+"""
+
+import os
+import shutil
+import asyncio
+
+import aiohttp
+from server import PromptServer
+
+from .aria2_client import client as _aria2
+
+ARIA2_EVENT = "az.aria2.progress"
+HF_EVENT = "az.hf.progress"
+SAMPLE_INTERVAL = float(os.environ.get("COMFY_AZ_PROGRESS_INTERVAL", "1.0"))
+
+STATUS_KEYS = [
+    "gid", "status", "totalLength", "completedLength", "downloadSpeed",
+    "errorMessage", "files", "dir",
+]
+FINAL_STATES = ("complete", "error", "removed")
+LISTEN_GIVE_UP = 6  # failed websocket connects in a row (~1 min of backoff) -> daemon presumed absent
+
+# ========= progress model =========
+def _eta(total_len, done_len, speed):
+    try:
+        total = int(total_len); done = int(done_len); spd = max(int(speed), 1)
+        remain = max(total - done, 0)
+        return remain // spd
+    except Exception:
+        return None
+
+def progress_fields(status: str, total: int, done: int, speed: int) -> dict:
+    """The progress model shared by every engine (aria2, built-in, HF)."""
+    percent = (done / total * 100.0) if total > 0 else (100.0 if status == "complete" else 0.0)
+    return {
+        "status": status,
+        "percent": round(percent, 2),
+        "completedLength": done,
+        "totalLength": total,
+        "downloadSpeed": speed,
+        "eta": _eta(total, done, speed),
+    }
+
+def normalize_aria2_status(st: dict) -> dict:
+    """aria2 tellStatus dict -> the fields the UI nodes render."""
+    status = st.get("status", "unknown")
+    total = int(st.get("totalLength", "0") or "0")
+    done = int(st.get("completedLength", "0") or "0")
+    speed = int(st.get("downloadSpeed", "0") or "0")
+
+    filepath = ""
+    filename = ""
+    try:
+        files = st.get("files") or []
+        if files:
+            fp = files[0].get("path") or ""
+            if fp:
+                filepath = fp
+                filename = os.path.basename(fp)
+        if not filepath and st.get("dir") and filename:
+            filepath = os.path.join(st["dir"], filename)
+    except Exception:
+        pass
+
+    out = progress_fields(status, total, done, speed)
+    out["filename"] = filename
+    out["filepath"] = filepath
+    if status == "error":
+        out["error"] = st.get("errorMessage", "unknown error")
+    return out
+
+# ========= emit =========
+def emit(event: str, data: dict):
+    """Broadcast to all connected clients; safe to call from worker threads."""
+    try:
+        PromptServer.instance.send_sync(event, data)
+    except Exception:
+        pass
+
+def emit_hf(gid: str, info: dict):
+    data = {k: v for k, v in info.items() if k != "cancel" and not k.startswith("_")}
+    data["gid"] = gid
+    emit(HF_EVENT, data)
+
+# ========= aria2 broadcaster =========
+def _ws_url(rpc_url: str) -> str:
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+class Aria2ProgressBroadcaster:
+    """
+    Tracks gids started through our routes (or announced by aria2) and pushes
+    normalized status for all of them per tick: one tellActive, plus one
+    multicall for tracked gids that are no longer active.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._tracked: set[str] = set()
+        self._sampler: asyncio.Task | None = None
+        self._listener: asyncio.Task | None = None
+        self._absent = False  # no aria2 daemon to listen to; wake() clears it
+        self._hooks = []
+        self._sources = []
+
+    # ---------- public ----------
+    def add_listener(self, fn):
+        """fn(item) sees (and may amend) every normalized item before it is pushed."""
+        self._hooks.append(fn)
+
+    def add_source(self, fn):
+        """fn(gid) -> tellStatus-shaped dict or None, for gids served by another engine."""
+        self._sources.append(fn)
+
+    def _local_status(self, gid: str) -> dict | None:
+        for fn in self._sources:
+            st = fn(gid)
+            if st is not None:
+                return st
+        return None
+
+    def annotate(self, item: dict) -> dict:
+        for fn in self._hooks:
+            try:
+                fn(item)
+            except Exception:
+                pass
+        return item
+
+    def track(self, gid: str):
+        if not gid:
+            return
+        self._tracked.add(gid)
+        self._ensure_tasks()
+
+    def untrack(self, gid: str):
+        self._tracked.discard(gid)
+
+    def wake(self):
+        """The aria2 daemon is (back) up: resume the websocket listener."""
+        self._absent = False
+        self._ensure_tasks()
+
+    # ---------- tasks ----------
+    def _ensure_tasks(self):
+        loop = asyncio.get_running_loop()
+        if not self._absent and (self._listener is None or self._listener.done()):
+            self._listener = loop.create_task(self._listen_loop())
+        if self._sampler is None or self._sampler.done():
+            self._sampler = loop.create_task(self._sample_loop())
+
+    async def _sample_loop(self):
+        while True:
+            if not self._tracked:
+                self._sampler = None
+                return
+            try:
+                await self.sample_once()
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+
+    async def sample_once(self):
+        seen = {}
+        for gid in list(self._tracked):
+            st = self._local_status(gid)
+            if st is not None:
+                seen[gid] = st
+        if len(seen) < len(self._tracked):
+            for st in await _aria2.call("tellActive", [STATUS_KEYS]) or []:
+                seen[st.get("gid")] = st
+
+        items = []
+        missing = [g for g in self._tracked if g not in seen]
+        if missing:
+            results = await _aria2.multicall([("tellStatus", [g, STATUS_KEYS]) for g in missing])
+            for gid, st in zip(missing, results):
+                if isinstance(st, Exception):
+                    # aria2 forgot the gid (purged / daemon restarted)
+                    items.append(self.annotate({"gid": gid, "status": "error", "error": str(st),
+                                                "lost": True}))
+                    self._tracked.discard(gid)
+                else:
+                    seen[gid] = st
+
+        for gid in list(self._tracked):
+            st = seen.get(gid)
+            if not st:
+                continue
+            item = normalize_aria2_status(st)
+            item["gid"] = gid
+            items.append(self.annotate(item))
+            if item["status"] in FINAL_STATES:
+                self._tracked.discard(gid)
+
+        if items:
+            emit(ARIA2_EVENT, {"items": items})
+
+    async def _push_final(self, gid: str):
+        try:
+            st = await _aria2.call("tellStatus", [gid, STATUS_KEYS])
+        except Exception as e:
+            item = {"gid": gid, "status": "error", "error": str(e)}
+        else:
+            item = normalize_aria2_status(st)
+            item["gid"] = gid
+        self.annotate(item)
+        if item["status"] in FINAL_STATES:
+            self._tracked.discard(gid)
+        else:
+            self.track(gid)  # e.g. still verifying
+        emit(ARIA2_EVENT, {"items": [item]})
+
+    async def _listen_loop(self):
+        """aria2 websocket notifications: start -> track, stop/complete/error -> final push."""
+        url = _ws_url(_aria2.url)
+        backoff, failures = 1.0, 0
+        while True:
+            try:
+                async with _aria2.session().ws_connect(url, heartbeat=30) as ws:
+                    backoff, failures = 1.0, 0
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        data = msg.json()
+                        method = data.get("method") or ""
+                        for p in data.get("params") or []:
+                            gid = (p or {}).get("gid")
+                            if not gid:
+                                continue
+                            if method == "aria2.onDownloadStart":
+                                self.track(gid)
+                            elif method in ("aria2.onDownloadComplete", "aria2.onDownloadError",
+                                            "aria2.onDownloadStop", "aria2.onBtDownloadComplete"):
+                                await self._push_final(gid)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            failures += 1
+            if failures >= LISTEN_GIVE_UP or not shutil.which("aria2c"):
+                self._absent = True
+                self._listener = None
+                return
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+broadcaster = Aria2ProgressBroadcaster()
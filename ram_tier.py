@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Host-memory (RAM) tier for models evicted from VRAM.
+- off unless COMFY_AZ_RAM_TIER_GB > 0: the page-locked (pinned) memory budget
+- when the PurgeVRAM nodes evict a model, its weights are copied into pinned
+  CPU tensors and the model is pointed at them: still in RAM, nothing is
+  re-read from disk, and the way back to the GPU is a DMA instead of a staged
+  pageable copy
+- an Override*Device node sending a held model back to a GPU restores it from
+  the tier; one forcing a model onto the CPU (to compute there) takes it out:
+  it is never pinned, so it uses no budget and never enters the LRU
+- the next load copies every tensor back with non_blocking copies queued on
+  one dedicated CUDA stream per device, then syncs once
+- LRU under the budget: the models stashed longest ago are demoted back to
+  ordinary (pageable) CPU tensors to make room
+- without CUDA there is nothing to pin: the tier stays empty and moves are
+  plain .to() calls
+
+Plain torch only (no ComfyUI imports), so other/bench_ram_tier.py can use it.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+
+GB = 1024 ** 3
+BUDGET = int(float(os.environ.get("COMFY_AZ_RAM_TIER_GB", "0") or 0) * GB)
+
+
+def _slots(module: torch.nn.Module):
+    """(owner, attr, full name, tensor) for every parameter and buffer."""
+    for prefix, mod in module.named_modules():
+        for attr, t in list(mod._parameters.items()):
+            if t is not None:
+                yield mod, attr, f"{prefix}.{attr}" if prefix else attr, t
+        for attr, t in list(mod._buffers.items()):
+            if t is not None:
+                yield mod, attr, f"{prefix}.{attr}" if prefix else attr, t
+
+def _assign(mod: torch.nn.Module, attr: str, t: torch.Tensor):
+    p = mod._parameters.get(attr)
+    if p is not None:
+        p.data = t  # keep the Parameter object: optimizers / patchers hold it
+    else:
+        mod._buffers[attr] = t
+
+def _nbytes(t: torch.Tensor) -> int:
+    return t.numel() * t.element_size()
+
+
+class _Entry:
+    __slots__ = ("ref", "bytes")
+
+    def __init__(self, module: torch.nn.Module, nbytes: int):
+        self.ref = weakref.ref(module)
+        self.bytes = nbytes
+
+
+class RamTier:
+    def __init__(self, budget: int = BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()  # id(module), oldest first
+        self._streams: dict = {}
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0 and torch.cuda.is_available()
+
+    def holds(self, module) -> bool:
+        return module is not None and id(module) in self._entries
+
+    def _stream(self, device: torch.device):
+        key = device.index if device.index is not None else torch.cuda.current_device()
+        s = self._streams.get(key)
+        if s is None:
+            s = self._streams[key] = torch.cuda.Stream(device=key)
+        return s
+
+    # ---------- in ----------
+    def stash(self, module: torch.nn.Module) -> int:
+        """Pin a CPU-resident (just evicted) module's weights; bytes pinned, 0 if not taken."""
+        if not self.enabled or module is None:
+            return 0
+        with self._lock:
+            every = list(_slots(module))
+            slots = [s for s in every if s[3].device.type == "cpu" and not s[3].is_pinned()]
+            e = self._entries.get(id(module))
+            if e is not None:
+                if all(s[3].device.type == "cpu" and s[3].is_pinned() for s in every):  # still parked as we left it
+                    self._entries.move_to_end(id(module))
+                    return e.bytes
+                # loaded and offloaded again behind our back: re-pin, re-count
+                del self._entries[id(module)]
+                self.used -= e.bytes
+            size = sum(_nbytes(t) for t in {t.data_ptr(): t for *_x, t in slots}.values())
+            if not size or size > self.budget:
+                return 0
+            self._make_room(size)
+            pinned: dict[int, torch.Tensor] = {}  # data_ptr -> copy (tied weights stay tied)
+            for mod, attr, _name, t in slots:
+                p = pinned.get(t.data_ptr())
+                if p is None:
+                    p = pinned[t.data_ptr()] = torch.empty(t.shape, dtype=t.dtype, pin_memory=True).copy_(t)
+                _assign(mod, attr, p)
+            if e is None:
+                weakref.finalize(module, self._forget, id(module))
+            self._entries[id(module)] = _Entry(module, size)
+            self.used += size
+            return size
+
+    def _forget(self, key: int):
+        with self._lock:
+            e = self._entries.pop(key, None)
+            if e is not None:
+                self.used -= e.bytes
+
+    def _make_room(self, size: int):
+        while self._entries and self.used + size > self.budget:
+            key, e = self._entries.popitem(last=False)
+            self.used -= e.bytes
+            module = e.ref()
+            if module is not None:
+                self._demote(module)
+
+    @staticmethod
+    def _demote(module: torch.nn.Module):
+        """Pinned -> pageable CPU tensors (frees the pinned memory, keeps the weights)."""
+        plain: dict[int, torch.Tensor] = {}
+        for mod, attr, _name, t in _slots(module):
+            if t.device.type == "cpu" and t.is_pinned():
+                q = plain.get(t.data_ptr())
+                if q is None:
+                    q = plain[t.data_ptr()] = torch.empty(t.shape, dtype=t.dtype).copy_(t)
+                _assign(mod, attr, q)
+
+    def held(self, module) -> int:
+        """Bytes parked for this module (0 if not held)."""
+        e = self._entries.get(id(module)) if module is not None else None
+        return e.bytes if e is not None else 0
+
+    def drop(self, module):
+        """Forget a module ComfyUI (re)loaded itself; whatever is still pinned goes back to pageable."""
+        with self._lock:
+            e = self._entries.pop(id(module), None)
+            if e is None:
+                return
+            self.used -= e.bytes
+        self._demote(module)
+
+    # ---------- out ----------
+    def restore(self, module: torch.nn.Module, device, skip=()) -> int:
+        """
+        Copy a stashed module back to `device` (non_blocking, on the tier's
+        stream; the current stream waits for it). Tensors named in `skip`
+        stay pinned on the CPU for the caller to move. Returns bytes copied.
+        """
+        device = torch.device(device)
+        with self._lock:
+            e = self._entries.pop(id(module), None)
+            if e is None:
+                return 0
+            self.used -= e.bytes
+        if device.type != "cuda":
+            self._demote(module)
+            return 0
+        s = self._stream(device)
+        current = torch.cuda.current_stream(device)
+        s.wait_stream(current)  # don't overtake work already queued on these tensors
+        moved: dict[int, torch.Tensor] = {}
+        copied = 0
+        with torch.cuda.stream(s):
+            for mod, attr, name, t in _slots(module):
+                if name in skip or t.device.type != "cpu":
+                    continue
+                g = moved.get(t.data_ptr())
+                if g is None:
+                    g = moved[t.data_ptr()] = torch.empty(t.shape, dtype=t.dtype, device=device)
+                    g.copy_(t, non_blocking=True)
+                    copied += _nbytes(t)
+                _assign(mod, attr, g)
+        for g in moved.values():
+            g.record_stream(current)
+        current.wait_stream(s)
+        return copied
+
+    def move(self, module: torch.nn.Module, device):
+        """
+        module.to(device) for the Override*Device nodes. A held module comes
+        back to a GPU on the tier's stream; moved anywhere else it leaves the
+        tier as pageable tensors. Nothing is stashed here: a model forced onto
+        the CPU computes there, it was not evicted.
+        """
+        if self.holds(module):
+            self.restore(module, device)  # non-CUDA target: demoted and forgotten
+        module.to(device)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "budget": self.budget, "used": self.used,
+                    "models": len(self._entries)}
+
+
+tier = RamTier()
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+Built-in HTTP engine used when aria2c is not installed.
+- same contract as aria2: gids, tellStatus-shaped status, pause / unpause /
+  remove, so /aria2/start|status|stop, the scheduler and the progress pushes
+  work unchanged
+- parallel HTTP Range requests (split / max-connection-per-server /
+  min-split-size from the aria2 options) into a preallocated file via pwrite;
+  idle connections steal half of the largest remaining segment
+- resume from a <file>.azdl sidecar holding per-segment offsets
+- per-segment retries with exponential backoff; 401/403/404/410 on a signed
+  URL falls back to the next URI
+- the scheduler's max_download_limit caps all built-in transfers together
+  (one token bucket), as max-overall-download-limit does inside aria2
+- honors the aria2 "header", "referer", "out", "checksum" and "max-tries" options
+
+COMFY_AZ_ENGINE: auto (aria2c when installed) | aria2 | builtin
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+from urllib.parse import urlparse, unquote
+
+import aiohttp
+
+from .file_io import allocate, pwrite
+from .url_probe import http_session, invalidate as _invalidate_probe
+from .progress import broadcaster as _progress
+from .download_scheduler import Job, scheduler as _scheduler
+from .integrity import verify as _verify
+
+ENGINE = os.environ.get("COMFY_AZ_ENGINE", "auto").lower()
+SIDECAR_EXT = ".azdl"
+SAVE_INTERVAL = 2.0
+WRITE_CHUNK = 4 << 20
+RETRY_BASE = 1.0
+RETRY_MAX = 30.0
+DEFAULT_MIN_SPLIT = 20 << 20  # aria2's default min-split-size
+FALLBACK_STATUSES = (401, 403, 404, 410)  # signed URL expired -> next URI
+TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60)
+
+
+def use_builtin(aria2_error: Exception | None = None) -> bool:
+    """Should this download go to the built-in engine?"""
+    if ENGINE == "builtin":
+        return True
+    if ENGINE == "aria2":
+        return False
+    return aria2_error is not None and not shutil.which("aria2c")
+
+def _parse_size(v, default: int) -> int:
+    s = str(v or "").strip().upper()
+    if not s:
+        return default
+    mult = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}.get(s[-1], 1)
+    try:
+        return int(float(s.rstrip("KMG")) * mult)
+    except ValueError:
+        return default
+
+
+class _Throttle:
+    """Token bucket shared by every transfer; the rate follows the scheduler's limit."""
+
+    def __init__(self):
+        self._spec = None
+        self._rate = 0
+        self._tokens = 0.0
+        self._at = time.monotonic()
+
+    def _limit(self) -> int:
+        spec = _scheduler.max_download_limit  # aria2 syntax, "0" = unlimited
+        if spec != self._spec:
+            self._spec, self._rate = spec, _parse_size(spec, 0)
+        return self._rate
+
+    async def take(self, n: int):
+        rate = self._limit()
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(rate, self._tokens + (now - self._at) * rate)  # bursts up to one second
+        self._at = now
+        self._tokens -= n  # in debt: later callers wait for it too
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / rate)
+
+_throttle = _Throttle()
+
+
+class _HTTPStatus(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"The response status is not successful. status={status}")
+        self.status = status
+
+
+class _Segment:
+    __slots__ = ("start", "end", "pos", "busy")
+
+    def __init__(self, start: int, end: int, pos: int | None = None):
+        self.start = start
+        self.end = end  # exclusive
+        self.pos = start if pos is None else pos  # bytes before pos are on disk
+        self.busy = False
+
+
+class RangeDownload:
+    def __init__(self, gid: str, uris: list[str], opts: dict, size: int | None = None,
+                 accept_ranges: bool = False, name: str | None = None):
+        self.gid = gid
+        self.uris = list(uris)
+        self.opts = dict(opts)
+        self.dir = opts.get("dir") or os.getcwd()
+        self.size = size or None
+        self.accept_ranges = bool(accept_ranges and size)
+        self.name = opts.get("out") or name or self._url_name() or "download.bin"
+        self.path = os.path.join(self.dir, self.name)
+        self.status = "paused" if opts.get("pause") == "true" else "waiting"
+        self.error = ""
+        self.received = 0
+        self._segments: list[_Segment] = []
+        self._fd: int | None = None
+        self._uri = 0
+        self._task: asyncio.Task | None = None
+        self._saved_at = 0.0
+        self._speed = 0.0
+        self._rate = (time.monotonic(), 0)
+
+        self.conns = max(1, int(opts.get("max-connection-per-server") or 1))
+        self.split = max(1, int(opts.get("split") or self.conns))
+        self.min_split = _parse_size(opts.get("min-split-size"), DEFAULT_MIN_SPLIT)
+        self.max_tries = int(opts.get("max-tries") or 5)
+        checksum = opts.get("checksum") or ""
+        self.expected = checksum.split("=", 1)[1].lower() if checksum.startswith("sha-256=") else None
+        self.headers = {}
+        for h in opts.get("header") or []:
+            k, _, v = h.partition(":")
+            self.headers[k.strip()] = v.strip()
+        if opts.get("referer"):
+            self.headers["Referer"] = opts["referer"]
+
+    def _url_name(self) -> str:
+        try:
+            return os.path.basename(unquote(urlparse(self.uris[-1]).path))
+        except (ValueError, IndexError):
+            return ""
+
+    # ---------- aria2-like control ----------
+    async def unpause(self):
+        if self.status in ("paused", "waiting"):
+            self.status = "active"
+            self._task = asyncio.ensure_future(self._run())
+
+    async def pause(self):
+        if self.status == "active":
+            self.status = "paused"
+            await self._stop_task()
+
+    async def remove(self):
+        if self.status not in ("complete", "error", "removed"):
+            self.status = "removed"
+            await self._stop_task()
+            _scheduler.finished(self.gid)
+
+    async def _stop_task(self):
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def tell(self) -> dict:
+        """tellStatus-shaped dict (what normalize_aria2_status expects)."""
+        done = sum(s.pos - s.start for s in self._segments) if self._segments else self.received
+        now = time.monotonic()
+        t0, b0 = self._rate
+        if now - t0 >= 0.5:
+            inst = (self.received - b0) / (now - t0)
+            self._speed = inst if self._speed == 0 else 0.5 * self._speed + 0.5 * inst
+            self._rate = (now, self.received)
+        return {
+            "gid": self.gid,
+            "status": self.status,
+            "totalLength": str(self.size or 0),
+            "completedLength": str(done),
+            "downloadSpeed": str(int(self._speed) if self.status == "active" else 0),
+            "errorMessage": self.error,
+            "files": [{"path": self.path}],
+            "dir": self.dir,
+        }
+
+    # ---------- sidecar ----------
+    @property
+    def _sidecar(self) -> str:
+        return self.path + SIDECAR_EXT
+
+    def _save(self, force: bool = False):
+        now = time.monotonic()
+        if not self._segments or (not force and now - self._saved_at < SAVE_INTERVAL):
+            return
+        self._saved_at = now
+        state = {"version": 1, "size": self.size, "uris": self.uris,
+                 "segments": [[s.start, s.end, s.pos] for s in self._segments]}
+        tmp = self._sidecar + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self._sidecar)
+        except OSError:
+            pass
+
+    def _load(self) -> bool:
+        try:
+            with open(self._sidecar, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not self.size or state.get("size") != self.size:
+            return False
+        self._segments = [_Segment(a, b, p) for a, b, p in state.get("segments") or []]
+        return bool(self._segments)
+
+    # ---------- transfer ----------
+    def _prepare(self) -> bool:
+        """Open / allocate the target. Returns False if it is already complete."""
+        os.makedirs(self.dir, exist_ok=True)
+        resumed = os.path.exists(self.path) and self._load()
+        if not resumed and os.path.exists(self.path):
+            if self.size and os.path.getsize(self.path) == self.size:
+                return False  # same size, no sidecar: finished earlier
+            # like aria2 --auto-file-renaming: name.1.ext, name.2.ext, ...
+            stem, ext = os.path.splitext(self.name)
+            i = 1
+            while os.path.exists(os.path.join(self.dir, f"{stem}.{i}{ext}")):
+                i += 1
+            self.name = f"{stem}.{i}{ext}"
+            self.path = os.path.join(self.dir, self.name)
+
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.path, flags, 0o644)
+        if not self.accept_ranges:
+            os.ftruncate(self._fd, 0)  # can't resume without ranges
+            self._segments = []
+            return True
+        allocate(self._fd, self.size)
+        if not resumed:
+            n = max(1, min(self.split, self.size // self.min_split))
+            step = -(-self.size // n)
+            self._segments = [_Segment(a, min(a + step, self.size)) for a in range(0, self.size, step)]
+        self._save(force=True)
+        return True
+
+    async def _write(self, chunks: list[bytes], offset: int):
+        await asyncio.get_running_loop().run_in_executor(None, pwrite, self._fd, chunks, offset)
+
+    def _next_segment(self) -> _Segment | None:
+        for s in self._segments:
+            if not s.busy and s.pos < s.end:
+                s.busy = True
+                return s
+        # steal: split the largest running segment, leaving room for its write buffer
+        busy = [s for s in self._segments if s.busy and s.end - s.pos > 2 * self.min_split]
+        if not busy:
+            return None
+        victim = max(busy, key=lambda s: s.end - s.pos)
+        mid = victim.pos + max(2 * WRITE_CHUNK, (victim.end - victim.pos) // 2)
+        if victim.end - mid < self.min_split // 2:
+            return None
+        seg = _Segment(mid, victim.end)
+        victim.end = mid
+        seg.busy = True
+        self._segments.append(seg)
+        return seg
+
+    async def _get(self, headers: dict):
+        """One GET with URI fallback; returns an open response."""
+        while True:
+            uri = self.uris[self._uri]
+            resp = await http_session().get(uri, headers=headers, timeout=TIMEOUT,
+                                             allow_redirects=True)
+            if resp.status in FALLBACK_STATUSES:
+                _invalidate_probe(self.uris[-1])  # probed as the original URL, which is listed last
+                if self._uri + 1 < len(self.uris):
+                    resp.release()
+                    self._uri += 1
+                    continue
+            return resp
+
+    async def _fetch(self, seg: _Segment):
+        tries = 0
+        while seg.pos < seg.end:
+            headers = dict(self.headers, Range=f"bytes={seg.pos}-{seg.end - 1}")
+            try:
+                resp = await self._get(headers)
+                async with resp:
+                    if resp.status != 206:
+                        raise _HTTPStatus(resp.status)
+                    buf, nbuf, off = [], 0, seg.pos
+                    async for chunk in resp.content.iter_any():
+                        take = seg.end - off - nbuf  # the segment may have been split meanwhile
+                        if len(chunk) > take:
+                            chunk = chunk[:take]
+                        buf.append(chunk)
+                        nbuf += len(chunk)
+                        self.received += len(chunk)
+                        await _throttle.take(len(chunk))
+                        if nbuf >= WRITE_CHUNK or off + nbuf >= seg.end:
+                            await self._write(buf, off)
+                            off += nbuf
+                            seg.pos, buf, nbuf = off, [], 0
+                            self._save()
+                            tries = 0
+                        if off >= seg.end:
+                            break
+                    if buf:
+                        await self._write(buf, off)
+                        seg.pos = off + nbuf
+                    if seg.pos < seg.end and resp.content.at_eof():
+                        raise aiohttp.ClientPayloadError("connection closed early")
+            except (aiohttp.ClientError, asyncio.TimeoutError, _HTTPStatus) as e:
+                tries += 1
+                if tries >= self.max_tries or (isinstance(e, _HTTPStatus) and e.status in (400, 416)):
+                    raise
+                await asyncio.sleep(min(RETRY_MAX, RETRY_BASE * 2 ** (tries - 1)))
+
+    async def _worker(self):
+        while True:
+            seg = self._next_segment()
+            if seg is None:
+                return
+            try:
+                await self._fetch(seg)
+            finally:
+                seg.busy = False
+
+    async def _download_ranges(self):
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.conns)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+    async def _download_single(self):
+        tries = 0
+        while True:
+            self.received = 0
+            try:
+                resp = await self._get(dict(self.headers))
+                async with resp:
+                    if resp.status >= 400:
+                        raise _HTTPStatus(resp.status)
+                    off = 0
+                    async for chunk in resp.content.iter_chunked(WRITE_CHUNK):
+                        await _throttle.take(len(chunk))
+                        await self._write([chunk], off)
+                        off += len(chunk)
+                        self.received = off
+                await asyncio.get_running_loop().run_in_executor(None, os.ftruncate, self._fd, off)
+                self.size = self.size or off
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError, _HTTPStatus):
+                tries += 1
+                if tries >= self.max_tries:
+                    raise
+                await asyncio.sleep(min(RETRY_MAX, RETRY_BASE * 2 ** (tries - 1)))
+
+    def _close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    async def _run(self):
+        try:
+            if await asyncio.get_running_loop().run_in_executor(None, self._prepare):
+                if self.accept_ranges:
+                    await self._download_ranges()
+                else:
+                    await self._download_single()
+            self._close()
+            if self.expected:
+                res = await _verify(self.path, self.expected)
+                if not res["ok"]:
+                    raise ValueError(f"Checksum error: {res['error']}")
+            try:
+                os.remove(self._sidecar)
+            except OSError:
+                pass
+            self.status = "complete"
+        except asyncio.CancelledError:
+            self._save(force=True)
+            raise
+        except Exception as e:
+            self.status = "error"
+            self.error = str(e) or type(e).__name__
+            self._save(force=True)
+        finally:
+            self._close()
+        _scheduler.finished(self.gid)
+
+
+# ========= registry =========
+downloads: dict[str, RangeDownload] = {}
+
+def get(gid: str) -> RangeDownload | None:
+    return downloads.get(gid)
+
+def add(uris: list[str], opts: dict, size: int | None = None, accept_ranges: bool = False,
+        name: str | None = None) -> str:
+    """Register a download (started by the scheduler through http_job); returns its gid."""
+    gid = uuid.uuid4().hex[:16]
+    downloads[gid] = RangeDownload(gid, uris, opts, size=size, accept_ranges=accept_ranges, name=name)
+    while len(downloads) > 512:
+        old = next(iter(downloads))
+        if downloads[old].status not in ("complete", "error", "removed"):
+            break
+        downloads.pop(old)
+    return gid
+
+def http_job(gid: str, priority: int = 0, label: str = "", dest: str = "") -> Job:
+    dl = downloads[gid]
+    return Job(gid, "http", start=dl.unpause, priority=priority, label=label,
+               dest=dest, pause=dl.pause)
+
+def _status_of(gid: str) -> dict | None:
+    dl = downloads.get(gid)
+    return dl.tell() if dl is not None else None
+
+_progress.add_source(_status_of)
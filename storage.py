@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Where this node pack keeps its state files, and which folders hold models.
+- COMFY_AZ_STATE_DIR   : state dir (default: <ComfyUI user dir>/az_nodes)
+- COMFY_AZ_MODEL_ROOTS : os.pathsep-separated model roots
+                         (default: ComfyUI folder_paths model folders)
+"""
+
+import os
+
+def state_dir() -> str:
+    d = os.environ.get("COMFY_AZ_STATE_DIR", "")
+    if not d:
+        try:
+            import folder_paths
+            d = os.path.join(folder_paths.get_user_directory(), "az_nodes")
+        except Exception:
+            d = os.path.join(os.path.expanduser("~"), ".cache", "az_nodes")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def state_path(name: str) -> str:
+    return os.path.join(state_dir(), name)
+
+def model_roots() -> list[str]:
+    """Existing, de-nested absolute model roots."""
+    roots = []
+    env = os.environ.get("COMFY_AZ_MODEL_ROOTS", "")
+    if env:
+        roots = [p for p in env.split(os.pathsep) if p.strip()]
+    else:
+        try:
+            import folder_paths
+            roots.append(folder_paths.models_dir)
+            for paths, _exts in folder_paths.folder_names_and_paths.values():
+                roots.extend(paths)
+        except Exception:
+            pass
+
+    out = []
+    for r in sorted({os.path.abspath(os.path.expanduser(p)) for p in roots}):
+        if not os.path.isdir(r):
+            continue
+        # a root inside another root would be walked twice
+        if any(r == o or r.startswith(o.rstrip(os.sep) + os.sep) for o in out):
+            continue
+        out.append(r)
+    return out
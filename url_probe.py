@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Async, cached URL metadata probe.
+- HEAD (GET bytes=0-0 when HEAD is refused) over one pooled aiohttp session
+- follows redirects; reports the final URL so downloaders skip the chain
+- results (final_url, content_disposition, size, etag, accept_ranges) live in
+  a TTL+LRU cache; concurrent probes of the same URL share one request
+- a download that fails (or falls back on 401/403/404/410) drops the URL's
+  entry, so a retry re-resolves an expired signed URL instead of reusing it
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+import aiohttp
+
+PROBE_TTL = float(os.environ.get("COMFY_AZ_PROBE_TTL", "600"))
+PROBE_FAIL_TTL = 30.0
+PROBE_CACHE_MAX = 256
+PROBE_TIMEOUT = float(os.environ.get("COMFY_AZ_PROBE_TIMEOUT", "8"))
+MAX_REDIRECTS = 10
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class TTLCache:
+    """Small LRU dict whose entries also expire after a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._d: OrderedDict = OrderedDict()  # key -> (expires, value)
+
+    def get(self, key, default=None):
+        hit = self._d.get(key)
+        if hit is None:
+            return default
+        if hit[0] < time.monotonic():
+            self._d.pop(key, None)
+            return default
+        self._d.move_to_end(key)
+        return hit[1]
+
+    def set(self, key, value, ttl: float):
+        self._d[key] = (time.monotonic() + ttl, value)
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+    def pop(self, key, default=None):
+        hit = self._d.pop(key, None)
+        return default if hit is None else hit[1]
+
+    def keys(self) -> list:
+        return list(self._d)
+
+
+_cache = TTLCache(PROBE_CACHE_MAX)
+_inflight: dict = {}
+_session: aiohttp.ClientSession | None = None
+
+def http_session() -> aiohttp.ClientSession:
+    """Pooled session for outbound HTTP (one per event loop)."""
+    global _session
+    loop = asyncio.get_running_loop()
+    s = _session
+    if s is None or s.closed or getattr(s, "_loop", loop) is not loop:
+        connector = aiohttp.TCPConnector(limit=64, limit_per_host=16, ttl_dns_cache=300)
+        s = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+        _session = s
+    return s
+
+def _key(url: str, token: str | None):
+    th = hashlib.sha1(token.encode("utf-8")).hexdigest() if token else ""
+    return (url, th)
+
+def _strip_etag(v: str | None) -> str:
+    v = (v or "").strip()
+    if v.startswith("W/"):
+        v = v[2:]
+    return v.strip('"')
+
+def _int(v) -> int | None:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+def _info_from(resp: aiohttp.ClientResponse) -> dict:
+    h = resp.headers
+    size = None
+    if resp.status == 206:
+        cr = h.get("Content-Range", "")  # bytes 0-0/12345
+        if "/" in cr:
+            size = _int(cr.rsplit("/", 1)[1])
+    else:
+        size = _int(h.get("Content-Length"))
+
+    # HF puts the LFS sha256 / size on the redirect it sends before the CDN hop
+    linked_etag, linked_size = "", None
+    for r in list(resp.history) + [resp]:
+        linked_etag = _strip_etag(r.headers.get("X-Linked-Etag")) or linked_etag
+        linked_size = _int(r.headers.get("X-Linked-Size")) or linked_size
+
+    return {
+        "ok": resp.status < 400,
+        "status": resp.status,
+        "final_url": str(resp.url),
+        "content_disposition": h.get("Content-Disposition", ""),
+        "size": size if size is not None else linked_size,
+        "etag": _strip_etag(h.get("ETag")),
+        "linked_etag": linked_etag,
+        "accept_ranges": resp.status == 206 or h.get("Accept-Ranges", "").lower() == "bytes",
+        "error": "" if resp.status < 400 else f"HTTP {resp.status}",
+    }
+
+async def _probe(url: str, token: str | None) -> dict:
+    headers = {"Accept": "*/*"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    s = http_session()
+    timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+    async with s.head(url, headers=headers, allow_redirects=True,
+                      max_redirects=MAX_REDIRECTS, timeout=timeout) as resp:
+        if resp.status not in (400, 403, 405, 501):
+            return _info_from(resp)
+    # some CDNs refuse HEAD: ask for one byte instead, never read the body
+    headers["Range"] = "bytes=0-0"
+    async with s.get(url, headers=headers, allow_redirects=True,
+                     max_redirects=MAX_REDIRECTS, timeout=timeout) as resp:
+        return _info_from(resp)
+
+async def _probe_and_cache(key, url: str, token: str | None) -> dict:
+    try:
+        info = await _probe(url, token)
+    except Exception as e:
+        info = {"ok": False, "status": None, "final_url": url, "content_disposition": "",
+                "size": None, "etag": "", "linked_etag": "", "accept_ranges": False,
+                "error": f"{type(e).__name__}: {e}"}
+    _cache.set(key, info, PROBE_TTL if info["ok"] else PROBE_FAIL_TTL)
+    return info
+
+async def probe(url: str, token: str | None = None) -> dict:
+    """
+    Metadata for url (never raises). Keys:
+      ok, status, final_url, content_disposition, size, etag, linked_etag,
+      accept_ranges, error
+    """
+    key = _key(url, token)
+    hit = _cache.get(key)
+    if hit is not None:
+        return hit
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_probe_and_cache(key, url, token))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+def invalidate(url: str):
+    """Forget url's cached probes (any token), e.g. after its signed final URL stopped working."""
+    for key in [k for k in _cache.keys() if k[0] == url]:
+        _cache.pop(key)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Target-driven VRAM eviction for the PurgeVRAM nodes.
+- evicts models from comfy.model_management.current_loaded_models one at a
+  time, least recently loaded first ("lru") or biggest first ("largest"),
+  and stops as soon as the requested free VRAM is reached
+- models can be kept by type ("model", "clip", "vae", "controlnet") or by a
+  substring of their class name ("flux", "wan", "t5", ...)
+- a model is only partially offloaded when that is enough to reach the
+  target (ComfyUI's lowvram path), so the next sampler reloads less
+- with the RAM tier on (COMFY_AZ_RAM_TIER_GB, see ram_tier.py) fully evicted
+  models are parked in pinned host memory, and LoadedModel.model_load copies
+  them back on a side CUDA stream before ComfyUI's own load runs
+"""
+
+import gc
+import time
+
+import torch
+import comfy.model_management as mm
+
+from .ram_tier import tier as ram_tier
+
+GB = 1024 ** 3
+ORDERS = ["lru", "largest"]
+
+
+def model_kind(loaded) -> str:
+    """Coarse type of a LoadedModel: model | clip | vae | controlnet | other."""
+    real = getattr(getattr(loaded, "model", None), "model", None)
+    cls = type(real)
+    name = f"{cls.__module__}.{cls.__name__}".lower()
+    try:
+        import comfy.model_base
+        if isinstance(real, comfy.model_base.BaseModel):
+            return "model"
+    except ImportError:
+        pass
+    if "controlnet" in name or "t2i_adapter" in name:
+        return "controlnet"
+    if "text_encoders" in name or "clip" in name or "t5" in name:
+        return "clip"
+    if "autoencoder" in name or "vae" in name:
+        return "vae"
+    return "other"
+
+def _describe(loaded) -> str:
+    real = getattr(getattr(loaded, "model", None), "model", None)
+    return type(real).__name__
+
+def _kept(loaded, keep: list[str]) -> bool:
+    if not keep:
+        return False
+    kind = model_kind(loaded)
+    name = _describe(loaded).lower()
+    return any(k == kind or k in name for k in keep)
+
+def _vram(loaded) -> int:
+    """Bytes this model currently holds on its device."""
+    for attr in ("model_loaded_memory", "model_memory"):
+        fn = getattr(loaded, attr, None)
+        if fn is not None:
+            try:
+                return int(fn())
+            except Exception:
+                continue
+    return 0
+
+def _module(loaded):
+    """The torch module behind a LoadedModel (None once ComfyUI dropped it)."""
+    return getattr(getattr(loaded, "model", None), "model", None)
+
+def _park(modules: list) -> int:
+    """Hand fully evicted modules to the RAM tier; bytes pinned."""
+    if not ram_tier.enabled:
+        return 0
+    return sum(ram_tier.stash(m) for m in modules if m is not None)
+
+def parse_keep(text: str) -> list[str]:
+    return [t.strip().lower() for t in (text or "").replace(";", ",").split(",") if t.strip()]
+
+def target_bytes(amount: float, unit: str, device) -> int:
+    """Free-VRAM target in bytes from GB or a percentage of the device's total."""
+    if unit == "%":
+        return int(mm.get_total_memory(device) * max(min(amount, 100.0), 0.0) / 100.0)
+    return int(max(amount, 0.0) * GB)
+
+def _unload(loaded, memory_to_free: int) -> bool:
+    """True if the model left VRAM entirely (False: partially offloaded)."""
+    try:
+        return bool(loaded.model_unload(memory_to_free))
+    except TypeError:  # older ComfyUI: no partial unload
+        loaded.model_unload()
+        return True
+
+def evict_until(target: int, order: str = "lru", keep: list[str] | None = None, device=None) -> dict:
+    """
+    Evict loaded models until `target` bytes of VRAM are free.
+    Returns { freed, seconds, free_before, free_after, evicted: [...], kept: [...] }.
+    """
+    t0 = time.perf_counter()
+    device = device or mm.get_torch_device()
+    keep = keep or []
+    free_before = free = mm.get_free_memory(device)
+
+    # current_loaded_models is most recently loaded first
+    candidates = [lm for lm in mm.current_loaded_models if getattr(lm, "device", device) == device]
+    kept = [lm for lm in candidates if _kept(lm, keep)]
+    candidates = [lm for lm in candidates if lm not in kept]
+    if order == "largest":
+        candidates.sort(key=_vram, reverse=True)
+    else:
+        candidates.reverse()
+
+    evicted, gone = [], []
+    for lm in candidates:
+        if free >= target:
+            break
+        size = _vram(lm)
+        full = _unload(lm, target - free)
+        evicted.append({"name": _describe(lm), "kind": model_kind(lm), "bytes": size,
+                        "partial": not full})
+        if full:
+            gone.append(lm)
+        gc.collect()
+        free = mm.get_free_memory(device)
+    for lm in gone:
+        try:
+            mm.current_loaded_models.remove(lm)
+        except ValueError:
+            pass
+    parked = _park([_module(lm) for lm in gone])
+
+    if evicted:
+        mm.soft_empty_cache()
+        free = mm.get_free_memory(device)
+    return {
+        "freed": max(free - free_before, 0),
+        "seconds": time.perf_counter() - t0,
+        "free_before": free_before,
+        "free_after": free,
+        "evicted": evicted,
+        "kept": [_describe(lm) for lm in kept],
+        "parked": parked,
+    }
+
+def purge(purge_cache: bool, purge_models: bool, mode: str = "all", target_free: float = 0.0,
+          target_unit: str = "GB", order: str = "lru", keep: str = "") -> dict:
+    """What both PurgeVRAM nodes run; mode "all" is the original unload-everything."""
+    t0 = time.perf_counter()
+    device = mm.get_torch_device()
+    free_before = mm.get_free_memory(device)
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+    report = {"evicted": [], "kept": [], "parked": 0}
+    if purge_models:
+        if mode == "target":
+            report = evict_until(target_bytes(target_free, target_unit, device), order,
+                                 parse_keep(keep), device)
+        else:
+            modules = [_module(lm) for lm in mm.current_loaded_models
+                       if getattr(lm, "device", device) == device]
+            mm.unload_all_models()
+            report["parked"] = _park(modules)
+    if purge_cache:
+        mm.soft_empty_cache()
+    free_after = mm.get_free_memory(device)
+    report.update(freed=max(free_after - free_before, 0), seconds=time.perf_counter() - t0,
+                  free_before=free_before, free_after=free_after)
+    return report
+
+def summary(report: dict) -> str:
+    names = ", ".join(f"{e['name']}{' (partial)' if e['partial'] else ''}" for e in report["evicted"])
+    return (f"freed {report['freed'] / GB:.2f} GB in {report['seconds']:.2f}s, "
+            f"free {report['free_after'] / GB:.2f} GB"
+            + (f"; evicted: {names}" if names else "")
+            + (f"; kept: {', '.join(report['kept'])}" if report["kept"] else "")
+            + (f"; RAM tier +{report['parked'] / GB:.2f} GB" if report.get("parked") else ""))
+
+
+def _install_restore_hook():
+    """Full loads of a parked model start with the tier's stream copy; ComfyUI's .to() is then a no-op."""
+    cls = getattr(mm, "LoadedModel", None)
+    orig = getattr(cls, "model_load", None)
+    if orig is None or getattr(orig, "_az_ram_tier", False):
+        return
+
+    def model_load(self, lowvram_model_memory=0, *args, **kwargs):
+        module = _module(self)
+        held = ram_tier.held(module)
+        if held:
+            try:
+                size = max(int(self.model.model_size()), held)
+            except Exception:
+                size = held
+            # lowvram_model_memory is the VRAM budget for this model (0: unlimited); NORMAL_VRAM always passes one
+            if not lowvram_model_memory or size <= lowvram_model_memory:
+                # weights that carry patches (LoRA, ...) stay on the CPU: ComfyUI backs them up and patches from there
+                ram_tier.restore(module, self.device, skip=set(getattr(self.model, "patches", None) or ()))
+        try:
+            return orig(self, lowvram_model_memory, *args, **kwargs)
+        finally:
+            if held:
+                ram_tier.drop(module)  # partial load: ComfyUI moved what it wanted, the rest is unaccounted
+
+    model_load._az_ram_tier = True
+    cls.model_load = model_load
+
+if ram_tier.enabled:
+    _install_restore_hook()